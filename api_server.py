@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+xzx 数据采集平台
+批量任务 HTTP 接口入口（无需浏览器，供调度系统和流水线调用）
+"""
+import sys
+import os
+import argparse
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+def main():
+    parser = argparse.ArgumentParser(description="批量任务 HTTP 接口")
+    parser.add_argument('--host', default='127.0.0.1', help="监听地址（默认只监听本机）")
+    parser.add_argument('--port', type=int, default=8600, help="监听端口")
+    parser.add_argument('--max-jobs', type=int, default=2, help="同时执行的任务数上限，超出的任务排队")
+    parser.add_argument('--queue-jobs', type=int, default=1, help="持久化队列中同时执行的任务数")
+    parser.add_argument('--pool-workers', type=int, default=32, help="共享执行池的全局并发请求数")
+    parser.add_argument('--per-host', type=int, default=10, help="单个目标主机的并发请求数上限")
+    args = parser.parse_args()
+
+    from src.core.job_api import create_app
+    from src.core.job_manager import JobManager
+    from src.core.execution_pool import ExecutionPool
+    from src.core.job_queue import JobQueue
+    ExecutionPool.shared(max_workers=max(1, args.pool_workers), per_host=max(1, args.per_host))
+    manager = JobManager(max_running=max(1, args.max_jobs))
+    # 队列任务也登记在同一个管理器中，可以通过 /jobs/<id> 查看进度和结果
+    queue = JobQueue.shared(max_running=max(1, args.queue_jobs), manager=manager)
+    app = create_app(manager, queue)
+    print(f"🔗 批量任务接口: http://{args.host}:{args.port}/jobs")
+    app.run(host=args.host, port=args.port, threaded=True)
+
+if __name__ == "__main__":
+    main()
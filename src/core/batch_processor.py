@@ -7,11 +7,17 @@
 
 import threading
 import time
-from queue import Queue
-from typing import Dict, List, Any
-import streamlit as st
+from itertools import islice
+from urllib.parse import urlparse
+from concurrent.futures import wait
+from typing import Dict, List, Any, Iterable
 from src.core.curl_parser import CurlRequest
 from src.core.request_processor import RequestProcessor, RequestModifier
+from src.core.throughput_monitor import ThroughputMonitor
+from src.core.execution_pool import ExecutionPool
+from src.core.result_columns import ResultColumns
+from src.core.run_history import record_batch_run
+from src.core.param_sources import format_bindings
 from src.utils.utils import Logger
 
 class BatchProcessor:
@@ -22,6 +28,7 @@ class BatchProcessor:
         self.max_threads = 10  # 最大线程数
         self.batch_size = 50   # 每批处理数量
         self.request_delay = 0.1  # 请求间隔(秒)
+        self.weight = 1.0      # 在共享执行池中的调度权重
         self.max_requests = 999999  # 最大请求数限制（设置为很大值，实际无限制）
         
         # 结果管理
@@ -30,169 +37,194 @@ class BatchProcessor:
         self.request_processor = RequestProcessor()
         self.results = []
         self.errors = []
+        self.columns = ResultColumns()  # 结果元数据列，统计直接基于列计算
         self.downloaded_files = []
         self.logger = Logger()
+        self.progress = {'current': 0, 'total': 0, 'batch': 0, 'total_batches': 0, 'status': 'idle', 'error': None}
+        self._job_thread = None
+        self.monitor = ThroughputMonitor()
+        
+        # 可选扩展点：跳过某些值（如分页提前结束）、在结果入库前处理结果
+        self.skip_value = None   # callable(param_value) -> bool
+        self.result_hook = None  # callable(param_value, result)
     
-    def run_batch_requests(self, base_request: CurlRequest, param_values: List[str], param_key: str):
-        """执行批量请求"""
+    def run_batch_requests(self, base_request: CurlRequest, param_values: Iterable[str], param_key: str):
+        """
+        在后台线程中执行批量请求，立即返回；进度通过 self.progress 读取
+        param_values 可以是列表，也可以是惰性的 ParamSource，按批次逐段拉取
+        """
         # 清空之前的结果
         self.results = []
         self.errors = []
+        self.columns = ResultColumns()
         self.downloaded_files = []
         
-        total_requests = len(param_values)
+        if hasattr(param_values, '__len__'):
+            total_requests = len(param_values)
+        else:
+            total_requests = param_values.count() or 0
         total_batches = max(1, (total_requests + self.batch_size - 1) // self.batch_size)  # 向上取整，确保所有请求都被处理
         
-        # 更新进度状态
-        st.session_state.batch_progress = {
+        # 进度状态由后台线程更新，界面片段定时读取
+        self.progress = {
             'current': 0,
             'total': total_requests,
             'batch': 0,
-            'total_batches': total_batches
+            'total_batches': total_batches,
+            'status': 'running',
+            'error': None
         }
+        self.monitor = ThroughputMonitor(total_requests)
+        self.request_processor.reset_cache_stats()
+        self.request_processor.download_manager.reset_stats()
+        self.request_processor.blob_store.reset_stats()
         
-        # 创建进度显示
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        batch_text = st.empty()
-        
-        self.logger.log(f"开始批量请求: 共{len(param_values)}个, 参数key: {param_key}")
+        self._job_thread = threading.Thread(
+            target=self._run_batches,
+            args=(base_request, param_values, param_key),
+            daemon=True
+        )
+        self._job_thread.start()
+    
+    def is_running(self) -> bool:
+        """后台任务是否仍在执行"""
+        return self._job_thread is not None and self._job_thread.is_alive()
+    
+    def _run_batches(self, base_request: CurlRequest, param_values: Iterable[str], param_key: str):
+        """后台线程：分批执行全部请求，每批只从来源中取出 batch_size 个值"""
+        total_requests = self.progress['total']
+        self.logger.log(f"开始批量请求: 共{total_requests}个, 参数key: {param_key}")
         
         try:
+            values = iter(param_values)
+            batch_idx = 0
+            start_idx = 0
+            batch_values = list(islice(values, self.batch_size))
             # 分批处理
-            for batch_idx in range(total_batches):
-                start_idx = batch_idx * self.batch_size
-                end_idx = min(start_idx + self.batch_size, total_requests)
-                batch_values = param_values[start_idx:end_idx]
-                
-                st.session_state.batch_progress['batch'] = batch_idx + 1
-                batch_text.text(f"处理批次 {batch_idx + 1}/{total_batches} (请求 {start_idx + 1}-{end_idx})")
-                self.logger.log(f"开始处理批次 {batch_idx + 1}/{total_batches} (请求 {start_idx + 1}-{end_idx})")
+            while batch_values:
+                end_idx = start_idx + len(batch_values)
+                self.progress['batch'] = batch_idx + 1
+                self.logger.log(f"开始处理批次 {batch_idx + 1}/{self.progress['total_batches']} (请求 {start_idx + 1}-{end_idx})")
                 
                 # 处理当前批次
-                self._process_batch(base_request, batch_values, param_key, progress_bar, status_text)
-                self.logger.log(f"完成批次 {batch_idx + 1}/{total_batches}")
+                self._process_batch(base_request, batch_values, param_key)
+                self.logger.log(f"完成批次 {batch_idx + 1}/{self.progress['total_batches']}")
+                
+                batch_idx += 1
+                start_idx = end_idx
+                batch_values = list(islice(values, self.batch_size))
                 
                 # 批次间延迟
-                if batch_idx < total_batches - 1:
+                if batch_values:
                     time.sleep(0.5)
             
-            # 完成
-            progress_bar.progress(1.0)
-            status_text.success(f'✅ 处理完成! 成功: {len(self.results)}, 失败: {len(self.errors)}')
+            # 去重等原因可能使实际数量少于预估
+            self.progress['skipped'] = getattr(param_values, 'skipped', 0)
+            if self.progress['skipped']:
+                self.logger.log(f"去重跳过 {self.progress['skipped']} 个参数值")
+            self.progress['total'] = start_idx
+            self.progress['total_batches'] = batch_idx
+            self.monitor.total = start_idx
+            # 异步写入的备份文件落盘后再发布结果
+            self.request_processor.download_manager.flush()
+            self.progress['status'] = 'done'
             self.logger.log(f"批量请求全部完成! 成功: {len(self.results)}, 失败: {len(self.errors)}")
-            batch_text.empty()
-            
-            # 保存到session_state - 添加线程安全保护
-            import threading
-            if not hasattr(st.session_state, '_lock'):
-                st.session_state._lock = threading.Lock()
-            
-            with st.session_state._lock:
-                st.session_state['curl_results'] = self.results.copy()
-                st.session_state['curl_errors'] = self.errors.copy()
-                st.session_state['downloaded_files'] = self.downloaded_files.copy()
-            
-            # 防止页面自动刷新
-            st.rerun()
             
         except Exception as e:
             self.logger.log(f"批量处理过程中出错: {e}", level='error')
-            st.error(f"批量处理过程中出错: {e}")
-            status_text.error(f"❌ 处理失败: {e}")
+            self.progress['status'] = 'failed'
+            self.progress['error'] = str(e)
+        record_batch_run(self, base_request)
     
-    def _process_batch(self, base_request: CurlRequest, batch_values: List[str], param_key: str, progress_bar, status_text):
-        """处理单个批次的请求"""
-        queue = Queue()
+    def _process_batch(self, base_request: CurlRequest, batch_values: List[str], param_key: str):
+        """处理单个批次的请求：交给进程级共享执行池，按权重与其他任务公平分配并发"""
         for value in batch_values:
-            queue.put(value)
             self.logger.log(f"加入队列: {param_key}={value}")
         
-        # 创建线程池
-        thread_count = min(self.max_threads, len(batch_values))
-        threads = []
-        
         # 添加线程安全保护
-        import threading
         results_lock = threading.Lock()
         errors_lock = threading.Lock()
         files_lock = threading.Lock()
         
-        for _ in range(thread_count):
-            thread = threading.Thread(
-                target=self._worker,
-                args=(queue, base_request, param_key, results_lock, errors_lock, files_lock)
-            )
-            thread.daemon = True
-            thread.start()
-            threads.append(thread)
+        host = urlparse(base_request.url).netloc
+        pool = ExecutionPool.shared()
+        # 本任务的并发仍不超过 max_threads，全局并发和单主机并发由执行池限制
+        # 请求延迟在提交前执行，不占用执行池的工作线程；原先每个并发槽位在请求前等待 request_delay，
+        # 这里按 request_delay / max_threads 的间隔提交，整体速率保持不变
+        interval = self.request_delay / max(1, self.max_threads)
+        with pool.client(f"{param_key}@{host}", self.weight, max_in_flight=self.max_threads) as client:
+            futures = []
+            for value in batch_values:
+                if interval > 0:
+                    time.sleep(interval)
+                futures.append(client.submit(self._worker, value, base_request, param_key,
+                                             results_lock, errors_lock, files_lock, host=host))
+            # 等待本批全部完成（进度由工作线程发布到 monitor，无需轮询）
+            wait(futures)
+        self.progress['current'] = self.monitor.completed
+    
+    def _worker(self, param_value, base_request: CurlRequest, param_key: str, results_lock, errors_lock, files_lock):
+        """执行单个请求（在共享执行池的工作线程中运行）"""
+        if self.skip_value is not None and self.skip_value(param_value):
+            return
         
-        # 监控进度
-        initial_count = len(self.results) + len(self.errors)
-        while any(thread.is_alive() for thread in threads):
-            current_count = len(self.results) + len(self.errors)
-            total_progress = current_count / st.session_state.batch_progress['total']
-            
-            progress_bar.progress(total_progress)
-            status_text.text(f"处理中: {current_count}/{st.session_state.batch_progress['total']} "
-                           f"(成功: {len(self.results)}, 失败: {len(self.errors)})")
-            
-            time.sleep(0.1)
+        # 多参数绑定以 dict 形式入队，结果中用 "k1=v1,k2=v2" 作为参数标签
+        bindings = param_value if isinstance(param_value, dict) else None
+        if bindings is not None:
+            param_value = format_bindings(bindings)
+        log_label = param_value if bindings is not None else f"{param_key}={param_value}"
         
-        # 等待所有线程完成
-        for thread in threads:
-            thread.join()
-    
-    def _worker(self, queue: Queue, base_request: CurlRequest, param_key: str, results_lock, errors_lock, files_lock):
-        """工作线程函数"""
-        while not queue.empty():
-            try:
-                param_value = queue.get_nowait()
-            except:
-                break
+        result = None
+        try:
+            # 修改请求参数
+            modifier = self.request_processor.request_modifier
+            if bindings is not None:
+                modified_request = modifier.modify_request_multi(base_request, bindings)
+            else:
+                modified_request = modifier.modify_request(base_request, param_key, param_value)
             
-            try:
-                # 添加请求延迟
-                time.sleep(self.request_delay)
-                
-                # 修改请求参数
-                modified_request = self.request_processor.request_modifier.modify_request(base_request, param_key, param_value)
-                
-                # 执行请求
-                result = self.request_processor.execute_request(modified_request, param_value)
-                
-                # 处理结果 - 使用线程安全保护
-                if 'error' in result:
-                    with errors_lock:
-                        self.errors.append(result)
-                    self.logger.log(f"请求失败: {param_key}={param_value}, 错误: {result['error']}", level='error')
-                else:
-                    with results_lock:
-                        self.results.append(result)
-                    # 如果是文件下载，添加到下载文件列表
-                    if 'filename' in result:
-                        file_info = {
-                            'param_value': result['param_value'],
-                            'filename': result['filename'],
-                            'size': result['size'],
-                            'timestamp': result.get('timestamp', '')
-                        }
-                        with files_lock:
-                            self.downloaded_files.append(file_info)
-                    self.logger.log(f"请求成功: {param_key}={param_value}, 状态码: {result.get('status_code', 'N/A')}")
-                
-            except Exception as e:
-                error_result = {
-                    'param_value': param_value,
-                    'error': f'请求失败: {str(e)}',
-                    'response_time': 0
-                }
+            # 执行请求
+            self.monitor.record_start()
+            result = self.request_processor.execute_request(modified_request, param_value)
+            if bindings is not None:
+                result['params'] = bindings
+            if self.result_hook is not None:
+                self.result_hook(param_value, result)
+            self.monitor.record_done(result)
+            
+            # 处理结果 - 使用线程安全保护
+            # 元数据写入列，列表中只保存去掉元数据的结果；先写入列再加入列表，读取端取到的结果总能还原元数据
+            if 'error' in result:
+                self.logger.log(f"请求失败: {log_label}, 错误: {result['error']}", level='error')
                 with errors_lock:
-                    self.errors.append(error_result)
-                self.logger.log(f"请求失败: {param_key}={param_value}, 错误: {str(e)}", level='error')
+                    self.errors.append(self.columns.append(result, len(self.errors)))
+            else:
+                self.logger.log(f"请求成功: {log_label}, 状态码: {result.get('status_code', 'N/A')}")
+                # 如果是文件下载，添加到下载文件列表
+                if 'filename' in result:
+                    file_info = {
+                        'param_value': result['param_value'],
+                        'filename': result['filename'],
+                        'size': result.get('size', result.get('content_length', 0)),
+                        'blob': result.get('blob', ''),
+                        'timestamp': result.get('timestamp', '')
+                    }
+                    with files_lock:
+                        self.downloaded_files.append(file_info)
+                with results_lock:
+                    self.results.append(self.columns.append(result, len(self.results)))
             
-            finally:
-                queue.task_done()
+        except Exception as e:
+            error_result = {
+                'param_value': param_value,
+                'error': f'请求失败: {str(e)}',
+                'response_time': 0
+            }
+            if result is None:
+                self.monitor.record_done(error_result)
+            with errors_lock:
+                self.errors.append(self.columns.append(error_result, len(self.errors)))
+            self.logger.log(f"请求失败: {log_label}, 错误: {str(e)}", level='error')
     
     def set_config(self, max_threads: int = None, batch_size: int = None, request_delay: float = None, max_requests: int = None):
         """设置配置参数"""
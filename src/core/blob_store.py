@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内容寻址存储
+响应体和下载文件按 SHA-256 摘要只保存一份：
+- 文件存放在 downloads/.blobs/<前两位>/<摘要><扩展名>，对外的文件名以硬链接指向同一份数据
+- 内存中的响应内容按摘要共享同一个解析结果，重复内容无需再次解析
+每个请求处理器（即每个任务）使用自己的实例，统计和内存中的解析结果按任务隔离；
+磁盘上的存储目录由各实例共用，文件按摘要命名并通过原子重命名写入，可以并发
+"""
+
+import os
+import uuid
+import shutil
+import threading
+from typing import Any, Callable, Dict, Tuple
+from src.utils.utils import Logger
+
+class BlobStore:
+    """内容寻址存储"""
+
+    def __init__(self, root: str = "downloads/.blobs", logger: Logger = None):
+        self.root = root
+        self.logger = logger or Logger()
+        self._lock = threading.Lock()
+        self._contents: Dict[str, Any] = {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        """新一次运行开始时清零统计，并释放上一次运行共享的内存内容"""
+        with self._lock:
+            self._contents.clear()
+            self.stats = {'references': 0, 'unique': 0, 'logical_bytes': 0, 'stored_bytes': 0}
+
+    def _record(self, size: int, is_new: bool):
+        with self._lock:
+            self.stats['references'] += 1
+            self.stats['logical_bytes'] += size
+            if is_new:
+                self.stats['unique'] += 1
+                self.stats['stored_bytes'] += size
+
+    def snapshot(self) -> Dict[str, Any]:
+        """去重统计：引用数、唯一内容数、去重率（重复引用占比）和节省的字节数"""
+        with self._lock:
+            stats = dict(self.stats)
+        references = stats['references']
+        stats['dedup_ratio'] = (1 - stats['unique'] / references) if references else 0.0
+        stats['saved_bytes'] = stats['logical_bytes'] - stats['stored_bytes']
+        return stats
+
+    def blob_path(self, digest: str, ext: str = "") -> str:
+        return os.path.join(self.root, digest[:2], digest + ext)
+
+    def intern(self, digest: str, size: int, factory: Callable[[], Any]) -> Any:
+        """按摘要共享内存中的内容；首次出现时调用 factory 生成（如解析 JSON）"""
+        with self._lock:
+            if digest in self._contents:
+                content = self._contents[digest]
+                is_new = False
+            else:
+                is_new = True
+        if is_new:
+            content = factory()
+            with self._lock:
+                content = self._contents.setdefault(digest, content)
+        self._record(size, is_new)
+        return content
+
+    def adopt(self, path: str, digest: str, ext: str = "") -> Tuple[str, bool]:
+        """
+        把已写好的文件收入存储：内容已存在时删除该文件，否则移动到摘要路径
+        :return: (blob 路径, 是否为新内容)
+        """
+        blob = self.blob_path(digest, ext)
+        size = os.path.getsize(path)
+        if os.path.exists(blob):
+            os.remove(path)
+            is_new = False
+        else:
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            os.replace(path, blob)
+            is_new = True
+        self._record(size, is_new)
+        return blob, is_new
+
+    def reserve(self, digest: str, ext: str = "") -> Tuple[str, str]:
+        """
+        为即将写入的内容准备路径（内容已在内存中并已通过 intern 计入统计、尚未落盘时使用）
+        :return: (blob 路径, 临时文件路径)；内容已存在时临时路径为空，无需写入
+        """
+        blob = self.blob_path(digest, ext)
+        if os.path.exists(blob):
+            return blob, ""
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        return blob, f"{blob}.{uuid.uuid4().hex[:8]}.tmp"
+
+    def link(self, blob: str, path: str):
+        """在 path 处创建指向 blob 的硬链接；文件系统不支持时退回复制"""
+        try:
+            os.link(blob, path)
+        except OSError as e:
+            self.logger.log(f"硬链接失败，改为复制: {path}, 错误: {e}", level='warn')
+            shutil.copyfile(blob, path)
@@ -9,6 +9,10 @@ import re
 import json
 import urllib.parse
 import shlex
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from typing import Dict, List, Optional, Any
 import streamlit as st
@@ -46,9 +50,31 @@ def parse_curl_headers(curl_command: str) -> Dict[str, str]:
 class CurlParser:
     """CURL命令解析器"""
     
+    # 解析结果按命令文本摘要缓存（进程内共享），重复提交同一命令时不再重新解析
+    _parse_cache: 'OrderedDict[str, CurlRequest]' = OrderedDict()
+    _parse_cache_size = 64
+    _parse_lock = threading.Lock()
+    
+    @classmethod
+    def parse(cls, curl_command: str) -> Optional[CurlRequest]:
+        """解析CURL命令并返回请求对象（返回副本，调用方可以直接修改）"""
+        key = hashlib.blake2b(curl_command.encode('utf-8'), digest_size=16).hexdigest()
+        with cls._parse_lock:
+            cached = cls._parse_cache.get(key)
+            if cached is not None:
+                cls._parse_cache.move_to_end(key)
+                return copy.deepcopy(cached)
+        request = cls._parse(curl_command)
+        if request is not None:
+            with cls._parse_lock:
+                cls._parse_cache[key] = copy.deepcopy(request)
+                while len(cls._parse_cache) > cls._parse_cache_size:
+                    cls._parse_cache.popitem(last=False)
+        return request
+    
     @staticmethod
-    def parse(curl_command: str) -> Optional[CurlRequest]:
-        """解析CURL命令并返回请求对象"""
+    def _parse(curl_command: str) -> Optional[CurlRequest]:
+        """解析CURL命令"""
         try:
             # 清理命令格式
             curl_command = re.sub(r'\\\s*\n', ' ', curl_command)
@@ -5,15 +5,33 @@ API批量请求工具主界面
 负责用户界面和流程控制
 """
 
+import os
+import shutil
+import tempfile
+from dataclasses import asdict, replace
 import streamlit as st
-from typing import List
+from typing import List, Optional
 from src.core.curl_parser import CurlParser, CurlRequest
 from src.core.batch_processor import BatchProcessor
+from src.core.pagination_crawler import PaginationCrawler, PaginationConfig
+from src.core.param_sources import (ParamSource, TextParamSource, LineFileParamSource,
+                                    TableColumnParamSource, RangeParamSource,
+                                    RowParamSource, CartesianParamSource)
 from src.core.result_display import ResultDisplay
+from src.core.result_columns import ResultColumns
+from src.core.response_cache import ResponseCache
+from src.core.post_processor import PostProcessPool, ExtractionConfig
+from src.core.execution_pool import ExecutionPool
+from src.core.job_queue import JobQueue
+from src.core.load_generator import LoadGenerator, LoadProfile
+from src.core.run_history import endpoint_key, compare_runs, config_changes
+from src.models.models import RunHistoryDB
 
 class CurlRunner:
     """API批量请求工具主控制器"""
     
+    progress_interval = 0.5  # 进度面板刷新间隔(秒)
+    
     def __init__(self):
         # 初始化组件
         self.parser = CurlParser()
@@ -43,9 +61,17 @@ class CurlRunner:
             st.session_state.downloaded_files = []
         if 'batch_progress' not in st.session_state:
             st.session_state.batch_progress = {'current': 0, 'total': 0, 'batch': 0, 'total_batches': 0}
+        if 'batch_job' not in st.session_state:
+            st.session_state.batch_job = None
 
     def show_interface(self):
         """显示主界面"""
+        self._init_session_state()
+        # 页面对象在会话内复用；后台任务运行期间界面配置改到新的处理器上，不影响正在执行的任务
+        job = st.session_state.batch_job
+        if job is self.batch_processor and job.is_running():
+            self.batch_processor = BatchProcessor()
+        
         st.title('API批量请求工具')
         st.write('粘贴CURL命令，解析后批量执行API请求')
         
@@ -82,6 +108,16 @@ class CurlRunner:
             self._show_request_config()
             self._show_parameter_selection()
         
+        # 进度面板（独立片段，定时刷新）
+        self._show_progress_panel()
+        self._show_load_panel()
+        
+        # 持久化任务队列
+        self._show_job_queue()
+        
+        # 运行历史与对比
+        self._show_run_history()
+        
         # 显示结果
         self._show_results()
     
@@ -93,6 +129,7 @@ class CurlRunner:
                 parsed_request = self.parser.parse(curl_command)
                 if parsed_request:
                     st.session_state.parsed_curl = parsed_request
+                    st.session_state.parsed_curl_command = curl_command
                     st.session_state.available_parameters = self.parser.extract_parameters(parsed_request)
                     
                     # 显示解析结果
@@ -146,6 +183,46 @@ class CurlRunner:
                     st.session_state.max_display_files = st.slider('最大显示文件数:', 10, 100, 30, help="下载文件显示限制")
                 with col2:
                     st.session_state.page_size = st.slider('分页大小:', 5, 50, 20, help="每页显示的结果数量")
+                    use_cache = st.checkbox('启用响应缓存', value=False,
+                                            help="相同请求（方法+URL+请求体）在有效期内直接使用本地缓存，过期后按 ETag/Last-Modified 重新验证")
+                    if use_cache:
+                        cache_ttl = st.slider('缓存有效期(分钟):', 1, 1440, 60)
+                        cache_size = st.slider('缓存容量上限(MB):', 50, 5000, 500)
+                        self.batch_processor.request_processor.cache = ResponseCache.shared(
+                            ttl=cache_ttl * 60, max_size=cache_size * 1024 * 1024)
+                    else:
+                        self.batch_processor.request_processor.cache = None
+                    use_post_process = st.checkbox('启用后处理进程池', value=False,
+                                                   help="设置导出路径后，较大的响应交给独立进程解码并只保留导出路径下的数据，网络线程只负责收发数据")
+                    processor = self.batch_processor.request_processor
+                    if use_post_process:
+                        threshold_kb = st.slider('进程池处理阈值(KB):', 16, 4096, 256,
+                                                 help="小于该大小的响应仍在网络线程内直接解码")
+                        processor.post_processor = PostProcessPool.shared(threshold=threshold_kb * 1024)
+                    else:
+                        processor.post_processor = None
+                    processor.export_path = st.session_state.get('curl_export_path') or None
+                
+                # 采集时提取：预先声明导出路径和字段，响应到达时只保留提取出的行
+                extract = st.checkbox('采集时按路径提取', value=False,
+                                      help="每个响应只保留导出路径下的行和指定字段，完整响应丢弃或归档到磁盘，大幅降低内存占用")
+                if extract:
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        extract_path = st.text_input('提取路径:', value=st.session_state.get('curl_export_path', ''),
+                                                     placeholder="如 data.items，留空取整个响应")
+                        archive = st.checkbox('归档完整响应', value=False, help="完整响应按内容摘要保存到 downloads/.blobs")
+                    with col2:
+                        columns_text = st.text_input('保留字段（逗号分隔，留空保留全部）:', placeholder="如 id, name, user.email")
+                    processor.extraction = ExtractionConfig(
+                        export_path=extract_path.strip(),
+                        columns=[c.strip() for c in columns_text.split(',') if c.strip()],
+                        archive=archive
+                    )
+                    processor.export_path = extract_path.strip() or None
+                    st.session_state['curl_export_path'] = extract_path.strip()
+                else:
+                    processor.extraction = None
                 
                 st.info("💡 性能提示: 结果数量限制已取消，所有结果都会显示")
             
@@ -167,32 +244,53 @@ class CurlRunner:
         st.subheader('📝 参数选择')
         param_keys = list(st.session_state.available_parameters.keys())
         if param_keys:
-            col1, col2 = st.columns([1, 2])
-            with col1:
-                st.session_state.selected_param = st.selectbox('选择要批量替换的参数:', param_keys, index=0)
-            
-            with col2:
-                st.session_state.param_values = st.text_area(
-                    f'输入{st.session_state.selected_param}的批量值 (每行一个):',
-                    height=120,
-                    value="\n".join([f"value{i+1}" for i in range(3)])
-                )
+            replace_mode = st.radio('替换模式:', ['单参数', '多参数组合', '自动分页', '压测'], horizontal=True,
+                                    help="多参数组合：按CSV行或笛卡尔积同时替换多个参数，一个任务覆盖全部组合；"
+                                         "自动分页：读取第一页的总数后并发抓取全部分页；"
+                                         "压测：按固定或爬升的到达率发送请求，统计从计划发送时间算起的延迟")
+            if replace_mode == '自动分页':
+                self._show_pagination_config(param_keys)
+                return
+            if replace_mode == '压测':
+                self._show_load_test_config(param_keys)
+                return
+            if replace_mode == '单参数':
+                col1, col2 = st.columns([1, 2])
+                with col1:
+                    st.session_state.selected_param = st.selectbox('选择要批量替换的参数:', param_keys, index=0)
+                    source_mode = st.radio('参数来源:', ['手动输入', 'CSV/Excel列', '行文件', '数值范围'], horizontal=True)
+                    dedup = st.checkbox('流式去重', value=False, help="跳过重复的参数值，只保存值的摘要")
+                
+                with col2:
+                    param_source = self._build_param_source(source_mode, dedup)
+            else:
+                param_source = self._build_multi_param_source(param_keys)
             
-            # 显示请求数量统计
-            param_list = [v.strip() for v in st.session_state.param_values.split('\n') if v.strip()]
-            if param_list:
-                st.info(f"📊 将执行 {len(param_list)} 个请求，预计分 {max(1, len(param_list) // self.batch_processor.batch_size)} 批处理")
+            # 显示请求数量统计（来源只统计一次，不展开为列表）
+            param_count = self._count_param_source(param_source) if param_source else 0
+            if param_count:
+                st.info(f"📊 将执行约 {param_count} 个请求（{param_source.describe()}），"
+                        f"预计分 {max(1, -(-param_count // self.batch_processor.batch_size))} 批处理")
             
-            if st.button('🚀 开始批量执行', type='primary'):
-                if st.session_state.selected_param and st.session_state.param_values:
-                    param_list = [v.strip() for v in st.session_state.param_values.split('\n') if v.strip()]
-                    if param_list:
-                        # 执行批量请求
+            job = st.session_state.batch_job
+            job_running = job is not None and job.is_running()
+            col1, col2 = st.columns([1, 4])
+            with col2:
+                if st.button('📥 加入任务队列', help="任务保存到本地队列（data/job_queue.db），由服务端按提交顺序执行，关闭页面或重启应用后继续"):
+                    self._enqueue_job(param_source, param_count)
+            with col1:
+                start_clicked = st.button('🚀 开始批量执行', type='primary', disabled=job_running)
+            if start_clicked:
+                if st.session_state.selected_param and param_source is not None:
+                    if param_count:
+                        # 后台执行批量请求，参数按批次从来源中惰性拉取
                         self.batch_processor.run_batch_requests(
                             st.session_state.parsed_curl,
-                            param_list,
+                            param_source,
                             st.session_state.selected_param
                         )
+                        st.session_state.batch_job = self.batch_processor
+                        st.session_state.batch_job_published = False
                     else:
                         st.error('❌ 请输入有效的参数值')
                 else:
@@ -200,24 +298,445 @@ class CurlRunner:
         else:
             st.warning('⚠️ 未检测到可替换参数')
     
+    def _enqueue_job(self, param_source: Optional[ParamSource], param_count: int):
+        """把当前命令、参数来源和执行配置保存到持久化任务队列"""
+        if not (st.session_state.selected_param and param_source is not None and param_count):
+            st.error('❌ 请选择参数并输入批量值')
+            return
+        parsed_request = st.session_state.parsed_curl
+        processor = self.batch_processor
+        options = {
+            'url': parsed_request.url,
+            'method': parsed_request.method,
+            'timeout': parsed_request.timeout,
+            'max_threads': processor.max_threads,
+            'batch_size': processor.batch_size,
+            'request_delay': processor.request_delay,
+        }
+        if processor.request_processor.extraction is not None:
+            options['extraction'] = asdict(processor.request_processor.extraction)
+        # 上传文件的临时副本在换文件或重启后就不存在了，由队列另存一份到任务结束
+        upload = st.session_state.get('param_upload')
+        copy_input = upload is not None and getattr(param_source, 'path', None) == upload[1]
+        try:
+            job_id = JobQueue.shared().enqueue(st.session_state.parsed_curl_command, param_source.to_spec(),
+                                               st.session_state.selected_param, options, copy_input=copy_input)
+        except ValueError as e:
+            st.error(f'❌ 加入队列失败: {e}')
+            return
+        st.success(f'✅ 已加入任务队列，任务ID: {job_id}')
+    
+    def _show_job_queue(self):
+        """持久化任务队列：任务状态、并发任务数和取消排队任务"""
+        queue = JobQueue.shared()
+        jobs = queue.list_jobs()
+        if not jobs:
+            return
+        with st.expander(f"📋 任务队列（执行中 {sum(j.status == 'running' for j in jobs)}，"
+                         f"排队 {sum(j.status == 'queued' for j in jobs)}）", expanded=False):
+            col1, col2 = st.columns([1, 3])
+            with col1:
+                max_running = st.number_input('同时执行任务数:', min_value=1, max_value=10, value=queue.max_running)
+                if max_running != queue.max_running:
+                    queue.set_max_running(int(max_running))
+                queued_ids = [j.id for j in jobs if j.status == 'queued']
+                if queued_ids:
+                    cancel_id = st.selectbox('取消排队任务:', queued_ids)
+                    if st.button('取消任务'):
+                        queue.cancel(cancel_id)
+                        st.rerun()
+                if st.button('🔄 刷新队列'):
+                    st.rerun()
+            with col2:
+                st.dataframe([{
+                    'ID': j.id, '名称': j.name, '状态': j.status, '成功': j.results, '失败': j.errors,
+                    '提交时间': j.created_at, '完成时间': j.finished_at or '', '结果文件': j.output_path,
+                    '错误': j.error or '',
+                } for j in reversed(jobs)], hide_index=True)
+    
+    def _show_load_test_config(self, param_keys: List[str]):
+        """压测配置：到达率（可线性爬升）、持续时间、最大并发和丢弃阈值，参数值可选"""
+        col1, col2 = st.columns(2)
+        with col1:
+            start_rps = st.number_input('起始到达率 (req/s):', min_value=0.1, value=10.0, step=1.0)
+            ramp = st.checkbox('线性爬升', value=False, help="到达率在持续时间内从起始值线性变化到结束值")
+            end_rps = st.number_input('结束到达率 (req/s):', min_value=0.1, value=50.0, step=1.0) if ramp else None
+            duration = st.number_input('持续时间(秒):', min_value=1, value=60)
+        with col2:
+            max_in_flight = st.number_input('最大并发请求数:', min_value=1, max_value=2000, value=100,
+                                            help="并发已满时请求在队列中等待，等待时间计入延迟")
+            drop_after = st.number_input('丢弃阈值(秒):', min_value=0.1, value=1.0, step=0.5,
+                                         help="计划发送时间过去这么久仍未能发出的请求记为丢弃")
+            options = ['(不替换参数)'] + param_keys
+            param_key = st.selectbox('替换参数:', options)
+            values_text = st.text_area('参数值 (每行一个，循环使用):', height=80) if param_key != options[0] else ''
+        
+        load_job = st.session_state.get('load_job')
+        load_running = load_job is not None and load_job.is_running()
+        col1, col2 = st.columns([1, 4])
+        with col1:
+            start_clicked = st.button('🚀 开始压测', type='primary', disabled=load_running)
+        with col2:
+            if load_running and st.button('⏹️ 停止压测'):
+                load_job.stop()
+        if start_clicked:
+            profile = LoadProfile(start_rps=float(start_rps), end_rps=float(end_rps) if end_rps else None,
+                                  duration=float(duration), max_in_flight=int(max_in_flight), drop_after=float(drop_after))
+            generator = LoadGenerator()
+            values = TextParamSource(values_text) if param_key != options[0] else None
+            generator.run_load(st.session_state.parsed_curl, profile,
+                               param_key if values is not None else "", values)
+            st.session_state.load_job = generator
+    
+    def _show_load_panel(self):
+        """压测面板；运行期间定时刷新"""
+        job = st.session_state.get('load_job')
+        if job is None:
+            return
+        run_every = self.progress_interval if job.is_running() else None
+        st.fragment(self._render_load_panel, run_every=run_every)()
+    
+    def _render_load_panel(self):
+        job = st.session_state.load_job
+        stats = job.snapshot()
+        st.subheader('📈 压测结果')
+        col1, col2, col3, col4, col5, col6 = st.columns(6)
+        col1.metric("目标 (req/s)", f"{stats['target_rps']:.1f}")
+        col2.metric("实际 (req/s)", f"{stats['recent_rps']:.1f}", help=f"全程平均 {stats['achieved_rps']:.1f} req/s")
+        col3.metric("P50 延迟", f"{stats['latency_ms'][50.0]:.0f}ms")
+        col4.metric("P99 延迟", f"{stats['latency_ms'][99.0]:.0f}ms")
+        col5.metric("丢弃", stats['dropped'])
+        col6.metric("失败", stats['failed'])
+        st.caption(f"计划 {stats['scheduled']} ｜ 已发送 {stats['sent']} ｜ 完成 {stats['completed']} ｜ 进行中 {stats['in_flight']} ｜ "
+                   f"接收 {stats['total_bytes'] / 1024 / 1024:.1f} MB ｜ 用时 {stats['elapsed']:.0f}s")
+        if stats['errors']:
+            st.caption("错误分布: " + " ｜ ".join(f"{name} {n}" for name, n in sorted(stats['errors'].items(), key=lambda item: -item[1])))
+        st.dataframe([{
+            '百分位': f"{p:g}%", '延迟(ms，自计划时间)': stats['latency_ms'][p], '服务时间(ms，自实际发送)': stats['service_ms'][p]
+        } for p in stats['latency_ms']], hide_index=True)
+        if not job.is_running():
+            if job.progress['status'] == 'failed':
+                st.error(f"❌ 压测失败: {job.progress['error']}")
+            curve = job.percentile_curves()
+            if curve and stats['completed']:
+                import pandas as pd
+                frame = pd.DataFrame(curve)
+                # 横轴取 1/(1-百分位)，尾部展开显示
+                frame['尾部 (1/(1-p))'] = [1 / max(1e-6, 1 - p / 100) for p in frame['percentile']]
+                st.line_chart(frame.set_index('尾部 (1/(1-p))')[['latency_ms', 'service_ms']])
+    
+    def _show_run_history(self):
+        """运行历史：按接口列出历次运行，对比两次运行并标记性能退化"""
+        if not os.path.exists("data/run_history.db"):
+            return
+        db = RunHistoryDB()
+        endpoints = db.get_endpoints()
+        if not endpoints:
+            return
+        with st.expander("📊 运行历史与对比", expanded=False):
+            parsed = st.session_state.parsed_curl
+            current_endpoint = endpoint_key(parsed) if parsed else None
+            names = [endpoint for endpoint, _ in endpoints]
+            index = names.index(current_endpoint) if current_endpoint in names else 0
+            endpoint = st.selectbox('接口:', names, index=index,
+                                    format_func=lambda e: f"{e}（{dict(endpoints)[e]} 次）")
+            runs = db.get_runs(endpoint)
+            st.dataframe([{
+                'ID': r.id, '时间': r.created_at, '类型': r.kind, '状态': r.status, '请求数': r.requests,
+                '吞吐(req/s)': round(r.rps, 1), 'P50(ms)': round(r.p50_ms, 1), 'P95(ms)': round(r.p95_ms, 1),
+                'P99(ms)': round(r.p99_ms, 1), '错误率': f"{r.error_rate:.1%}", '用时(s)': round(r.duration, 1),
+                '数据量(MB)': round(r.total_bytes / 1024 / 1024, 2),
+                '配置': ', '.join(f"{k}={v}" for k, v in r.config.items()),
+            } for r in runs], hide_index=True)
+            if len(runs) < 2:
+                return
+            
+            labels = {r.id: f"#{r.id} {r.created_at} ({r.kind}, {r.rps:.1f} req/s)" for r in runs}
+            col1, col2, col3 = st.columns([2, 2, 1])
+            with col1:
+                current_id = st.selectbox('当前运行:', [r.id for r in runs], index=0, format_func=labels.get)
+            by_id = {r.id: r for r in runs}
+            # 只与同类型的运行对比（批量、分页、压测的负载模型不同，指标不可比）
+            candidates = [r.id for r in runs if r.kind == by_id[current_id].kind and r.id != current_id]
+            with col2:
+                if not candidates:
+                    st.info(f"没有其他 {by_id[current_id].kind} 类型的运行可作为基准")
+                    return
+                baseline_id = st.selectbox('基准运行:', candidates, index=0, format_func=labels.get)
+            with col3:
+                tolerance = st.slider('退化阈值:', 5, 100, 20, format="%d%%", help="吞吐下降或延迟上升超过该比例时标记为退化") / 100
+            baseline, current = by_id[baseline_id], by_id[current_id]
+            rows = compare_runs(baseline, current, tolerance)
+            st.dataframe([{
+                '指标': row['metric'],
+                '基准': f"{row['baseline']:.1%}" if row['metric'] == '错误率' else round(row['baseline'], 1),
+                '当前': f"{row['current']:.1%}" if row['metric'] == '错误率' else round(row['current'], 1),
+                '变化': f"{row['change'] * 100:+.1f} 个百分点" if row['metric'] == '错误率' else f"{row['change']:+.1%}",
+                '结论': '⚠️ 退化' if row['regression'] else '✅',
+            } for row in rows], hide_index=True)
+            regressions = [row['metric'] for row in rows if row['regression']]
+            if regressions:
+                st.warning(f"⚠️ 相比基准运行 #{baseline.id}，以下指标退化: {', '.join(regressions)}")
+            else:
+                st.success(f"✅ 相比基准运行 #{baseline.id} 未发现退化")
+            changes = config_changes(baseline, current)
+            if changes:
+                st.caption("配置差异: " + " ｜ ".join(f"{k}: {a} → {b}" for k, (a, b) in changes.items()))
+            if current.error_counts:
+                st.caption("当前运行错误分布: " + " ｜ ".join(f"{k} {v}" for k, v in current.error_counts.items()))
+    
+    def _show_pagination_config(self, param_keys: List[str]):
+        """自动分页配置：页码参数、每页条数、数据列表路径和总数路径"""
+        def default_index(options, keyword):
+            return next((i for i, k in enumerate(options) if keyword.lower() in k.lower()), 0)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            page_key = st.selectbox('页码参数:', param_keys, index=default_index(param_keys, 'pageIndex'))
+            size_options = ['(不设置)'] + param_keys
+            page_size_key = st.selectbox('每页条数参数:', size_options, index=default_index(size_options, 'pageSize'))
+            current_size = st.session_state.available_parameters.get(page_size_key, '20')
+            page_size = st.number_input('每页条数:', min_value=1, value=int(current_size) if str(current_size).isdigit() else 20)
+            start_page = st.number_input('起始页码:', min_value=0, value=1)
+        with col2:
+            items_path = st.text_input('数据列表路径:', value='resultValue.items', help="每页数据所在路径，遇到空列表即停止")
+            total_path = st.text_input('总数路径 (可选):', value='resultValue.total', help="留空时按线程数逐波探测，直到出现空页")
+            total_is_pages = st.checkbox('总数路径给出的是总页数', value=False)
+            has_next_path = st.text_input('是否有下一页路径 (可选):', value='')
+            max_pages = st.number_input('最多抓取页数:', min_value=1, value=1000)
+        
+        job = st.session_state.batch_job
+        job_running = job is not None and job.is_running()
+        if st.button('🚀 开始分页抓取', type='primary', disabled=job_running):
+            if not items_path.strip():
+                st.error('❌ 请填写数据列表路径')
+                return
+            config = PaginationConfig(
+                page_key=page_key,
+                items_path=items_path.strip(),
+                total_path=total_path.strip(),
+                total_is_pages=total_is_pages,
+                has_next_path=has_next_path.strip(),
+                page_size=int(page_size),
+                page_size_key='' if page_size_key == '(不设置)' else page_size_key,
+                start_page=int(start_page),
+                max_pages=int(max_pages)
+            )
+            crawler = PaginationCrawler(config)
+            crawler.set_config(
+                max_threads=self.batch_processor.max_threads,
+                batch_size=self.batch_processor.batch_size,
+                request_delay=self.batch_processor.request_delay
+            )
+            crawler.request_processor.cache = self.batch_processor.request_processor.cache
+            crawler.request_processor.post_processor = self.batch_processor.request_processor.post_processor
+            crawler.request_processor.export_path = config.items_path
+            extraction = self.batch_processor.request_processor.extraction
+            # 分页抓取时提取的行就是每页的数据列表
+            crawler.request_processor.extraction = replace(extraction, export_path=config.items_path) if extraction else None
+            crawler.run_paginated_requests(st.session_state.parsed_curl)
+            st.session_state.batch_job = crawler
+            st.session_state.batch_job_published = False
+            # 导出时直接按数据列表路径合并各页
+            st.session_state['curl_export_path'] = config.items_path
+            st.session_state['export_path_input'] = config.items_path
+    
+    def _build_param_source(self, source_mode: str, dedup: bool) -> Optional[ParamSource]:
+        """根据所选来源构建惰性参数来源"""
+        selected_param = st.session_state.selected_param
+        if source_mode == '手动输入':
+            st.session_state.param_values = st.text_area(
+                f'输入{selected_param}的批量值 (每行一个):',
+                height=120,
+                value="\n".join([f"value{i+1}" for i in range(3)])
+            )
+            return TextParamSource(st.session_state.param_values, dedup=dedup)
+        
+        if source_mode == '数值范围':
+            col1, col2, col3 = st.columns(3)
+            start = col1.number_input('起始值', value=1, step=1)
+            stop = col2.number_input('结束值(包含)', value=100, step=1)
+            step = col3.number_input('步长', value=1, min_value=1, step=1)
+            fmt = st.text_input('格式', value='{}', help="Python格式串，如 {:05d} 生成 00001")
+            return RangeParamSource(int(start), int(stop) + 1, int(step), fmt)
+        
+        file_types = ['csv', 'xlsx'] if source_mode == 'CSV/Excel列' else ['txt', 'csv']
+        uploaded = st.file_uploader(f'上传{source_mode}文件', type=file_types, key=f"param_upload_{source_mode}")
+        local_path = st.text_input('或填写服务器本地文件路径:', key=f"param_path_{source_mode}").strip()
+        # 上传文件落盘一次，之后按路径流式读取
+        path = self._resolve_param_file(uploaded, local_path)
+        if not path:
+            return None
+        
+        if source_mode == '行文件':
+            return LineFileParamSource(path, dedup=dedup)
+        try:
+            columns = TableColumnParamSource.read_columns(path)
+        except Exception as e:
+            st.error(f'❌ 读取表头失败: {e}')
+            return None
+        if not columns:
+            st.error('❌ 文件没有表头')
+            return None
+        column = st.selectbox('选择参数列:', columns)
+        return TableColumnParamSource(path, column, dedup=dedup)
+    
+    def _build_multi_param_source(self, param_keys: List[str]) -> Optional[ParamSource]:
+        """构建多参数绑定来源：CSV/Excel 按行绑定，或多个值列表的笛卡尔积"""
+        selected_keys = st.multiselect('选择要同时替换的参数:', param_keys)
+        if not selected_keys:
+            return None
+        st.session_state.selected_param = ','.join(selected_keys)
+        source_mode = st.radio('组合方式:', ['CSV/Excel按行', '笛卡尔积'], horizontal=True)
+        
+        if source_mode == '笛卡尔积':
+            axes = {}
+            cols = st.columns(len(selected_keys))
+            for col, key in zip(cols, selected_keys):
+                with col:
+                    text = st.text_area(f'{key} 的值 (每行一个):', height=120, key=f"cartesian_{key}")
+                    axes[key] = TextParamSource(text)
+            return CartesianParamSource(axes)
+        
+        uploaded = st.file_uploader('上传CSV/Excel文件', type=['csv', 'xlsx'], key="param_upload_rows")
+        local_path = st.text_input('或填写服务器本地文件路径:', key="param_path_rows").strip()
+        path = self._resolve_param_file(uploaded, local_path)
+        if not path:
+            return None
+        try:
+            columns = TableColumnParamSource.read_columns(path)
+        except Exception as e:
+            st.error(f'❌ 读取表头失败: {e}')
+            return None
+        column_map = {}
+        cols = st.columns(len(selected_keys))
+        for col, key in zip(cols, selected_keys):
+            with col:
+                default = columns.index(key) if key in columns else 0
+                column_map[key] = st.selectbox(f'{key} 对应列:', columns, index=default, key=f"row_column_{key}")
+        return RowParamSource(path, column_map)
+    
+    def _resolve_param_file(self, uploaded, local_path: str) -> Optional[str]:
+        """上传文件落盘一次后返回路径；否则校验本地路径"""
+        if uploaded is not None:
+            cached = st.session_state.get('param_upload')
+            if not cached or cached[0] != uploaded.file_id:
+                # 换了上传文件后删除上一个临时副本
+                if cached and os.path.exists(cached[1]):
+                    os.remove(cached[1])
+                suffix = os.path.splitext(uploaded.name)[1]
+                with tempfile.NamedTemporaryFile('wb', suffix=suffix, delete=False) as f:
+                    shutil.copyfileobj(uploaded, f, 1024 * 1024)
+                cached = (uploaded.file_id, f.name)
+                st.session_state['param_upload'] = cached
+            return cached[1]
+        if local_path:
+            if not os.path.isfile(local_path):
+                st.error('❌ 文件不存在，请检查路径')
+                return None
+            return local_path
+        return None
+    
+    def _count_param_source(self, param_source: ParamSource) -> int:
+        """统计参数数量，文件来源按 (路径, 修改时间) 缓存，避免每次刷新都扫描文件"""
+        path = getattr(param_source, 'path', None)
+        if path is None:
+            return param_source.count() or 0
+        cache_key = (param_source.describe(), path, os.path.getmtime(path))
+        cached = st.session_state.get('param_source_count')
+        if not cached or cached[0] != cache_key:
+            cached = (cache_key, param_source.count() or 0)
+            st.session_state['param_source_count'] = cached
+        return cached[1]
+    
+    def _show_progress_panel(self):
+        """显示进度面板；任务运行期间只有该片段按固定间隔刷新"""
+        job = st.session_state.batch_job
+        if job is None:
+            return
+        run_every = self.progress_interval if job.is_running() else None
+        st.fragment(self._render_progress, run_every=run_every)()
+    
+    def _render_progress(self):
+        """进度面板片段：读取工作线程发布的完成事件，显示滚动吞吐统计"""
+        job = st.session_state.batch_job
+        progress = job.progress
+        st.session_state.batch_progress = progress
+        stats = job.monitor.snapshot()
+        current, failed = stats['completed'], stats['failed']
+        success = current - failed
+        total = progress['total'] or 1
+        
+        st.progress(min(1.0, current / total))
+        col1, col2, col3, col4, col5, col6 = st.columns(6)
+        col1.metric("吞吐 (req/s)", f"{stats['requests_per_second']:.1f}")
+        col2.metric("进行中", stats['in_flight'])
+        col3.metric("P95 延迟", f"{stats['p95_ms']:.0f}ms" if stats['p95_ms'] is not None else "-")
+        col4.metric("错误率", f"{stats['error_rate']:.1%}")
+        col5.metric("下载速率", f"{stats['bytes_per_second'] / 1024:.1f} KB/s")
+        col6.metric("预计剩余", f"{stats['eta_seconds']:.0f}s" if stats['eta_seconds'] is not None and job.is_running() else "-")
+        if stats['dropped_events']:
+            st.caption(f"⚠️ 界面刷新跟不上完成速度，已丢弃 {stats['dropped_events']} 个完成事件，滚动吞吐、P95 和错误率偏低（累计计数不受影响）")
+        if job.request_processor.cache is not None:
+            cache_stats = job.request_processor.cache_stats
+            st.caption(f"缓存: 命中 {cache_stats['hit']} ｜ 未命中 {cache_stats['miss']} ｜ "
+                       f"重新验证 {cache_stats['revalidated']} ｜ 合并请求 {cache_stats['coalesced']}")
+        blob_stats = job.request_processor.blob_store.snapshot()
+        if blob_stats['references']:
+            st.caption(f"内容去重: 响应 {blob_stats['references']} ｜ 唯一内容 {blob_stats['unique']} ｜ "
+                       f"去重率 {blob_stats['dedup_ratio']:.1%} ｜ 节省 {blob_stats['saved_bytes'] / 1024 / 1024:.1f} MB")
+        disk_stats = job.request_processor.download_manager.write_stats_snapshot()
+        if disk_stats['total_bytes']:
+            st.caption(f"磁盘写入: {disk_stats['bytes_per_second'] / 1024 / 1024:.1f} MB/s ｜ "
+                       f"队列 {disk_stats['queue_depth']}/{disk_stats['queue_capacity']} ｜ "
+                       f"写入线程繁忙 {disk_stats['utilization']:.0%} ｜ 背压等待 {disk_stats['blocked_seconds']:.1f}s")
+        pool_stats = ExecutionPool.shared().stats()
+        if job.is_running():
+            st.caption(f"共享执行池: 执行中 {pool_stats['active']}/{pool_stats['max_workers']} ｜ 排队 {pool_stats['queued']} ｜ "
+                       f"并行任务 {len(pool_stats['clients'])} ｜ 单主机上限 {pool_stats['per_host']}")
+        if job.is_running():
+            st.text(f"处理批次 {progress['batch']}/{progress['total_batches']} ｜ 处理中: {current}/{progress['total']} "
+                    f"(成功: {success}, 失败: {failed})")
+            return
+        
+        if progress['status'] == 'failed':
+            st.error(f"❌ 处理失败: {progress['error']}")
+        else:
+            st.success(f'✅ 处理完成! 成功: {success}, 失败: {failed}'
+                       + (f", 去重跳过: {progress['skipped']}" if progress.get('skipped') else ''))
+        
+        # 任务结束后只发布一次结果，并整页刷新一次让结果和导出片段加载新数据
+        if not st.session_state.get('batch_job_published'):
+            st.session_state['curl_results'] = job.results.copy()
+            st.session_state['curl_errors'] = job.errors.copy()
+            st.session_state['curl_result_columns'] = job.columns
+            st.session_state['downloaded_files'] = job.downloaded_files.copy()
+            st.session_state['batch_job_published'] = True
+            st.rerun()
+    
     def _show_results(self):
         """显示结果"""
         results = st.session_state.get('curl_results', [])
         errors = st.session_state.get('curl_errors', [])
         downloaded_files = st.session_state.get('downloaded_files', [])
+        columns = st.session_state.get('curl_result_columns')
         
         # 始终显示结果区域
         st.subheader('📊 执行结果')
         
         if results or errors:
-            # 显示结果
-            self.result_display.show_results(results, errors, downloaded_files)
+            # 显示结果（独立片段：选中行、翻页只刷新本区域）
+            st.fragment(self.result_display.show_results)(results, errors, downloaded_files, columns)
             
-            # 显示导出界面
+            # 显示导出界面（独立片段）
             is_download_request = st.session_state.parsed_curl.download_file if st.session_state.parsed_curl else False
-            self.result_display.show_export_interface(results, is_download_request)
+            st.fragment(self._show_export_panel)(results, is_download_request, columns)
         else:
             st.info("暂无执行结果，请先执行批量请求")
-        
-        # 始终显示分析界面
+            # 始终显示分析界面
+            self.result_display.show_analysis_interface(results, columns)
+    
+    def _show_export_panel(self, results: List, is_download_request: bool, columns: Optional[ResultColumns] = None):
+        """导出与分析片段"""
+        self.result_display.show_export_interface(results, is_download_request, columns)
         self.result_display.show_analysis_interface(results)
\ No newline at end of file
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+磁盘写入阶段
+网络线程只把收到的数据块交给有界队列，由独立的写入线程落盘，
+队列写满时网络线程阻塞等待（背压），磁盘吞吐单独统计
+"""
+
+import os
+import time
+import queue
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+from src.utils.utils import Logger
+
+class WriteStats:
+    """一组写入的统计（整个写入线程池，或单个任务打开的文件），由写入线程更新"""
+    
+    def __init__(self, window: float = 10.0):
+        self.window = window
+        self._lock = threading.Lock()
+        self._events = deque()
+        self.total_bytes = 0
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.started_at = time.time()
+    
+    def record_write(self, finished: float, size: int, busy: float):
+        with self._lock:
+            self.busy_seconds += busy
+            if size:
+                self.total_bytes += size
+                self._events.append((finished, size))
+    
+    def record_blocked(self, seconds: float):
+        with self._lock:
+            self.blocked_seconds += seconds
+    
+    def snapshot(self, workers: int) -> Dict[str, Any]:
+        """滚动写入速率、累计字节数、写入线程繁忙度和背压等待时间"""
+        now = time.time()
+        with self._lock:
+            cutoff = now - self.window
+            while self._events and self._events[0][0] < cutoff:
+                self._events.popleft()
+            window_bytes = sum(event[1] for event in self._events)
+            elapsed = max(now - self.started_at, 1e-6)
+            span = min(self.window, max(elapsed, 1.0))
+            return {
+                'bytes_per_second': window_bytes / span,
+                'total_bytes': self.total_bytes,
+                'utilization': min(1.0, self.busy_seconds / (elapsed * workers)),
+                'blocked_seconds': self.blocked_seconds,
+            }
+
+class WriteSink:
+    """
+    单个文件的写入端
+    - write() 在网络线程中调用，数据先攒到缓冲区，满一批后带上文件偏移量入队
+    - 批次带绝对偏移量，多个写入线程并发处理同一文件时顺序无关
+    - close() 提交剩余数据，等待（或不等待）所有批次落盘后关闭文件，可选原子重命名和完成回调
+    - 写入失败时把错误信息追加到 errors 列表，由打开方在 flush 时统一检查；stats 为打开方自己的写入统计
+    """
+    
+    def __init__(self, writer: 'DiskWriter', path: str, offset: int = 0, truncate: bool = True,
+                 final_path: Optional[str] = None, on_close: Optional[Callable[[], None]] = None,
+                 errors: Optional[List[str]] = None, stats: Optional[WriteStats] = None):
+        self.writer = writer
+        self.path = path
+        self.final_path = final_path
+        self.on_close = on_close
+        self.errors = errors
+        self.stats = stats
+        self.offset = offset
+        self.bytes_written = 0
+        flags = os.O_WRONLY | os.O_CREAT | getattr(os, 'O_BINARY', 0)
+        if truncate:
+            flags |= os.O_TRUNC
+        self.fd = os.open(path, flags, 0o644)
+        self.error: Optional[BaseException] = None
+        self._buffer: List[bytes] = []
+        self._buffered = 0
+        self._pending = 0
+        self._closed = False
+        self._finished = threading.Event()
+        self._lock = threading.Lock()
+    
+    def write(self, data: bytes):
+        """缓冲写入；缓冲区满一批时交给写入线程"""
+        if self.error is not None:
+            raise self.error
+        if not data:
+            return
+        self._buffer.append(data)
+        self._buffered += len(data)
+        if self._buffered >= self.writer.batch_size:
+            self._submit()
+    
+    def _submit(self):
+        if not self._buffer:
+            return
+        chunks, size = self._buffer, self._buffered
+        self._buffer, self._buffered = [], 0
+        with self._lock:
+            self._pending += 1
+        self.writer.submit(self, self.offset, chunks)
+        self.offset += size
+    
+    def _batch_done(self, size: int, error: Optional[BaseException]):
+        """写入线程完成一批后回调；最后一批完成且已关闭时收尾"""
+        with self._lock:
+            self._pending -= 1
+            self.bytes_written += size
+            if error is not None and self.error is None:
+                self.error = error
+            finish = self._closed and self._pending == 0
+        if finish:
+            self._finish()
+    
+    def close(self, wait: bool = True):
+        """
+        提交剩余数据并关闭
+        :param wait: True 时等待全部落盘，出错则抛出；False 时立即返回，由写入线程收尾
+        """
+        self._submit()
+        with self._lock:
+            self._closed = True
+            finish = self._pending == 0
+        if finish:
+            self._finish()
+        if wait:
+            self.wait()
+    
+    def wait(self):
+        """等待全部落盘并完成收尾，出错则抛出"""
+        self._finished.wait()
+        if self.error is not None:
+            raise self.error
+    
+    def _finish(self):
+        try:
+            os.close(self.fd)
+            if self.error is None and self.final_path:
+                os.replace(self.path, self.final_path)
+            if self.error is None and self.on_close is not None:
+                self.on_close()
+        except Exception as e:
+            if self.error is None:
+                self.error = e
+        if self.error is not None:
+            message = f"{self.final_path or self.path}: {self.error}"
+            self.writer.logger.log(f"写入文件失败: {message}", level='error')
+            if self.errors is not None:
+                self.errors.append(message)
+        self._finished.set()
+
+class DiskWriter:
+    """
+    写入线程池
+    - 队列有界（按批次计），写满时 submit() 阻塞，网络读取随之放慢
+    - 优先使用 os.pwritev 一次系统调用写入整批数据块，不支持时退回 seek + write
+    - 进程内共享一个实例（shared），避免每个请求处理器各自启动写入线程；
+      除整体统计外，写入量也计入打开文件的任务自己的统计（WriteStats），任务之间互不影响
+    """
+    
+    _shared: Optional['DiskWriter'] = None
+    _shared_lock = threading.Lock()
+    
+    def __init__(self, workers: int = 2, max_pending: int = 16, batch_size: int = 4 * 1024 * 1024,
+                 window: float = 10.0, logger: Optional[Logger] = None):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.window = window
+        self.logger = logger or Logger()
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._threads: List[threading.Thread] = []
+        self._start_lock = threading.Lock()
+        self.totals = WriteStats(window)
+    
+    @classmethod
+    def shared(cls) -> 'DiskWriter':
+        """获取进程内共享的写入线程池"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+    
+    def open(self, path: str, offset: int = 0, truncate: bool = True, final_path: Optional[str] = None,
+             on_close: Optional[Callable[[], None]] = None, errors: Optional[List[str]] = None,
+             stats: Optional[WriteStats] = None) -> WriteSink:
+        """打开写入端；offset 为首个字节在文件中的位置（分段或续传时使用）"""
+        self._ensure_started()
+        return WriteSink(self, path, offset, truncate, final_path, on_close, errors, stats)
+    
+    def _ensure_started(self):
+        if self._threads:
+            return
+        with self._start_lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"disk-writer-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+    
+    def submit(self, sink: WriteSink, offset: int, chunks: List[bytes]):
+        """入队一批数据；队列满时阻塞，阻塞时间计入背压统计"""
+        item = (sink, offset, chunks)
+        try:
+            self._queue.put_nowait(item)
+            return
+        except queue.Full:
+            pass
+        waited_from = time.time()
+        self._queue.put(item)
+        blocked = time.time() - waited_from
+        self.totals.record_blocked(blocked)
+        if sink.stats is not None:
+            sink.stats.record_blocked(blocked)
+    
+    def flush(self):
+        """等待已入队的数据全部落盘（任务结束、发布结果前调用）"""
+        self._queue.join()
+    
+    def _run(self):
+        while True:
+            sink, offset, chunks = self._queue.get()
+            try:
+                size = sum(len(chunk) for chunk in chunks)
+                error = None
+                started = time.time()
+                try:
+                    if sink.error is None:
+                        self._write_at(sink.fd, offset, chunks)
+                except Exception as e:
+                    error = e
+                finished = time.time()
+                written = size if error is None else 0
+                self.totals.record_write(finished, written, finished - started)
+                if sink.stats is not None:
+                    sink.stats.record_write(finished, written, finished - started)
+                sink._batch_done(size if error is None else 0, error)
+            except Exception as e:
+                # 任何异常都不能让写入线程退出，否则 flush() 会一直等待
+                self.logger.log(f"写入线程处理失败: {e}", level='error')
+            finally:
+                self._queue.task_done()
+    
+    @staticmethod
+    def _write_at(fd: int, offset: int, chunks: List[bytes]):
+        if hasattr(os, 'pwritev'):
+            while chunks:
+                written = os.pwritev(fd, chunks, offset)
+                offset += written
+                # 处理部分写入：跳过已写完的块，截掉写了一半的块
+                while chunks and written >= len(chunks[0]):
+                    written -= len(chunks[0])
+                    chunks = chunks[1:]
+                if chunks and written:
+                    chunks = [memoryview(chunks[0])[written:]] + chunks[1:]
+        else:
+            os.lseek(fd, offset, os.SEEK_SET)
+            for chunk in chunks:
+                view = memoryview(chunk)
+                while view:
+                    view = view[os.write(fd, view):]
+    
+    def stats(self, scope: Optional[WriteStats] = None) -> Dict[str, Any]:
+        """磁盘写入统计：scope 为空时是整个写入线程池，否则是某个任务的写入；附带当前队列深度"""
+        stats = (scope or self.totals).snapshot(self.workers)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['queue_capacity'] = self.max_pending
+        return stats
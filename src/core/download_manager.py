@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件下载管理
+支持 Range 分段并行下载、断点续传、预分配文件和大块写入，
+下载完成后校验大小与摘要，再通过临时文件原子重命名为不冲突的文件名
+"""
+
+import os
+import re
+import json
+import uuid
+import base64
+import hashlib
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from src.utils.utils import Logger
+from src.core.disk_writer import DiskWriter, WriteSink, WriteStats
+
+class DownloadError(Exception):
+    """下载或校验失败"""
+
+class DownloadManager:
+    """下载管理器"""
+    
+    # 正在下载的部分文件标识（进程内所有下载管理器共享同一下载目录）
+    _active_keys = set()
+    _active_lock = threading.Lock()
+    
+    def __init__(self, download_dir: str = "downloads", logger: Optional[Logger] = None):
+        self.download_dir = download_dir
+        self.partial_dir = os.path.join(download_dir, ".partial")
+        self.chunk_size = 1024 * 1024               # 单次写入 1MB
+        self.segment_size = 8 * 1024 * 1024         # 每段 8MB
+        self.max_segments = 4                       # 单个文件最多并行段数
+        self.min_parallel_size = 16 * 1024 * 1024   # 超过 16MB 才分段并行
+        self.logger = logger or Logger()
+        self.writer = DiskWriter.shared()           # 落盘交给独立的写入线程
+        self.write_errors: List[str] = []           # 本管理器打开的文件中写入失败的记录
+        self.write_stats = WriteStats()             # 本管理器（所属任务）的写入统计
+        self._meta_lock = threading.Lock()
+    
+    def unique_path(self, prefix: str, param_value: Any, ext: str) -> str:
+        """生成不冲突的文件名：毫秒时间戳 + 随机后缀"""
+        if not os.path.exists(self.download_dir):
+            os.makedirs(self.download_dir)
+        safe_value = re.sub(r'[\\/:*?"<>|\s]+', '_', str(param_value))[:80]
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+        return os.path.join(self.download_dir, f"{prefix}_{safe_value}_{timestamp}_{uuid.uuid4().hex[:8]}{ext}")
+    
+    def _partial_paths(self, key: str):
+        if not os.path.exists(self.partial_dir):
+            os.makedirs(self.partial_dir)
+        base = os.path.join(self.partial_dir, key)
+        return base + ".part", base + ".meta"
+    
+    def _load_meta(self, meta_path: str) -> Dict[str, Any]:
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _save_meta(self, meta_path: str, meta: Dict[str, Any]):
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+    
+    def open_sink(self, path: str, **kwargs) -> WriteSink:
+        """打开写入端；写入量计入本管理器的统计，写入失败记录到本管理器，在 flush() 时统一检查"""
+        return self.writer.open(path, errors=self.write_errors, stats=self.write_stats, **kwargs)
+    
+    def reset_stats(self):
+        """新一次运行开始时清零本管理器的写入统计（共享的写入线程池不受影响）"""
+        self.write_stats = WriteStats()
+    
+    def write_stats_snapshot(self) -> Dict[str, Any]:
+        return self.writer.stats(self.write_stats)
+    
+    def flush(self):
+        """等待写入线程落盘；本管理器有文件写入失败时抛出 DownloadError"""
+        self.writer.flush()
+        errors = self.write_errors[:]
+        del self.write_errors[:len(errors)]
+        if errors:
+            raise DownloadError(f"{len(errors)} 个文件写入失败: {errors[0]}")
+    
+    def download(self, response, reopen: Callable[[Dict[str, str]], Any], key: str, final_path: str,
+                 on_stored: Optional[Callable[[str, str], None]] = None) -> Dict[str, Any]:
+        """
+        下载响应体到 final_path
+        网络线程读完并校验后即返回，文件由写入线程落盘；落盘并重命名后调用 on_stored(final_path, sha256)
+        :param response: 已发出的流式响应（首个请求）
+        :param reopen: 以附加请求头重新发起同一请求，用于 Range 分段和续传
+        :param key: 请求的稳定标识，用于定位未完成的部分文件
+        :return: {'size', 'sha256', 'segments', 'resumed'}
+        """
+        with self._active_lock:
+            # 相同请求同时下载时（参数值重复），后来者使用独立的部分文件，不参与续传
+            duplicate = key in self._active_keys
+            if duplicate:
+                key = f"{key}-{uuid.uuid4().hex[:8]}"
+            self._active_keys.add(key)
+        part_path, meta_path = self._partial_paths(key)
+        try:
+            return self._download(response, reopen, key, part_path, meta_path, final_path, on_stored)
+        except Exception:
+            self._release(key)
+            if duplicate:
+                for path in (part_path, meta_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+            raise
+    
+    def _release(self, key: str):
+        with self._active_lock:
+            self._active_keys.discard(key)
+    
+    def _download(self, response, reopen, key: str, part_path: str, meta_path: str, final_path: str,
+                  on_stored) -> Dict[str, Any]:
+        total = int(response.headers.get('content-length') or 0) or None
+        validator = response.headers.get('etag') or response.headers.get('last-modified') or ''
+        # 压缩传输时 Content-Length 是压缩后的长度，而落盘的是解压后的内容：
+        # 不校验长度，也不做 Range 分段和续传（Range 偏移针对压缩后的字节）
+        identity = response.headers.get('content-encoding', 'identity').strip().lower() in ('', 'identity')
+        accept_ranges = identity and response.headers.get('accept-ranges', '').lower() == 'bytes'
+        expected = total if identity else None
+        
+        meta = self._load_meta(meta_path)
+        same_resource = bool(meta) and meta.get('total') == total and meta.get('validator') == validator and os.path.exists(part_path)
+        if not same_resource:
+            meta = {'total': total, 'validator': validator, 'done': []}
+            for path in (part_path, meta_path):
+                if os.path.exists(path):
+                    os.remove(path)
+        
+        def store(sha256: str):
+            # 部分文件落盘、重命名之后才释放标识，此前相同请求不会复用该部分文件
+            try:
+                os.replace(part_path, final_path)
+                if os.path.exists(meta_path):
+                    os.remove(meta_path)
+            finally:
+                self._release(key)
+            if on_stored is not None:
+                on_stored(final_path, sha256)
+        
+        if accept_ranges and total and total >= self.min_parallel_size:
+            response.close()
+            segments = self._download_segments(reopen, part_path, meta_path, meta, total, validator)
+            # 分段乱序到达，摘要只能在全部落盘后读取文件计算
+            size, sha256 = self._verify(part_path, expected, response.headers)
+            store(sha256)
+            return {'size': size, 'sha256': sha256, 'segments': segments, 'resumed': same_resource}
+        
+        offset = os.path.getsize(part_path) if accept_ranges and same_resource else 0
+        if offset:
+            response.close()
+            headers = {'Range': f'bytes={offset}-', 'Accept-Encoding': 'identity'}
+            if validator:
+                headers['If-Range'] = validator
+            response = reopen(headers)
+            if response.status_code != 206:
+                # 服务器返回了完整内容，重新开始
+                offset = 0
+        self._save_meta(meta_path, meta)
+        sink = self.open_sink(part_path, offset=offset, truncate=not offset)
+        if offset:
+            # 续传：等已有部分和新数据全部落盘后读取整个文件校验
+            self.copy_to_sink(response, sink)
+            sink.close()
+            size, sha256 = self._verify(part_path, expected, response.headers)
+            store(sha256)
+            return {'size': size, 'sha256': sha256, 'segments': 1, 'resumed': True}
+        
+        # 顺序下载：边读边算摘要，校验通过后不等待落盘，由写入线程收尾
+        sha256, md5 = hashlib.sha256(), hashlib.md5()
+        size = self.copy_to_sink(response, sink, sha256, md5)
+        try:
+            self._check(size, expected, response.headers, sha256, md5)
+        except DownloadError:
+            sink.close()
+            for path in (part_path, meta_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            raise
+        digest = sha256.hexdigest()
+        sink.on_close = lambda: store(digest)
+        sink.close(wait=False)
+        return {'size': size, 'sha256': digest, 'segments': 1, 'resumed': False}
+    
+    def copy_to_sink(self, response, sink: WriteSink, *hashers) -> int:
+        """
+        把响应体交给写入线程；网络线程只负责读取（可顺带计算摘要），不等待落盘
+        由调用方关闭写入端；读取出错时提交已读数据后关闭（不等待）并抛出
+        """
+        written = 0
+        try:
+            for chunk in response.iter_content(chunk_size=self.chunk_size):
+                if chunk:
+                    for hasher in hashers:
+                        hasher.update(chunk)
+                    sink.write(chunk)
+                    written += len(chunk)
+        except Exception:
+            sink.close(wait=False)
+            raise
+        return written
+    
+    def _download_segments(self, reopen, part_path, meta_path, meta, total, validator) -> int:
+        """按 Range 分段并行下载到预分配文件，每段落盘后记录到 meta，便于续传"""
+        segment_size = max(self.segment_size, -(-total // 64))
+        ranges = [(i, start, min(start + segment_size, total) - 1)
+                  for i, start in enumerate(range(0, total, segment_size))]
+        if not os.path.exists(part_path):
+            with open(part_path, 'wb') as f:
+                f.truncate(total)
+        meta['segment_size'] = segment_size
+        self._save_meta(meta_path, meta)
+        
+        pending = [r for r in ranges if r[0] not in set(meta.get('done', []))]
+        errors: List[str] = []
+        sinks: List[WriteSink] = []
+        
+        def segment_stored(index):
+            with self._meta_lock:
+                meta['done'].append(index)
+                self._save_meta(meta_path, meta)
+        
+        def fetch_segments():
+            while True:
+                with self._meta_lock:
+                    if not pending or errors:
+                        return
+                    index, start, end = pending.pop(0)
+                try:
+                    headers = {'Range': f'bytes={start}-{end}', 'Accept-Encoding': 'identity'}
+                    if validator:
+                        headers['If-Range'] = validator
+                    segment_response = reopen(headers)
+                    if segment_response.status_code != 206:
+                        raise DownloadError(f"服务器未按Range返回分段: 状态码 {segment_response.status_code}")
+                    sink = self.open_sink(part_path, offset=start, truncate=False)
+                    written = self.copy_to_sink(segment_response, sink)
+                    if written != end - start + 1:
+                        sink.close(wait=False)
+                        raise DownloadError(f"分段 {index} 大小不符: {written}/{end - start + 1}")
+                    # 不等待落盘，继续下载下一段；落盘后再记为完成
+                    sink.on_close = lambda index=index: segment_stored(index)
+                    sink.close(wait=False)
+                    with self._meta_lock:
+                        sinks.append(sink)
+                except Exception as e:
+                    with self._meta_lock:
+                        errors.append(str(e))
+        
+        workers = [threading.Thread(target=fetch_segments, daemon=True)
+                   for _ in range(min(self.max_segments, len(pending)))]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        for sink in sinks:
+            try:
+                sink.wait()
+            except Exception as e:
+                errors.append(str(e))
+        if errors:
+            raise DownloadError(f"分段下载失败（已完成的分段会在重试时续传）: {errors[0]}")
+        return len(ranges)
+    
+    def _check(self, size: int, total: Optional[int], headers, sha256, md5=None):
+        """按读取的字节数和边读边算的摘要校验大小、Content-MD5 和 Digest"""
+        if total is not None and size != total:
+            raise DownloadError(f"文件大小不符: {size}/{total}")
+        expected_md5 = headers.get('content-md5')
+        if expected_md5 and md5 is not None and base64.b64encode(md5.digest()).decode() != expected_md5.strip():
+            raise DownloadError("Content-MD5 校验失败")
+        digest_header = headers.get('digest', '')
+        match = re.search(r'sha-256=([A-Za-z0-9+/=]+)', digest_header, re.IGNORECASE)
+        if match and base64.b64encode(sha256.digest()).decode() != match.group(1):
+            raise DownloadError("Digest SHA-256 校验失败")
+    
+    def _verify(self, part_path: str, total: Optional[int], headers) -> tuple:
+        """读取已落盘的文件，校验大小并计算 SHA-256；服务器提供 Content-MD5 / Digest 时一并比对"""
+        size = os.path.getsize(part_path)
+        sha256 = hashlib.sha256()
+        md5 = hashlib.md5()
+        with open(part_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(self.chunk_size), b''):
+                sha256.update(chunk)
+                md5.update(chunk)
+        self._check(size, total, headers, sha256, md5)
+        return size, sha256.hexdigest()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进程级共享执行池
+所有会话和任务的请求都由同一组工作线程执行：
+- 全局并发上限（max_workers）和单个目标主机的并发上限（per_host），服务器和上游接口的负载都有界
+- 每个批量任务是一个客户端（PoolClient），按权重公平调度（步幅调度）：
+  每派发一个请求，客户端的虚拟时间增加 1/权重，总是先派发虚拟时间最小的客户端，大任务不会饿死小任务
+- 客户端还可以限制自身的并发数（对应界面上的最大线程数）
+"""
+
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from src.utils.utils import Logger
+
+class PoolClient:
+    """执行池中的一个客户端（一个批量任务），持有自己的待执行队列"""
+
+    def __init__(self, pool: 'ExecutionPool', name: str, weight: float, max_in_flight: Optional[int]):
+        self.pool = pool
+        self.name = name
+        self.weight = max(weight, 0.01)
+        self.max_in_flight = max_in_flight
+        self.pending: Deque[Tuple[str, Callable, tuple, Future]] = deque()
+        self.in_flight = 0
+        self.completed = 0
+        self.virtual_time = 0.0
+        self.closed = False
+
+    def submit(self, fn: Callable, *args, host: str = "") -> Future:
+        """提交一个请求；host 为目标主机，用于单主机并发限制"""
+        future: Future = Future()
+        self.pool._enqueue(self, (host, fn, args, future))
+        return future
+
+    def close(self):
+        """注销客户端，尚未开始的请求被取消"""
+        self.pool._unregister(self)
+
+    def __enter__(self) -> 'PoolClient':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class ExecutionPool:
+    """
+    共享执行池，进程内共享一个实例（shared）
+    工作线程按需启动；调小 max_workers 后多余的线程只是空闲等待
+    """
+
+    _shared: Optional['ExecutionPool'] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_workers: int = 32, per_host: int = 10, logger: Optional[Logger] = None):
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.logger = logger or Logger()
+        self._cond = threading.Condition()
+        self._clients: List[PoolClient] = []
+        self._hosts: Dict[str, int] = {}
+        self._active = 0
+        self._threads: List[threading.Thread] = []
+
+    @classmethod
+    def shared(cls, **kwargs) -> 'ExecutionPool':
+        """获取进程内共享的执行池，并更新并发上限等设置"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(**kwargs)
+            elif kwargs:
+                with cls._shared._cond:
+                    for name, value in kwargs.items():
+                        setattr(cls._shared, name, value)
+                    cls._shared._cond.notify_all()
+            return cls._shared
+
+    def client(self, name: str, weight: float = 1.0, max_in_flight: Optional[int] = None) -> PoolClient:
+        """注册客户端；新客户端从当前最小虚拟时间起步，不会因为来得晚而积累大量额度"""
+        client = PoolClient(self, name, weight, max_in_flight)
+        with self._cond:
+            client.virtual_time = min((c.virtual_time for c in self._clients), default=0.0)
+            self._clients.append(client)
+        return client
+
+    def _unregister(self, client: PoolClient):
+        with self._cond:
+            client.closed = True
+            if client in self._clients:
+                self._clients.remove(client)
+            pending, client.pending = client.pending, deque()
+        for _, _, _, future in pending:
+            future.cancel()
+
+    def _enqueue(self, client: PoolClient, task: Tuple[str, Callable, tuple, Future]):
+        with self._cond:
+            if client.closed:
+                raise RuntimeError(f"执行池客户端已关闭: {client.name}")
+            client.pending.append(task)
+            self._ensure_workers()
+            self._cond.notify()
+
+    def _ensure_workers(self):
+        while len(self._threads) < self.max_workers:
+            thread = threading.Thread(target=self._run, name=f"exec-pool-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _pick(self) -> Optional[Tuple[PoolClient, Tuple[str, Callable, tuple, Future]]]:
+        """选出虚拟时间最小、未达自身并发上限且目标主机未满的客户端（调用方持有锁）"""
+        if self._active >= self.max_workers:
+            return None
+        chosen = None
+        for client in self._clients:
+            if not client.pending:
+                continue
+            if client.max_in_flight is not None and client.in_flight >= client.max_in_flight:
+                continue
+            host = client.pending[0][0]
+            if host and self._hosts.get(host, 0) >= self.per_host:
+                continue
+            if chosen is None or client.virtual_time < chosen.virtual_time:
+                chosen = client
+        if chosen is None:
+            return None
+        task = chosen.pending.popleft()
+        chosen.in_flight += 1
+        chosen.virtual_time += 1.0 / chosen.weight
+        host = task[0]
+        if host:
+            self._hosts[host] = self._hosts.get(host, 0) + 1
+        self._active += 1
+        return chosen, task
+
+    def _run(self):
+        while True:
+            with self._cond:
+                picked = self._pick()
+                while picked is None:
+                    self._cond.wait()
+                    picked = self._pick()
+            client, (host, fn, args, future) = picked
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args))
+                except BaseException as e:
+                    future.set_exception(e)
+            with self._cond:
+                client.in_flight -= 1
+                client.completed += 1
+                if host:
+                    self._hosts[host] -= 1
+                    if not self._hosts[host]:
+                        del self._hosts[host]
+                self._active -= 1
+                # 释放的名额可能满足多个等待条件（全局、主机、客户端）
+                self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """执行池状态：活跃请求数、排队数、各主机并发和各客户端情况"""
+        with self._cond:
+            return {
+                'max_workers': self.max_workers,
+                'per_host': self.per_host,
+                'active': self._active,
+                'queued': sum(len(c.pending) for c in self._clients),
+                'hosts': dict(self._hosts),
+                'clients': [{'name': c.name, 'weight': c.weight, 'in_flight': c.in_flight,
+                             'queued': len(c.pending), 'completed': c.completed} for c in self._clients],
+            }
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量任务 HTTP 接口
+供调度系统等程序无需浏览器即可提交批量请求：
+- POST /jobs                 提交任务，返回任务ID
+- GET  /jobs                 任务列表和共享执行池状态
+- GET  /jobs/<id>            任务状态、进度计数和吞吐统计
+- GET  /jobs/<id>/results    以 NDJSON 流式返回结果（?follow=0 只返回当前已有的结果）
+- POST /queue                加入持久化任务队列（请求体同 POST /jobs，可选 name），按提交顺序执行
+- GET  /queue                队列中的任务及状态
+- DELETE /queue/<id>         取消排队中的任务
+"""
+
+import json
+from dataclasses import asdict
+from flask import Flask, Response, jsonify, request, stream_with_context
+from src.core.job_manager import JobManager
+from src.core.execution_pool import ExecutionPool
+from src.core.job_queue import JobQueue
+
+def create_app(manager: JobManager = None, queue: JobQueue = None) -> Flask:
+    """创建接口应用；manager 为空时按默认并发上限创建，queue 为空时不提供队列接口"""
+    app = Flask(__name__)
+    app.json.ensure_ascii = False
+    manager = manager or JobManager()
+    app.config['JOB_MANAGER'] = manager
+
+    @app.post('/jobs')
+    def submit_job():
+        """
+        请求体：{"curl": "...", "param_key": "id", "source": {...}, "options": {...}}
+        source 格式见 job_manager.build_param_source
+        """
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            return jsonify({'error': '请求体必须是 JSON 对象'}), 400
+        try:
+            job = manager.submit(body.get('curl', ''), body.get('source') or {},
+                                 body.get('param_key', ''), body.get('options'))
+        except (ValueError, OSError) as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({'job_id': job.id, 'status': job.status}), 202
+
+    @app.get('/jobs')
+    def list_jobs():
+        return jsonify({'jobs': manager.list_jobs(), **manager.stats(), 'pool': ExecutionPool.shared().stats()})
+
+    @app.get('/jobs/<job_id>')
+    def job_status(job_id):
+        job = manager.get(job_id)
+        if job is None:
+            return jsonify({'error': '任务不存在'}), 404
+        return jsonify(job.describe())
+
+    @app.get('/jobs/<job_id>/results')
+    def job_results(job_id):
+        job = manager.get(job_id)
+        if job is None:
+            return jsonify({'error': '任务不存在'}), 404
+        follow = request.args.get('follow', '1').lower() not in ('0', 'false', 'no')
+
+        def generate():
+            for record in job.iter_records(follow=follow):
+                yield json.dumps(record, ensure_ascii=False, default=str) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    if queue is None:
+        return app
+
+    @app.post('/queue')
+    def enqueue_job():
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            return jsonify({'error': '请求体必须是 JSON 对象'}), 400
+        try:
+            job_id = queue.enqueue(body.get('curl', ''), body.get('source') or {}, body.get('param_key', ''),
+                                   body.get('options'), body.get('name', ''))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({'queue_id': job_id, 'status': 'queued'}), 202
+
+    @app.get('/queue')
+    def list_queue():
+        try:
+            limit = int(request.args.get('limit', 100))
+            if limit < 1:
+                raise ValueError
+        except ValueError:
+            return jsonify({'error': 'limit 必须是正整数'}), 400
+        jobs = []
+        for job in queue.list_jobs(limit):
+            info = asdict(job)
+            info.pop('curl')
+            # 执行中的任务可以通过 /jobs/<job_id> 查看实时进度
+            info['job_id'] = queue.running.get(job.id) or None
+            jobs.append(info)
+        return jsonify({'jobs': jobs, 'max_running': queue.max_running})
+
+    @app.delete('/queue/<int:queue_id>')
+    def cancel_queued(queue_id):
+        if not queue.cancel(queue_id):
+            return jsonify({'error': '任务不存在或已开始执行'}), 409
+        return jsonify({'queue_id': queue_id, 'status': 'cancelled'})
+
+    return app
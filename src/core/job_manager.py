@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量任务管理
+供 HTTP 接口等非界面调用方使用：按 ID 登记批量任务，限制同时执行的任务数，
+超出的任务排队等待；每个任务仍由独立的 BatchProcessor 在后台线程中执行
+"""
+
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional
+from src.core.curl_parser import CurlParser, CurlRequest
+from src.core.batch_processor import BatchProcessor
+from src.core.post_processor import ExtractionConfig
+from src.core.param_sources import (
+    ParamSource, TextParamSource, RangeParamSource, LineFileParamSource,
+    TableColumnParamSource, RowParamSource, CartesianParamSource
+)
+from src.utils.utils import Logger
+
+def build_param_source(spec: Dict[str, Any]) -> ParamSource:
+    """
+    按描述构建参数来源
+    - {"type": "values", "values": [...]} / {"type": "text", "text": "每行一个"}
+    - {"type": "range", "start": 1, "stop": 100, "step": 1, "format": "{}"}（stop 包含在内）
+    - {"type": "lines", "path": ..., "encoding": "utf-8"} / {"type": "column", "path": ..., "column": ...}
+    - {"type": "rows", "path": ..., "columns": {参数key: 列名}} / {"type": "cartesian", "axes": {参数key: [...]}}
+    可选 "dedup": true 流式去重（values / text / lines / column）
+    """
+    if not isinstance(spec, dict):
+        raise ValueError("source 必须是对象")
+    kind = spec.get('type', 'values')
+    dedup = bool(spec.get('dedup', False))
+    if kind == 'values':
+        values = spec.get('values')
+        if not isinstance(values, list):
+            raise ValueError("values 必须是数组")
+        return TextParamSource("\n".join(str(v) for v in values), dedup=dedup)
+    if kind == 'text':
+        return TextParamSource(str(spec.get('text', '')), dedup=dedup)
+    if kind == 'range':
+        try:
+            start, stop, step = int(spec['start']), int(spec['stop']), int(spec.get('step', 1))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("range 需要整数 start、stop（可选 step）")
+        if step < 1:
+            raise ValueError("step 必须大于 0")
+        return RangeParamSource(start, stop + 1, step, str(spec.get('format', '{}')))
+    if kind in ('lines', 'column', 'rows'):
+        path = spec.get('path')
+        if not path:
+            raise ValueError(f"{kind} 需要 path")
+        if kind == 'lines':
+            return LineFileParamSource(path, spec.get('encoding', 'utf-8'), dedup=dedup)
+        if kind == 'column':
+            if not spec.get('column'):
+                raise ValueError("column 需要 column")
+            return TableColumnParamSource(path, spec['column'], dedup=dedup)
+        columns = spec.get('columns')
+        if not isinstance(columns, dict) or not columns:
+            raise ValueError("rows 需要 columns（参数key -> 列名）")
+        return RowParamSource(path, columns)
+    if kind == 'cartesian':
+        axes = spec.get('axes')
+        if not isinstance(axes, dict) or not axes:
+            raise ValueError("cartesian 需要 axes（参数key -> 值数组）")
+        return CartesianParamSource({key: [str(v) for v in values] for key, values in axes.items()})
+    raise ValueError(f"不支持的参数来源类型: {kind}")
+
+class Job:
+    """单个批量任务：请求模板、参数来源和执行它的 BatchProcessor"""
+
+    def __init__(self, job_id: str, request: CurlRequest, source: ParamSource, param_key: str,
+                 processor: BatchProcessor, source_type: str):
+        self.id = job_id
+        self.request = request
+        self.source = source
+        self.param_key = param_key
+        self.processor = processor
+        self.source_type = source_type
+        self.status = 'queued'
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ('done', 'failed')
+
+    def describe(self) -> Dict[str, Any]:
+        """任务状态：进度计数、结果数量和吞吐统计"""
+        processor = self.processor
+        info: Dict[str, Any] = {
+            'job_id': self.id,
+            'status': self.status,
+            'error': self.error,
+            'param_key': self.param_key,
+            'source': self.source_type,
+            'url': self.request.url,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+        if self.status != 'queued':
+            # monitor.snapshot 只允许单个读取端，多个客户端同时查询时串行化
+            with self._lock:
+                throughput = processor.monitor.snapshot()
+            info['progress'] = dict(processor.progress)
+            info['counters'] = {
+                'results': len(processor.results),
+                'errors': len(processor.errors),
+                'downloaded_files': len(processor.downloaded_files),
+            }
+            info['throughput'] = throughput
+        return info
+
+    def iter_records(self, follow: bool = True, poll_interval: float = 0.2) -> Iterator[Dict[str, Any]]:
+        """
+        逐条产出结果（type=result）和错误（type=error）
+        :param follow: True 时持续等待新结果直到任务结束；False 时只返回当前已有的结果
+        """
+        sent_results = sent_errors = 0
+        while True:
+            # 先记录状态再读取列表，保证任务结束后的最后一批结果不会漏掉
+            finished = self.finished
+            results = self.processor.results
+            errors = self.processor.errors
+            columns = self.processor.columns  # 参数值、状态码等元数据从结果列还原
+            while sent_results < len(results):
+                yield {'type': 'result', **columns.restore(results[sent_results], True, sent_results)}
+                sent_results += 1
+            while sent_errors < len(errors):
+                yield {'type': 'error', **columns.restore(errors[sent_errors], False, sent_errors)}
+                sent_errors += 1
+            if finished or not follow:
+                return
+            time.sleep(poll_interval)
+
+class JobManager:
+    """
+    批量任务管理器
+    - 同时执行的任务数不超过 max_running，其余任务排队等待
+    - 最多保留 max_jobs 个任务，超出时丢弃最早结束的任务及其结果
+    """
+
+    def __init__(self, max_running: int = 2, max_jobs: int = 100, logger: Optional[Logger] = None):
+        self.max_running = max_running
+        self.max_jobs = max_jobs
+        self.logger = logger or Logger()
+        self.jobs: 'OrderedDict[str, Job]' = OrderedDict()
+        self._slots = threading.Semaphore(max_running)
+        self._lock = threading.Lock()
+
+    def submit(self, curl_command: str, source: Dict[str, Any], param_key: str = "",
+               options: Optional[Dict[str, Any]] = None) -> Job:
+        """
+        提交批量任务，立即返回；参数错误时抛出 ValueError
+        :param options: 可选 max_threads、batch_size、request_delay、timeout、weight（共享执行池中的调度权重）、
+                        url / method（覆盖命令中的值），
+                        以及 extraction {"export_path", "columns", "archive"}
+        """
+        request = CurlParser.parse(curl_command or "")
+        if request is None:
+            raise ValueError("CURL命令解析失败")
+        param_source = build_param_source(source)
+        multi = isinstance(param_source, (RowParamSource, CartesianParamSource))
+        if not multi and not param_key:
+            raise ValueError("缺少 param_key")
+        if multi:
+            # 多参数绑定时参数key只用于日志
+            param_key = ','.join(source.get('columns') or source.get('axes'))
+        processor = self._build_processor(request, options or {})
+        job = Job(uuid.uuid4().hex[:12], request, param_source, param_key, processor, source.get('type', 'values'))
+        with self._lock:
+            self.jobs[job.id] = job
+            self._evict()
+        threading.Thread(target=self._run_job, args=(job,), name=f"job-{job.id}", daemon=True).start()
+        self.logger.log(f"提交批量任务 {job.id}: {request.method} {request.url}, 参数来源: {param_source.describe()}")
+        return job
+
+    @staticmethod
+    def _build_processor(request: CurlRequest, options: Dict[str, Any]) -> BatchProcessor:
+        processor = BatchProcessor()
+        try:
+            processor.max_threads = max(1, int(options.get('max_threads', processor.max_threads)))
+            processor.batch_size = max(1, int(options.get('batch_size', processor.batch_size)))
+            processor.request_delay = max(0.0, float(options.get('request_delay', processor.request_delay)))
+            processor.weight = max(0.01, float(options.get('weight', processor.weight)))
+            if 'timeout' in options:
+                request.timeout = max(1, int(options['timeout']))
+            # 界面上修改过的 URL 和请求方法覆盖命令中的值
+            if options.get('url'):
+                request.url = str(options['url'])
+            if options.get('method'):
+                request.method = str(options['method']).upper()
+        except (TypeError, ValueError):
+            raise ValueError("options 中的数值无效")
+        extraction = options.get('extraction')
+        if extraction:
+            if not isinstance(extraction, dict):
+                raise ValueError("extraction 必须是对象")
+            config = ExtractionConfig(
+                export_path=str(extraction.get('export_path', '')).strip(),
+                columns=[str(c) for c in extraction.get('columns') or []],
+                archive=bool(extraction.get('archive', False))
+            )
+            processor.request_processor.extraction = config
+            processor.request_processor.export_path = config.export_path or None
+        return processor
+
+    def _evict(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        while len(self.jobs) > self.max_jobs and finished:
+            del self.jobs[finished.pop(0)]
+
+    def _run_job(self, job: Job):
+        """排队等待执行名额，执行完毕后释放"""
+        with self._slots:
+            job.status = 'running'
+            job.started_at = time.time()
+            processor = job.processor
+            try:
+                processor.run_batch_requests(job.request, job.source, job.param_key)
+                processor._job_thread.join()
+                job.status = processor.progress['status']
+                job.error = processor.progress.get('error')
+            except Exception as e:
+                self.logger.log(f"批量任务 {job.id} 执行失败: {e}", level='error')
+                job.status = 'failed'
+                job.error = str(e)
+            job.finished_at = time.time()
+        self.logger.log(f"批量任务 {job.id} 结束: {job.status}")
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            jobs = list(self.jobs.values())
+        return [{'job_id': job.id, 'status': job.status, 'url': job.request.url, 'created_at': job.created_at}
+                for job in jobs]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            statuses = [job.status for job in self.jobs.values()]
+        return {
+            'max_running': self.max_running,
+            'running': statuses.count('running'),
+            'queued': statuses.count('queued'),
+            'total': len(statuses),
+        }
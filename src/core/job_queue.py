@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+持久化任务队列
+任务定义和状态保存在 data/job_queue.db，按提交顺序执行，同时执行的任务数可配置：
+- 任务由服务进程内的调度线程执行，不依赖浏览器页面是否打开
+- 结果逐条追加到 data/job_results/<任务ID>.ndjson，任务中途退出时已完成的结果仍然保留
+- 应用重启后，上次未执行完的任务重新排队并从头执行
+- 界面上传的参数文件在加入队列时复制到 data/job_inputs，任务结束或取消后删除
+"""
+
+import os
+import json
+import time
+import uuid
+import shutil
+import threading
+from typing import Any, Dict, List, Optional
+from src.core.curl_parser import CurlParser
+from src.core.job_manager import JobManager, build_param_source
+from src.models.models import JobQueueDB, QueuedJob
+from src.utils.utils import Logger
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class JobQueue:
+    """
+    任务队列调度器，进程内共享一个实例（shared）
+    调度线程在有空闲名额时按提交顺序取出任务，交给 JobManager 执行
+    """
+
+    _shared: Optional['JobQueue'] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, db_path: str = "data/job_queue.db", max_running: int = 1,
+                 output_dir: str = "data/job_results", manager: Optional[JobManager] = None,
+                 poll_interval: float = 5.0, logger: Optional[Logger] = None, input_dir: str = "data/job_inputs"):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        os.makedirs(output_dir, exist_ok=True)
+        os.makedirs(input_dir, exist_ok=True)
+        self.db = JobQueueDB(db_path)
+        self.max_running = max_running
+        self.output_dir = output_dir
+        self.input_dir = os.path.abspath(input_dir)
+        # 并发由队列自己控制，管理器不再额外限制
+        self.manager = manager or JobManager(max_running=64)
+        self.poll_interval = poll_interval
+        self.logger = logger or Logger()
+        self.running: Dict[int, str] = {}  # 队列任务ID -> JobManager 任务ID
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def shared(cls, **kwargs) -> 'JobQueue':
+        """获取进程内共享的任务队列并确保调度线程已启动"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(**kwargs)
+                cls._shared.start()
+            return cls._shared
+
+    def start(self):
+        """把上次未执行完的任务重新排队，然后启动调度线程"""
+        if self._thread is not None:
+            return
+        requeued = self.db.requeue_orphans(_pid_alive)
+        if requeued:
+            self.logger.log(f"任务队列: {requeued} 个未完成的任务重新排队")
+        self._thread = threading.Thread(target=self._dispatch_loop, name="job-queue", daemon=True)
+        self._thread.start()
+
+    def set_max_running(self, max_running: int):
+        """调整同时执行的任务数，调大后立即补充执行"""
+        self.max_running = max(1, max_running)
+        self._wakeup.set()
+
+    def enqueue(self, curl_command: str, source: Dict[str, Any], param_key: str = "",
+                options: Optional[Dict[str, Any]] = None, name: str = "", copy_input: bool = False) -> int:
+        """
+        加入队列；先校验命令和参数来源，参数错误时抛出 ValueError
+        :param copy_input: 参数文件是临时文件（如界面上传的副本）时设为 True，复制到 input_dir 保存到任务结束
+        """
+        request = CurlParser.parse(curl_command or "")
+        if request is None:
+            raise ValueError("CURL命令解析失败")
+        if copy_input and source.get('path'):
+            source = dict(source, path=self._copy_input(source['path']))
+        try:
+            build_param_source(source)
+            job_id = self.db.add_job(name or request.url, curl_command, param_key, source, options or {})
+        except Exception:
+            self._release_input(source)
+            raise
+        self.logger.log(f"任务队列: 加入任务 {job_id} {name or request.url}")
+        self._wakeup.set()
+        return job_id
+
+    def cancel(self, job_id: int) -> bool:
+        cancelled = self.db.cancel_job(job_id)
+        if cancelled:
+            self._release_input(self.db.get_job(job_id).source)
+        return cancelled
+
+    def _copy_input(self, path: str) -> str:
+        """把参数文件复制到 input_dir，返回副本路径"""
+        if not os.path.isfile(path):
+            raise ValueError(f"参数文件不存在: {path}")
+        target = os.path.join(self.input_dir, f"{uuid.uuid4().hex}{os.path.splitext(path)[1]}")
+        shutil.copyfile(path, target)
+        return target
+
+    def _release_input(self, source: Dict[str, Any]):
+        """删除任务在 input_dir 中的参数文件副本；其他路径的文件不受影响"""
+        path = source.get('path')
+        if path and os.path.dirname(os.path.abspath(path)) == self.input_dir and os.path.exists(path):
+            os.remove(path)
+
+    def list_jobs(self, limit: int = 100) -> List[QueuedJob]:
+        return self.db.list_jobs(limit)
+
+    def _dispatch_loop(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                while len(self.running) < self.max_running:
+                    queued = self.db.claim_next(os.getpid())
+                    if queued is None:
+                        break
+                    with self._lock:
+                        self.running[queued.id] = ""
+                    threading.Thread(target=self._execute, args=(queued,), name=f"queued-job-{queued.id}", daemon=True).start()
+            except Exception as e:
+                self.logger.log(f"任务队列调度失败: {e}", level='error')
+            self._wakeup.wait(self.poll_interval)
+
+    def _execute(self, queued: QueuedJob):
+        """执行一个队列任务，结果逐条写入 NDJSON 文件，定期把计数写回数据库"""
+        output_path = os.path.join(self.output_dir, f"{queued.id}.ndjson")
+        results = errors = 0
+        try:
+            job = self.manager.submit(queued.curl, queued.source, queued.param_key, queued.options)
+            with self._lock:
+                self.running[queued.id] = job.id
+            self.logger.log(f"任务队列: 开始执行任务 {queued.id}（{job.id}）")
+            last_update = time.time()
+            with open(output_path, 'w', encoding='utf-8') as f:
+                for record in job.iter_records():
+                    f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                    if record['type'] == 'error':
+                        errors += 1
+                    else:
+                        results += 1
+                    if time.time() - last_update >= self.poll_interval:
+                        f.flush()
+                        self.db.update_progress(queued.id, results, errors, output_path)
+                        last_update = time.time()
+            self.db.finish_job(queued.id, job.status, results, errors, output_path, job.error)
+            self.logger.log(f"任务队列: 任务 {queued.id} 结束: {job.status}, 成功 {results}, 失败 {errors}")
+        except Exception as e:
+            self.logger.log(f"任务队列: 任务 {queued.id} 执行失败: {e}", level='error')
+            self.db.finish_job(queued.id, 'failed', results, errors, output_path, str(e))
+        finally:
+            self._release_input(queued.source)
+            with self._lock:
+                self.running.pop(queued.id, None)
+            self._wakeup.set()
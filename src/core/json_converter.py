@@ -5,15 +5,22 @@ JSON转Excel转换工具
 独立的JSON数据转换功能
 """
 
+import os
+import shutil
+import tempfile
 import streamlit as st
 from datetime import datetime
 from typing import Dict, List, Any
-from src.utils.utils import json_to_excel, get_by_path, parse_multi_json
+from src.utils.utils import (json_to_excel, get_by_path, iter_multi_json,
+                             JsonFileIndex, write_rows_streaming)
 from src.models.models import JsonStructureDB
 
 class JsonConverter:
     """JSON转Excel转换器"""
     
+    preview_records = 5  # 文件模式下预览的记录数
+    max_inline_download = 100 * 1024 * 1024  # 超过该大小的导出文件只保存到本地，不提供浏览器下载
+    
     def __init__(self):
         try:
             self.db = JsonStructureDB()
@@ -48,6 +55,19 @@ class JsonConverter:
         """显示JSON输入界面"""
         st.subheader('📝 JSON数据输入')
         
+        input_mode = st.radio(
+            "输入方式:",
+            ["粘贴文本", "上传文件", "本地文件路径"],
+            horizontal=True,
+            help="大文件（数百MB）请使用本地文件路径，避免经浏览器传输"
+        )
+        if input_mode == "粘贴文本":
+            self._show_text_input()
+        else:
+            self._show_file_input(input_mode)
+    
+    def _show_text_input(self):
+        """显示文本粘贴输入"""
         # 示例按钮
         if st.button("📋 插入示例JSON"):
             example_json = '''{
@@ -72,9 +92,21 @@ class JsonConverter:
         if st.button('🔍 解析JSON'):
             if json_str.strip():
                 try:
-                    json_data = parse_multi_json(json_str)
+                    # 单次流式解析：只保留第一个文档用于预览，其余只计数
+                    json_data = None
+                    doc_count = 0
+                    for doc in iter_multi_json(json_str):
+                        if doc_count == 0:
+                            json_data = doc
+                        doc_count += 1
+                    if doc_count == 0:
+                        raise ValueError('无法识别的JSON格式，请检查输入！')
                     st.session_state['json_data'] = json_data
-                    st.success('✅ JSON解析成功！')
+                    st.session_state['json_doc_count'] = doc_count
+                    st.session_state['json_source'] = 'text'
+                    st.session_state.pop('json_file_index', None)
+                    self._replace_upload_file(None)
+                    st.success(f'✅ JSON解析成功！共 {doc_count} 个文档')
                     
                     # 显示数据结构预览
                     self._show_data_preview(json_data)
@@ -83,6 +115,76 @@ class JsonConverter:
             else:
                 st.warning('⚠️ 请输入JSON数据')
     
+    def _show_file_input(self, input_mode: str):
+        """显示文件输入界面：mmap 建立记录偏移索引，只解码前几条用于预览"""
+        file_path = None
+        if input_mode == "上传文件":
+            uploaded = st.file_uploader("选择JSON文件 (.json / .jsonl / .txt)", type=['json', 'jsonl', 'ndjson', 'txt'])
+            if uploaded is not None and st.button('🔍 建立索引'):
+                # 落盘后再 mmap，后续处理不再依赖上传内容；导出时还要读取，换用其他文件后再删除
+                with tempfile.NamedTemporaryFile('wb', suffix='.json', delete=False) as f:
+                    shutil.copyfileobj(uploaded, f, 1024 * 1024)
+                    file_path = f.name
+        else:
+            local_path = st.text_input("服务器本地文件路径:", key="json_local_path")
+            if st.button('🔍 建立索引'):
+                if local_path.strip() and os.path.isfile(local_path.strip()):
+                    file_path = local_path.strip()
+                else:
+                    st.error('❌ 文件不存在，请检查路径')
+        
+        if file_path:
+            try:
+                with st.spinner('正在扫描文件...'):
+                    index = JsonFileIndex(file_path)
+                if not len(index):
+                    raise ValueError('文件中没有找到JSON记录')
+                preview = index.preview(self.preview_records)
+                st.session_state['json_file_index'] = index
+                self._replace_upload_file(file_path if input_mode == "上传文件" else None)
+                st.session_state['json_data'] = preview[0]
+                st.session_state['json_doc_count'] = len(index)
+                st.session_state['json_source'] = 'file'
+                st.success(f'✅ 索引建立成功！文件大小: {index.size:,} 字节，共 {len(index):,} 条记录')
+                st.write(f"**前 {len(preview)} 条记录预览:**")
+                st.json(preview, expanded=False)
+            except Exception as e:
+                if input_mode == "上传文件":
+                    os.remove(file_path)
+                st.error(f'❌ 文件解析失败: {str(e)}')
+        elif st.session_state.get('json_source') == 'file' and st.session_state.get('json_file_index'):
+            index = st.session_state['json_file_index']
+            st.info(f"📁 当前文件: {index.path}（{len(index):,} 条记录）")
+    
+    @staticmethod
+    def _replace_upload_file(file_path):
+        """记录当前索引使用的上传文件临时副本，删除不再使用的上一个副本"""
+        previous = st.session_state.get('json_upload_file')
+        if previous and previous != file_path and os.path.exists(previous):
+            os.remove(previous)
+        st.session_state['json_upload_file'] = file_path
+    
+    def _export_file_source(self, export_path: str, export_format: str) -> str:
+        """文件模式导出：逐行解码导出路径下的数据并直接流式写入导出文件"""
+        index = st.session_state['json_file_index']
+        download_dir = "downloads"
+        if not os.path.exists(download_dir):
+            os.makedirs(download_dir)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_path = os.path.join(download_dir, f"json_export_{timestamp}{export_format}")
+        rows = index.iter_rows(export_path or None)
+        row_count = write_rows_streaming(rows, output_path)
+        if not row_count:
+            os.remove(output_path)
+            raise ValueError('指定路径未找到 list 数据')
+        return output_path
+    
+    def _iter_export_data(self):
+        """导出时重新流式解析输入，多文档以迭代器形式交给 json_to_excel"""
+        if st.session_state.get('json_doc_count', 1) > 1:
+            return iter_multi_json(st.session_state.get('json_input', ''))
+        return st.session_state.get('json_data')
+    
     def _show_data_preview(self, json_data):
         """显示数据结构预览"""
         st.subheader('📊 数据结构预览')
@@ -195,6 +297,10 @@ class JsonConverter:
         else:
             st.info("将导出全部数据")
         
+        if st.session_state.get('json_source') == 'file' and st.session_state.get('json_file_index'):
+            self._show_file_export(export_path)
+            return
+        
         # 导出按钮
         if st.button('📊 导出为Excel', key="json_export_excel_btn"):
             try:
@@ -207,11 +313,11 @@ class JsonConverter:
                 
                 if current_export_path and current_export_path.strip():
                     # 使用指定路径提取数据
-                    excel_bytes = json_to_excel(json_data, filename, current_export_path.strip())
+                    excel_bytes = json_to_excel(self._iter_export_data(), filename, current_export_path.strip())
                     st.info(f"📊 使用路径 '{current_export_path}' 导出数据")
                 else:
                     # 导出全部数据
-                    excel_bytes = json_to_excel(json_data, filename)
+                    excel_bytes = json_to_excel(self._iter_export_data(), filename)
                     st.info("📊 导出全部数据")
                 
                 # 提供下载
@@ -225,4 +331,26 @@ class JsonConverter:
                 
             except Exception as e:
                 st.error(f"❌ 导出失败: {str(e)}")
-                st.info("💡 提示：请检查路径是否正确，或尝试留空路径导出全部数据") 
\ No newline at end of file
+                st.info("💡 提示：请检查路径是否正确，或尝试留空路径导出全部数据") 
+    
+    def _show_file_export(self, export_path: str):
+        """文件模式的流式导出界面"""
+        export_format = st.radio("导出格式:", [".xlsx", ".csv"], horizontal=True,
+                                 help="超过104万行请选择CSV")
+        if st.button('📊 流式导出', key="json_stream_export_btn"):
+            try:
+                with st.spinner('正在流式导出...'):
+                    output_path = self._export_file_source(export_path.strip(), export_format)
+                size = os.path.getsize(output_path)
+                st.success(f"✅ 导出成功！已保存到: {output_path}（{size:,} 字节）")
+                if size <= self.max_inline_download:
+                    with open(output_path, 'rb') as f:
+                        st.download_button(
+                            label="📥 下载导出文件",
+                            data=f,
+                            file_name=os.path.basename(output_path)
+                        )
+                else:
+                    st.info("💡 文件较大，请直接从服务器目录获取")
+            except Exception as e:
+                st.error(f"❌ 导出失败: {str(e)}")
@@ -170,7 +170,7 @@ class JsonStructureManager:
                 active_structures = self.db.get_all_active()
                 for structure in active_structures:
                     try:
-                        from utils import get_by_path
+                        from src.utils.utils import get_by_path
                         result = get_by_path(response_data, structure.path_pattern)
                         if result is not None:
                             st.success(f"✅ {structure.name} (`{structure.path_pattern}`): 匹配")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+高动态范围延迟直方图（HDR Histogram）
+按 2 的幂分桶、桶内线性细分，在 1µs 到 1 小时的范围内保持固定的相对精度（默认 3 位有效数字），
+内存占用固定，与记录次数无关，可以记录百万级请求并随时读取任意百分位
+"""
+
+import math
+import threading
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+# 百分位曲线的默认取样点
+PERCENTILES = (50.0, 75.0, 90.0, 95.0, 99.0, 99.9, 99.99, 100.0)
+
+class LatencyHistogram:
+    """延迟直方图，记录单位为微秒；多线程记录时加锁"""
+
+    def __init__(self, highest: int = 3600 * 1000 * 1000, significant_figures: int = 3):
+        self.highest = highest
+        self.significant_figures = significant_figures
+        largest_single_unit = 2 * 10 ** significant_figures
+        self.sub_bucket_magnitude = max(1, math.ceil(math.log2(largest_single_unit)))
+        self.sub_bucket_count = 1 << self.sub_bucket_magnitude
+        self.sub_bucket_half_magnitude = self.sub_bucket_magnitude - 1
+        self.sub_bucket_half_count = self.sub_bucket_count // 2
+        # 覆盖 highest 所需的桶数
+        bucket_count = 1
+        while (self.sub_bucket_count << (bucket_count - 1)) <= highest:
+            bucket_count += 1
+        self.counts = array('q', [0]) * ((bucket_count + 1) * self.sub_bucket_half_count)
+        self.total_count = 0
+        self.min_value: Optional[int] = None
+        self.max_value = 0
+        self._sum = 0
+        self._lock = threading.Lock()
+
+    def _index(self, value: int) -> int:
+        bucket = max(0, value.bit_length() - self.sub_bucket_magnitude)
+        sub_bucket = value >> bucket
+        return ((bucket + 1) << self.sub_bucket_half_magnitude) + (sub_bucket - self.sub_bucket_half_count)
+
+    def _highest_equivalent(self, index: int) -> int:
+        """下标对应的数值区间上界（同一区间内的值视为相等）"""
+        bucket = (index >> self.sub_bucket_half_magnitude) - 1
+        sub_bucket = (index & (self.sub_bucket_half_count - 1)) + self.sub_bucket_half_count
+        if bucket < 0:
+            sub_bucket -= self.sub_bucket_half_count
+            bucket = 0
+        return (sub_bucket << bucket) + (1 << bucket) - 1
+
+    def record(self, value: int, count: int = 1):
+        """记录一个值（微秒）；超出范围的值按上限记录"""
+        value = min(max(0, int(value)), self.highest)
+        index = self._index(value)
+        with self._lock:
+            self.counts[index] += count
+            self.total_count += count
+            self._sum += value * count
+            if value > self.max_value:
+                self.max_value = value
+            if self.min_value is None or value < self.min_value:
+                self.min_value = value
+
+    def merge(self, other: 'LatencyHistogram'):
+        """合并另一个相同配置的直方图"""
+        with other._lock:
+            counts = array('q', other.counts)
+            total, total_sum, low, high = other.total_count, other._sum, other.min_value, other.max_value
+        with self._lock:
+            for index, count in enumerate(counts):
+                if count:
+                    self.counts[index] += count
+            self.total_count += total
+            self._sum += total_sum
+            self.max_value = max(self.max_value, high)
+            if low is not None and (self.min_value is None or low < self.min_value):
+                self.min_value = low
+
+    def values_at_percentiles(self, percentiles=PERCENTILES) -> Dict[float, int]:
+        """一次遍历计算多个百分位（微秒）"""
+        with self._lock:
+            counts = array('q', self.counts)
+            total = self.total_count
+            max_value = self.max_value
+        result: Dict[float, int] = {}
+        if not total:
+            return {p: 0 for p in percentiles}
+        targets = sorted((max(1, math.ceil(p / 100.0 * total)), p) for p in percentiles)
+        cumulative = 0
+        position = 0
+        for index, count in enumerate(counts):
+            if not count:
+                continue
+            cumulative += count
+            while position < len(targets) and cumulative >= targets[position][0]:
+                result[targets[position][1]] = min(self._highest_equivalent(index), max_value)
+                position += 1
+            if position == len(targets):
+                break
+        return result
+
+    def value_at_percentile(self, percentile: float) -> int:
+        return self.values_at_percentiles((percentile,))[percentile]
+
+    @property
+    def mean(self) -> float:
+        return self._sum / self.total_count if self.total_count else 0.0
+
+    def percentile_curve(self, steps: int = 60) -> List[Tuple[float, int]]:
+        """百分位曲线：在 50% 到 1 - 1/2^(steps/4) 之间按尾部比例等比取点，越靠近尾部越密，最后一点为最大值"""
+        points = sorted({100.0 * (1 - 0.5 ** (k / 4)) for k in range(4, steps + 1)} | {100.0})
+        values = self.values_at_percentiles(points)
+        return [(p, values[p]) for p in points]
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+开放模型压测
+批量模式是闭环的：线程等上一个请求返回才发下一个，服务变慢时发送速率随之下降，
+排队时间不计入延迟（协调遗漏）。压测模式按固定或线性爬升的到达率安排每个请求的计划发送时间，
+与请求何时完成无关：
+- 延迟从计划发送时间算起，记录到 HDR 直方图；同时记录从实际发送算起的服务时间作对照
+- 计划时间已过去 drop_after 秒仍未能发出（并发已满）的请求记为丢弃，不再发送
+- 报告目标与实际 RPS、丢弃数、错误分布和百分位曲线
+压测需要自行控制并发，不经过共享执行池（单主机并发上限会改变到达率）
+"""
+
+import math
+import time
+import queue
+import threading
+from collections import deque
+from dataclasses import dataclass
+from itertools import count, cycle, islice
+from typing import Any, Dict, Iterable, List, Optional
+from src.core.curl_parser import CurlRequest
+from src.core.request_processor import RequestProcessor, RequestModifier
+from src.core.latency_histogram import LatencyHistogram, PERCENTILES
+from src.core.run_history import record_load_run
+from src.utils.utils import Logger
+
+@dataclass
+class LoadProfile:
+    start_rps: float              # 起始到达率
+    end_rps: Optional[float] = None  # 结束到达率（为空表示固定到达率），期间线性爬升
+    duration: float = 60.0        # 持续时间（秒）
+    max_in_flight: int = 100      # 最大并发请求数（发送线程数）
+    drop_after: float = 1.0       # 计划时间过去多久仍未发出则丢弃（秒）
+
+    def rate_at(self, elapsed: float) -> float:
+        end = self.start_rps if self.end_rps is None else self.end_rps
+        return self.start_rps + (end - self.start_rps) * min(1.0, elapsed / self.duration)
+
+    def arrival_time(self, index: int) -> Optional[float]:
+        """第 index 个请求（从 0 起）的计划发送时间（相对开始时间）；超出持续时间返回 None"""
+        r0 = self.start_rps
+        slope = ((self.end_rps if self.end_rps is not None else r0) - r0) / self.duration
+        # 累计到达数 N(t) = r0*t + slope*t²/2，解 N(t) = index
+        if abs(slope) < 1e-12:
+            t = index / r0 if r0 > 0 else math.inf
+        else:
+            disc = r0 * r0 + 2 * slope * index
+            t = (-r0 + math.sqrt(disc)) / slope if disc >= 0 else math.inf
+        return t if t <= self.duration else None
+
+    def expected_total(self) -> int:
+        end = self.start_rps if self.end_rps is None else self.end_rps
+        return int((self.start_rps + end) / 2 * self.duration)
+
+class LoadGenerator:
+    """开放模型压测任务：后台调度线程按计划时间投放请求，发送线程执行"""
+
+    def __init__(self, logger: Optional[Logger] = None):
+        self.logger = logger or Logger()
+        self.request_modifier = RequestModifier(self.logger)
+        self.profile: Optional[LoadProfile] = None
+        self.latency = LatencyHistogram()   # 从计划发送时间算起
+        self.service = LatencyHistogram()   # 从实际发送时间算起
+        self.progress = {'status': 'idle', 'error': None}
+        self.scheduled = 0
+        self.sent = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.total_bytes = 0
+        self.error_counts: Dict[str, int] = {}
+        self.started_at = 0.0
+        self.finished_at: Optional[float] = None
+        self._completions = deque()
+        self._stats_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._job_thread: Optional[threading.Thread] = None
+        self._local = threading.local()
+
+    def run_load(self, base_request: CurlRequest, profile: LoadProfile,
+                 param_key: str = "", param_values: Optional[Iterable[str]] = None):
+        """
+        在后台线程中执行压测，立即返回
+        :param param_values: 可选参数值，循环使用（最多取前 100000 个）；为空时重复发送原始请求
+        """
+        if profile.start_rps <= 0 and not profile.end_rps:
+            raise ValueError("到达率必须大于 0")
+        self.profile = profile
+        self.latency = LatencyHistogram()
+        self.service = LatencyHistogram()
+        self.scheduled = self.sent = self.completed = self.failed = self.dropped = self.total_bytes = 0
+        self.error_counts = {}
+        self._completions.clear()
+        self._stop.clear()
+        self.finished_at = None
+        values = list(islice(param_values, 100000)) if (param_key and param_values is not None) else []
+        # 预先构建请求（URL 和请求体），发送时不再修改请求对象
+        modified = ([(value, self.request_modifier.modify_request(base_request, param_key, value)) for value in values]
+                    if values else [("", base_request)])
+        prepared = [(value, RequestProcessor.build_url(request), request.data or None) for value, request in modified]
+        self.progress = {'status': 'running', 'error': None}
+        self.started_at = time.time()
+        self._job_thread = threading.Thread(target=self._run, args=(base_request, prepared), daemon=True)
+        self._job_thread.start()
+
+    def is_running(self) -> bool:
+        return self._job_thread is not None and self._job_thread.is_alive()
+
+    def stop(self):
+        """提前结束：停止投放新请求，等待已发出的请求完成"""
+        self._stop.set()
+
+    def _run(self, base_request: CurlRequest, prepared: List[tuple]):
+        profile = self.profile
+        arrivals: queue.Queue = queue.Queue()
+        workers = [threading.Thread(target=self._send_loop, args=(arrivals, base_request), daemon=True)
+                   for _ in range(max(1, profile.max_in_flight))]
+        for worker in workers:
+            worker.start()
+        self.logger.log(f"开始压测: 到达率 {profile.start_rps}→{profile.end_rps or profile.start_rps} req/s, "
+                        f"持续 {profile.duration}s, 最大并发 {profile.max_in_flight}")
+        try:
+            targets = cycle(prepared)
+            started = self.started_at
+            for index in count():
+                offset = profile.arrival_time(index)
+                if offset is None or self._stop.is_set():
+                    break
+                intended = started + offset
+                delay = intended - time.time()
+                if delay > 0 and self._stop.wait(delay):
+                    break
+                # 调度线程落后时不补发也不跳过，计划时间保持不变，落后的时间计入延迟
+                arrivals.put((intended, next(targets)))
+                self.scheduled += 1
+            for _ in workers:
+                arrivals.put(None)
+            for worker in workers:
+                worker.join()
+            self.progress['status'] = 'done'
+        except Exception as e:
+            self.logger.log(f"压测过程中出错: {e}", level='error')
+            self.progress['status'] = 'failed'
+            self.progress['error'] = str(e)
+        self.finished_at = time.time()
+        self.logger.log(f"压测结束: 计划 {self.scheduled}, 完成 {self.completed}, 失败 {self.failed}, 丢弃 {self.dropped}")
+        record_load_run(self, base_request)
+
+    def _session(self):
+        """每个发送线程一个会话，复用连接"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            import requests
+            session = self._local.session = requests.Session()
+        return session
+
+    def _send_loop(self, arrivals: queue.Queue, base_request: CurlRequest):
+        import requests
+        session = self._session()
+        while True:
+            item = arrivals.get()
+            if item is None:
+                return
+            intended, (param_value, url, body) = item
+            sent_at = time.time()
+            if sent_at - intended > self.profile.drop_after or self._stop.is_set():
+                with self._stats_lock:
+                    self.dropped += 1
+                continue
+            with self._stats_lock:
+                self.sent += 1
+            error = None
+            size = 0
+            try:
+                response = session.request(base_request.method, url, headers=base_request.headers,
+                                           json=body, timeout=base_request.timeout)
+                size = len(response.content)
+                if response.status_code >= 400:
+                    error = f"HTTP {response.status_code}"
+            except requests.exceptions.Timeout:
+                error = '请求超时'
+            except requests.exceptions.ConnectionError:
+                error = '连接错误'
+            except Exception as e:
+                error = type(e).__name__
+            done = time.time()
+            self.latency.record((done - intended) * 1e6)
+            self.service.record((done - sent_at) * 1e6)
+            with self._stats_lock:
+                self.completed += 1
+                self.total_bytes += size
+                self._completions.append(done)
+                if error is not None:
+                    self.failed += 1
+                    self.error_counts[error] = self.error_counts.get(error, 0) + 1
+
+    def snapshot(self, window: float = 5.0) -> Dict[str, Any]:
+        """当前统计：目标与实际 RPS、丢弃数、错误分布，以及两种口径的延迟百分位（毫秒）"""
+        now = self.finished_at or time.time()
+        elapsed = max(now - self.started_at, 1e-6)
+        with self._stats_lock:
+            completions = self._completions
+            while completions and completions[0] < now - window:
+                completions.popleft()
+            recent = len(completions)
+            stats = {
+                'status': self.progress['status'],
+                'elapsed': elapsed,
+                'target_rps': self.profile.rate_at(elapsed) if self.profile else 0.0,
+                'scheduled': self.scheduled,
+                'sent': self.sent,
+                'completed': self.completed,
+                'failed': self.failed,
+                'dropped': self.dropped,
+                'in_flight': self.sent - self.completed,
+                'total_bytes': self.total_bytes,
+                'errors': dict(self.error_counts),
+            }
+        stats['achieved_rps'] = self.completed / elapsed
+        stats['recent_rps'] = recent / min(window, elapsed)
+        stats['offered_rps'] = self.scheduled / elapsed
+        stats['latency_ms'] = {p: v / 1000 for p, v in self.latency.values_at_percentiles(PERCENTILES).items()}
+        stats['service_ms'] = {p: v / 1000 for p, v in self.service.values_at_percentiles(PERCENTILES).items()}
+        stats['mean_ms'] = self.latency.mean / 1000
+        return stats
+
+    def percentile_curves(self) -> List[Dict[str, float]]:
+        """百分位曲线（毫秒），含计划口径和实际发送口径"""
+        latency = self.latency.percentile_curve()
+        service = dict(self.service.percentile_curve())
+        return [{'percentile': p, 'latency_ms': v / 1000, 'service_ms': service.get(p, 0) / 1000} for p, v in latency]
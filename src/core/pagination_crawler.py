@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自动分页抓取
+先请求第一页读取总数，再并发抓取剩余页，遇到空页提前结束
+"""
+
+import math
+import threading
+from dataclasses import dataclass
+from itertools import count, islice
+from typing import Any, Dict, Optional
+from src.core.curl_parser import CurlRequest
+from src.core.batch_processor import BatchProcessor
+from src.core.throughput_monitor import ThroughputMonitor
+from src.core.result_columns import ResultColumns
+from src.core.run_history import record_batch_run
+from src.utils.utils import get_by_path
+
+@dataclass
+class PaginationConfig:
+    page_key: str                 # 页码参数，如 params.pageIndex
+    items_path: str               # 每页数据列表路径，如 resultValue.items
+    total_path: str = ''          # 总数路径，如 resultValue.total（留空则按波次探测）
+    total_is_pages: bool = False  # total_path 给出的是总页数而不是总条数
+    has_next_path: str = ''       # 可选：是否有下一页的标志路径
+    page_size: int = 20
+    page_size_key: str = ''       # 可选：每页条数参数，如 params.pageSize
+    start_page: int = 1
+    max_pages: int = 1000
+
+class PaginationCrawler(BatchProcessor):
+    """分页抓取器：复用批量处理的线程、监控和结果收集"""
+    
+    def __init__(self, config: PaginationConfig):
+        super().__init__()
+        self.config = config
+        self._last_page: Optional[int] = None  # 已知的最后一页，空页或无下一页时收紧
+        self._last_page_lock = threading.Lock()
+        self.skip_value = self._is_beyond_last_page
+        self.result_hook = self._inspect_page
+        # 后处理进程池按数据列表路径裁剪或采集时提取时，保留总数和下一页标志
+        self.request_processor.keep_paths = [path for path in (config.total_path, config.has_next_path) if path]
+    
+    def run_paginated_requests(self, base_request: CurlRequest):
+        """在后台线程中抓取全部分页，立即返回"""
+        self.results = []
+        self.errors = []
+        self.columns = ResultColumns()
+        self.downloaded_files = []
+        self._last_page = None
+        self.progress = {
+            'current': 0,
+            'total': 1,
+            'batch': 0,
+            'total_batches': 0,
+            'status': 'running',
+            'error': None
+        }
+        self.monitor = ThroughputMonitor(1)
+        self.request_processor.reset_cache_stats()
+        self.request_processor.download_manager.reset_stats()
+        self.request_processor.blob_store.reset_stats()
+        self._job_thread = threading.Thread(target=self._crawl, args=(base_request,), daemon=True)
+        self._job_thread.start()
+    
+    def _is_beyond_last_page(self, page) -> bool:
+        return self._last_page is not None and page > self._last_page
+    
+    def _limit_last_page(self, page: int):
+        with self._last_page_lock:
+            if self._last_page is None or page < self._last_page:
+                self._last_page = page
+    
+    @staticmethod
+    def _is_json_page(result: Dict[str, Any]) -> bool:
+        if 'error' in result:
+            return False
+        if 'rows' in result:
+            return result['summary']['type'] in ('dict', 'list')
+        return isinstance(result.get('content'), (dict, list))
+    
+    @staticmethod
+    def _page_field(result: Dict[str, Any], path: str) -> Any:
+        """读取页面字段；采集时已提取的页面从提取时保留的字段中读取"""
+        if 'rows' in result:
+            return result.get('fields', {}).get(path)
+        return get_by_path(result.get('content'), path)
+    
+    def _inspect_page(self, page, result: Dict[str, Any]):
+        """统计每页条数；空页或无下一页时收紧最后一页"""
+        if not self._is_json_page(result):
+            return
+        # 采集时提取的行就是数据列表路径下的条目（提取路径与数据列表路径一致）
+        items = result['rows'] if 'rows' in result else get_by_path(result['content'], self.config.items_path)
+        result['page'] = page
+        result['page_items'] = len(items) if isinstance(items, list) else 0
+        if not items:
+            self._limit_last_page(page - 1)
+        elif self.config.has_next_path and not self._page_field(result, self.config.has_next_path):
+            self._limit_last_page(page)
+    
+    def _read_total_pages(self, result: Dict[str, Any]) -> Optional[int]:
+        """从第一页响应读取总页数"""
+        if not self.config.total_path or not self._is_json_page(result):
+            return None
+        try:
+            total = int(self._page_field(result, self.config.total_path))
+        except (TypeError, ValueError):
+            return None
+        if self.config.total_is_pages:
+            return total
+        return math.ceil(total / max(1, self.config.page_size))
+    
+    def _crawl(self, base_request: CurlRequest):
+        """后台线程：第一页 -> 确定页数 -> 并发抓取剩余页"""
+        config = self.config
+        try:
+            if config.page_size_key:
+                base_request = self.request_processor.request_modifier.modify_request(
+                    base_request, config.page_size_key, config.page_size)
+            
+            first = config.start_page
+            last_allowed = first + config.max_pages - 1
+            self.logger.log(f"开始分页抓取: 页码参数 {config.page_key}, 起始页 {first}")
+            self._process_batch(base_request, [first], config.page_key)
+            first_result = (self.results or self.errors)[0]
+            if 'error' in first_result:
+                raise RuntimeError(f"第一页请求失败: {first_result['error']}")
+            
+            total_pages = self._read_total_pages(first_result)
+            if total_pages is not None:
+                self._limit_last_page(min(first + total_pages - 1, last_allowed))
+            else:
+                self._limit_last_page(last_allowed)
+            self.progress['total'] = self.monitor.total = self._last_page - first + 1
+            self.logger.log(f"分页抓取: 共 {self.progress['total']} 页 (总数{'已知' if total_pages is not None else '未知，按波次探测'})")
+            
+            # 总数已知时按批并发；未知时每波只取线程数个页，便于尽早发现空页
+            wave_size = self.batch_size if total_pages is not None else self.max_threads
+            self.progress['total_batches'] = max(1, math.ceil((self.progress['total'] - 1) / wave_size))
+            pages = count(first + 1)
+            while True:
+                wave = [p for p in islice(pages, wave_size) if not self._is_beyond_last_page(p)]
+                if not wave:
+                    break
+                self.progress['batch'] += 1
+                self._process_batch(base_request, wave, config.page_key)
+            
+            # 以实际抓取的页数为准
+            self.progress['total'] = self.monitor.total = self.monitor.completed
+            self.progress['total_batches'] = self.progress['batch']
+            self.request_processor.download_manager.flush()
+            self.progress['status'] = 'done'
+            self.logger.log(f"分页抓取完成! 成功: {len(self.results)}, 失败: {len(self.errors)}, 最后一页: {self._last_page}")
+        except Exception as e:
+            self.logger.log(f"分页抓取过程中出错: {e}", level='error')
+            self.progress['status'] = 'failed'
+            self.progress['error'] = str(e)
+        record_batch_run(self, base_request, kind='pagination')
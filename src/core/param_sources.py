@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量参数来源
+按需惰性产出参数值，避免把百万级参数一次性读入内存
+"""
+
+import os
+import csv
+import mmap
+import hashlib
+from itertools import product
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+class ParamSource:
+    """参数来源基类"""
+    
+    dedup = False
+    skipped = 0  # 最近一次遍历中去重跳过的值数
+    
+    def iter_values(self) -> Iterator[str]:
+        """产出原始参数值（子类实现）"""
+        raise NotImplementedError
+    
+    def count(self) -> Optional[int]:
+        """参数数量（去重前），无法廉价获得时返回 None"""
+        return None
+    
+    def describe(self) -> str:
+        return self.__class__.__name__
+    
+    def to_spec(self) -> Dict[str, Any]:
+        """可序列化的来源描述（用于持久化任务队列），由 job_manager.build_param_source 还原"""
+        raise NotImplementedError
+    
+    def __iter__(self) -> Iterator[str]:
+        values = (v for v in (str(v).strip() for v in self.iter_values()) if v)
+        if not self.dedup:
+            return values
+        self.skipped = 0
+        return dedup_values(values, on_skip=self._count_skipped)
+    
+    def _count_skipped(self, value: str):
+        self.skipped += 1
+
+def dedup_values(values, on_skip: Optional[Callable[[str], None]] = None) -> Iterator[str]:
+    """
+    流式去重：只保存每个值的 64 位摘要，而不是值本身
+    代价是摘要碰撞时不同的值也会被当作重复跳过：一亿个不同的值出现碰撞的概率约 0.03%。
+    每个跳过的值（重复或碰撞）都会传给 on_skip，调用方据此统计并显示跳过数
+    """
+    seen = set()
+    for value in values:
+        digest = int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'little')
+        if digest in seen:
+            if on_skip is not None:
+                on_skip(value)
+            continue
+        seen.add(digest)
+        yield value
+
+class TextParamSource(ParamSource):
+    """文本框输入，每行一个值"""
+    
+    def __init__(self, text: str, dedup: bool = False):
+        self.text = text
+        self.dedup = dedup
+    
+    def iter_values(self):
+        start = 0
+        text = self.text
+        while start <= len(text):
+            end = text.find('\n', start)
+            if end < 0:
+                end = len(text)
+            yield text[start:end]
+            start = end + 1
+    
+    def count(self):
+        return sum(1 for _ in self)
+    
+    def describe(self):
+        return "手动输入"
+    
+    def to_spec(self):
+        return {'type': 'text', 'text': self.text, 'dedup': self.dedup}
+
+class LineFileParamSource(ParamSource):
+    """文本文件，每行一个值，通过 mmap 逐行读取"""
+    
+    def __init__(self, path: str, encoding: str = 'utf-8', dedup: bool = False):
+        self.path = path
+        self.encoding = encoding
+        self.dedup = dedup
+    
+    def iter_values(self):
+        if not os.path.getsize(self.path):
+            return
+        with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for line in iter(mm.readline, b''):
+                yield line.decode(self.encoding, errors='replace').lstrip('\ufeff')
+    
+    def count(self):
+        lines = 0
+        last = b'\n'
+        with open(self.path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                lines += chunk.count(b'\n')
+                last = chunk[-1:]
+        return lines + (0 if last == b'\n' else 1)
+    
+    def describe(self):
+        return f"行文件 {os.path.basename(self.path)}"
+    
+    def to_spec(self):
+        return {'type': 'lines', 'path': os.path.abspath(self.path), 'encoding': self.encoding, 'dedup': self.dedup}
+
+def _is_excel(path: str) -> bool:
+    return path.lower().endswith(('.xlsx', '.xlsm'))
+
+def iter_table_rows(path: str) -> Iterator[Dict[str, Any]]:
+    """逐行读取 CSV / Excel，产出 {表头: 值}"""
+    if _is_excel(path):
+        from openpyxl import load_workbook
+        wb = load_workbook(path, read_only=True)
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            header = [str(c) if c is not None else '' for c in next(rows, ())]
+            for row in rows:
+                yield dict(zip(header, row))
+        finally:
+            wb.close()
+    else:
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            yield from csv.DictReader(f)
+
+def count_table_rows(path: str) -> int:
+    """统计数据行数（不含表头）；Excel 优先读取工作表记录的行数，没有记录时逐行扫描"""
+    if _is_excel(path):
+        from openpyxl import load_workbook
+        wb = load_workbook(path, read_only=True)
+        try:
+            ws = wb.active
+            max_row = ws.max_row
+            if not max_row:
+                # 部分工具生成的文件不写尺寸信息，只能逐行计数
+                ws.reset_dimensions()
+                max_row = sum(1 for _ in ws.iter_rows(values_only=True))
+        finally:
+            wb.close()
+        return max(0, max_row - 1)
+    with open(path, 'rb') as f:
+        lines = sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1024 * 1024), b''))
+    return max(0, lines - 1)
+
+class TableColumnParamSource(ParamSource):
+    """CSV / Excel 文件中的某一列，逐行流式读取"""
+    
+    def __init__(self, path: str, column: str, dedup: bool = False):
+        self.path = path
+        self.column = column
+        self.dedup = dedup
+    
+    @staticmethod
+    def read_columns(path: str) -> List[str]:
+        """只读取表头"""
+        if _is_excel(path):
+            from openpyxl import load_workbook
+            wb = load_workbook(path, read_only=True)
+            try:
+                header = next(wb.active.iter_rows(max_row=1, values_only=True), ())
+            finally:
+                wb.close()
+            return [str(c) for c in header if c is not None]
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            return next(csv.reader(f), [])
+    
+    def iter_values(self):
+        for row in iter_table_rows(self.path):
+            value = row.get(self.column)
+            if value is not None:
+                yield value
+    
+    def count(self):
+        return count_table_rows(self.path)
+    
+    def describe(self):
+        return f"{os.path.basename(self.path)} 列 {self.column}"
+    
+    def to_spec(self):
+        return {'type': 'column', 'path': os.path.abspath(self.path), 'column': self.column, 'dedup': self.dedup}
+
+def format_bindings(bindings: Dict[str, Any]) -> str:
+    """多参数绑定的显示标签，如 pageIndex=1,type=A"""
+    return ','.join(f"{key}={value}" for key, value in bindings.items())
+
+class RowParamSource(ParamSource):
+    """CSV / Excel 按行绑定多个参数，每行产生一个请求"""
+    
+    def __init__(self, path: str, column_map: Dict[str, str]):
+        self.path = path
+        self.column_map = column_map  # 参数key -> 列名
+    
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        column_map = self.column_map
+        for row in iter_table_rows(self.path):
+            bindings = {}
+            for key, column in column_map.items():
+                value = row.get(column)
+                if value is None or not str(value).strip():
+                    break
+                bindings[key] = str(value).strip()
+            else:
+                yield bindings
+    
+    def count(self):
+        return count_table_rows(self.path)
+    
+    def describe(self):
+        return f"{os.path.basename(self.path)} 按行绑定 {len(self.column_map)} 个参数"
+    
+    def to_spec(self):
+        return {'type': 'rows', 'path': os.path.abspath(self.path), 'columns': dict(self.column_map)}
+
+class CartesianParamSource(ParamSource):
+    """多个参数值列表的笛卡尔积，组合按需生成"""
+    
+    def __init__(self, axes: Dict[str, Iterable[str]]):
+        self.axes = axes
+        self._pools = None
+    
+    def _get_pools(self) -> List[List[str]]:
+        # 各维度只展开一次，组合本身不落地
+        if self._pools is None:
+            self._pools = [list(values) for values in self.axes.values()]
+        return self._pools
+    
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        keys = list(self.axes)
+        for combo in product(*self._get_pools()):
+            yield dict(zip(keys, combo))
+    
+    def count(self):
+        total = 1
+        for pool in self._get_pools():
+            total *= len(pool)
+        return total
+    
+    def describe(self):
+        return "笛卡尔积 " + " × ".join(f"{key}[{len(pool)}]" for key, pool in zip(self.axes, self._get_pools()))
+    
+    def to_spec(self):
+        return {'type': 'cartesian', 'axes': dict(zip(self.axes, self._get_pools()))}
+
+class RangeParamSource(ParamSource):
+    """数值范围生成器，支持格式化（如 {:05d}）"""
+    
+    def __init__(self, start: int, stop: int, step: int = 1, fmt: str = "{}"):
+        self.range = range(start, stop, step)
+        self.fmt = fmt
+    
+    def iter_values(self):
+        fmt = self.fmt
+        for value in self.range:
+            yield fmt.format(value)
+    
+    def count(self):
+        return len(self.range)
+    
+    def describe(self):
+        return f"范围 {self.range.start}..{self.range.stop} 步长 {self.range.step}"
+    
+    def to_spec(self):
+        # 描述中的 stop 包含在内
+        return {'type': 'range', 'start': self.range.start, 'stop': self.range.stop - 1,
+                'step': self.range.step, 'format': self.fmt}
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+响应后处理
+JSON 解码、预览截取和摘要统计都是 CPU 密集操作，在 I/O 线程里执行会占用 GIL。
+启用后处理进程池后，I/O 线程只把响应体写入临时文件（优先使用内存文件系统 /dev/shm），
+由进程池解码、按导出路径裁剪并返回紧凑结果，I/O 线程等待期间不占用 GIL。
+结果传回主进程同样需要反序列化，所以只有设置了导出路径、能裁掉大部分内容时才交给进程池。
+任务也可以预先声明提取配置（ExtractionConfig），每个响应在到达时就只保留导出路径下的行和指定字段
+"""
+
+import os
+import json
+import codecs
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+from src.utils.utils import get_by_path, extract_rows
+
+@dataclass
+class ExtractionConfig:
+    """采集时提取配置：导出路径、保留的字段（为空则保留整行）、是否归档完整响应"""
+    export_path: str = ""
+    columns: List[str] = field(default_factory=list)
+    archive: bool = False
+
+def project_rows(content: Any, export_path: str, columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """按导出路径取出行，并只保留指定字段（字段名支持点号路径）"""
+    rows = []
+    for item in extract_rows(content, export_path or None):
+        if not isinstance(item, dict):
+            item = {'value': item}
+        if columns:
+            item = {column: get_by_path(item, column) for column in columns}
+        rows.append(item)
+    return rows
+
+def _decode_text(raw: bytes, encoding: Optional[str]) -> str:
+    """按响应声明的编码解码文本，编码未知时按 UTF-8"""
+    try:
+        return raw.decode(encoding or 'utf-8', errors='replace')
+    except LookupError:
+        return raw.decode(errors='replace')
+
+def _is_utf8(encoding: Optional[str]) -> bool:
+    try:
+        return not encoding or codecs.lookup(encoding).name == 'utf-8'
+    except LookupError:
+        return True
+
+def decode_body(raw: bytes, export_path: Optional[str] = None, preview_size: int = 1024 * 1024,
+                project: bool = False, extraction: Optional[ExtractionConfig] = None,
+                encoding: Optional[str] = None, keep_paths: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    解码响应体：优先按 JSON 解析，失败时按文本处理
+    :param project: 只保留导出路径下的数据（外层结构保持不变，get_by_path 仍可取到）
+    :param extraction: 采集时提取配置；设置后只返回提取出的行（'rows'），不保留完整内容和预览
+    :param encoding: 响应声明的字符集（如 gbk），为空时按 UTF-8
+    :param keep_paths: 裁剪时在导出路径之外额外保留的字段路径（如分页的总数、下一页标志）；
+                       提取时这些字段的值放在 'fields' 中
+    :return: {'is_json', 'content' 或 'rows'（和 'fields'）, 'preview'（超过 preview_size 时）, 'summary'}
+    """
+    try:
+        # UTF-8 直接解析字节，其他字符集先按声明的编码解码（与 response.json() 一致）
+        content = json.loads(raw if _is_utf8(encoding) else _decode_text(raw, encoding))
+        is_json = True
+    except (ValueError, UnicodeDecodeError):
+        content = _decode_text(raw, encoding)
+        is_json = False
+
+    if extraction is not None:
+        rows = project_rows(content, extraction.export_path, extraction.columns) if is_json else []
+        summary = {'type': type(content).__name__, 'rows': len(rows)}
+        decoded = {'is_json': is_json, 'rows': rows, 'summary': summary}
+        if keep_paths:
+            decoded['fields'] = {path: get_by_path(content, path) if is_json else None for path in keep_paths}
+        return decoded
+    
+    summary = _summarize(content, export_path)
+    if project and export_path and isinstance(content, dict):
+        content = project_path(content, export_path, keep_paths)
+    decoded: Dict[str, Any] = {'is_json': is_json, 'content': content, 'summary': summary}
+    if len(raw) > preview_size:
+        decoded['preview'] = _decode_text(raw[:preview_size], encoding) if is_json else content[:preview_size]
+    return decoded
+
+def _summarize(content: Any, export_path: Optional[str]) -> Dict[str, Any]:
+    """紧凑摘要：顶层类型和字段数，以及导出路径下的数据条数"""
+    summary: Dict[str, Any] = {'type': type(content).__name__}
+    if isinstance(content, (dict, list)):
+        summary['size'] = len(content)
+    if export_path and isinstance(content, dict):
+        target = get_by_path(content, export_path)
+        summary['rows'] = len(target) if isinstance(target, list) else int(target is not None)
+    return summary
+
+def project_path(content: Dict[str, Any], export_path: str, keep_paths: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    按点号路径裁剪内容，只保留导出路径和 keep_paths 上的字段；
+    任一路径含数组索引或导出路径取不到数据时保留原内容
+    """
+    paths = [export_path] + [path for path in keep_paths or [] if path]
+    if any('[' in path for path in paths) or get_by_path(content, export_path) is None:
+        return content
+    projected: Dict[str, Any] = {}
+    created = {id(projected)}  # 裁剪时新建的中间层；其余值是原内容，不能修改
+    # 先放短路径：祖先路径已整体保留时，其下的路径无需再放
+    for path in sorted(paths, key=lambda p: p.count('.')):
+        value = get_by_path(content, path)
+        if value is None:
+            continue
+        *parents, leaf = path.split('.')
+        node = projected
+        for key in parents:
+            if key not in node:
+                node[key] = {}
+                created.add(id(node[key]))
+            node = node[key]
+            if id(node) not in created:
+                break
+        else:
+            node[leaf] = value
+    return projected
+
+def decode_spooled(spool_path: str, export_path: Optional[str] = None, preview_size: int = 1024 * 1024,
+                   extraction: Optional[ExtractionConfig] = None, encoding: Optional[str] = None,
+                   keep_paths: Optional[List[str]] = None) -> Dict[str, Any]:
+    """进程池任务：读取并删除临时文件，再解码"""
+    try:
+        with open(spool_path, 'rb') as f:
+            raw = f.read()
+    finally:
+        os.remove(spool_path)
+    return decode_body(raw, export_path, preview_size, project=True, extraction=extraction,
+                       encoding=encoding, keep_paths=keep_paths)
+
+class PostProcessPool:
+    """
+    响应后处理进程池
+    - 未设置导出路径或小于 threshold 的响应在 I/O 线程内直接解码，避免进程间传递的开销
+    - 进程池按需创建，进程内共享一个实例
+    """
+
+    _shared: Optional['PostProcessPool'] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_workers: Optional[int] = None, threshold: int = 256 * 1024):
+        self.max_workers = max_workers or os.cpu_count() or 2
+        self.threshold = threshold
+        self.spool_dir = "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else tempfile.gettempdir()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, **kwargs) -> 'PostProcessPool':
+        """获取进程内共享的后处理进程池，并更新阈值等设置"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(**kwargs)
+            else:
+                for name, value in kwargs.items():
+                    setattr(cls._shared, name, value)
+            return cls._shared
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def decode(self, raw: bytes, export_path: Optional[str] = None, preview_size: int = 1024 * 1024,
+               extraction: Optional[ExtractionConfig] = None, encoding: Optional[str] = None,
+               keep_paths: Optional[List[str]] = None) -> Dict[str, Any]:
+        """解码响应体并按导出路径裁剪（或按提取配置只返回行）；可以裁剪且足够大时交给进程池"""
+        if (not export_path and extraction is None) or len(raw) < self.threshold:
+            return decode_body(raw, export_path, preview_size, project=True, extraction=extraction,
+                               encoding=encoding, keep_paths=keep_paths)
+        fd, spool_path = tempfile.mkstemp(prefix="body_", suffix=".bin", dir=self.spool_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(raw)
+        except OSError:
+            os.remove(spool_path)
+            raise
+        try:
+            return self._get_executor().submit(decode_spooled, spool_path, export_path, preview_size, extraction,
+                                               encoding, keep_paths).result()
+        except Exception:
+            if os.path.exists(spool_path):
+                os.remove(spool_path)
+            raise
+
+    def shutdown(self):
+        """关闭进程池"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
@@ -5,15 +5,19 @@
 负责执行HTTP请求和处理响应
 """
 
-import requests
 import json
 import os
 import re
 import copy
 import time
-from datetime import datetime
+import hashlib
+import threading
 from typing import Dict, List, Any, Optional
 from src.core.curl_parser import CurlRequest
+from src.core.response_cache import ResponseCache, CachedResponse
+from src.core.download_manager import DownloadManager
+from src.core.blob_store import BlobStore
+from src.core.post_processor import PostProcessPool, ExtractionConfig, decode_body
 from src.utils.utils import Logger
 import urllib.parse
 
@@ -23,8 +27,107 @@ class RequestProcessor:
     def __init__(self):
         self.logger = Logger()
         self.request_modifier = RequestModifier(self.logger)
+        self.download_manager = DownloadManager(logger=self.logger)
+        self.blob_store = BlobStore()  # 相同内容只保存一份；统计和共享的解析结果属于本处理器所在的任务
+        
+        # 响应后处理进程池（默认关闭，在 I/O 线程内解码）；导出路径用于统计每个响应的数据条数
+        self.post_processor: Optional[PostProcessPool] = None
+        self.export_path: Optional[str] = None
+        self.keep_paths: List[str] = []  # 裁剪时额外保留的字段路径（分页抓取的总数、下一页标志）
+        # 采集时提取（默认关闭）：设置后每个响应只保留提取出的行，完整响应丢弃或归档
+        self.extraction: Optional[ExtractionConfig] = None
         self.max_json_size = 50 * 1024 * 1024  # 50MB (增加到50MB)
         self.max_preview_size = 1024 * 1024  # 1MB
+        
+        # 响应缓存（默认关闭），统计按次运行重置
+        self.cache: Optional[ResponseCache] = None
+        self.cache_stats = {'hit': 0, 'miss': 0, 'revalidated': 0, 'coalesced': 0}
+        self._stats_lock = threading.Lock()
+    
+    def reset_cache_stats(self):
+        """新一次运行开始时清零缓存统计"""
+        with self._stats_lock:
+            for key in self.cache_stats:
+                self.cache_stats[key] = 0
+    
+    def _send(self, request: CurlRequest, actual_url: str):
+        """发送请求；启用缓存时先查缓存、过期后带条件头重新验证，并合并并发的相同请求"""
+        if self.cache is None:
+            return self._request(request, actual_url, request.headers), None
+        
+        key = self.cache.make_key(request.method, actual_url, request.data, request.headers)
+        entry = self.cache.get(key)
+        if entry and entry.is_fresh(self.cache.ttl):
+            response, status = entry.to_response(), 'hit'
+        else:
+            response, status = self.cache.coalesce(key, lambda: self._fetch_into_cache(request, actual_url, key, entry))
+        with self._stats_lock:
+            self.cache_stats[status] += 1
+        return response, status
+    
+    def _fetch_into_cache(self, request: CurlRequest, actual_url: str, key: str, stale_entry):
+        """请求上游并写入缓存；有旧条目时使用 If-None-Match / If-Modified-Since"""
+        headers = dict(request.headers)
+        if stale_entry:
+            if stale_entry.etag:
+                headers['If-None-Match'] = stale_entry.etag
+            if stale_entry.last_modified:
+                headers['If-Modified-Since'] = stale_entry.last_modified
+        response = self._request(request, actual_url, headers)
+        if response.status_code == 304 and stale_entry:
+            self.logger.log(f"缓存重新验证成功: {actual_url}")
+            return self.cache.refresh(stale_entry).to_response(), 'revalidated'
+        if self.cache.is_cacheable(response):
+            entry = self.cache.put(key, response)
+            if entry:
+                return entry.to_response(), 'miss'
+        return response, 'miss'
+    
+    @staticmethod
+    def _request(request: CurlRequest, actual_url: str, headers: Dict[str, str]):
+        import requests  # 首次发请求时才加载
+        return requests.request(
+            method=request.method,
+            url=actual_url,  # 使用手动构建的URL
+            headers=headers,
+            json=request.data if request.data else None,
+            timeout=request.timeout,
+            stream=True
+        )
+    
+    @staticmethod
+    def build_url(request: CurlRequest) -> str:
+        """构建实际发送的URL"""
+        # 使用requests库构建实际发送的URL，但手动处理params参数避免双重编码
+        import requests
+        
+        # 创建临时请求对象，但不包含params参数
+        temp_request = requests.Request(
+            method=request.method,
+            url=request.url,
+            headers=request.headers,
+            json=request.data if request.data else None
+        )
+        prepared_request = temp_request.prepare()
+        base_url = prepared_request.url
+        
+        # 手动构建URL参数，避免requests库对params进行二次编码
+        param_pairs = []
+        for k, v in request.params.items():
+            if k == 'params':
+                # params参数已经是URL编码的，直接使用
+                param_pairs.append(f"{k}={v}")
+            else:
+                # 其他参数让requests库处理
+                encoded_key = urllib.parse.quote(str(k), safe='')
+                encoded_value = urllib.parse.quote(str(v), safe='')
+                param_pairs.append(f"{encoded_key}={encoded_value}")
+        
+        if param_pairs:
+            actual_url = f"{base_url}?{'&'.join(param_pairs)}"
+        else:
+            actual_url = base_url
+        return actual_url
     
     def execute_request(self, request: CurlRequest, param_value: str) -> Dict[str, Any]:
         """执行单个HTTP请求"""
@@ -32,64 +135,40 @@ class RequestProcessor:
             start_time = time.time()
             # 添加调试信息
             self.logger.log(f"DEBUG: request.params before logging: {request.params}", level='debug')
+            import requests  # 下方按异常类型处理超时和连接错误
             # 构建完整的URL用于日志显示
-            # 使用requests库构建实际发送的URL，但手动处理params参数避免双重编码
-            import requests
-            
-            # 创建临时请求对象，但不包含params参数
-            temp_request = requests.Request(
-                method=request.method,
-                url=request.url,
-                headers=request.headers,
-                json=request.data if request.data else None
-            )
-            prepared_request = temp_request.prepare()
-            base_url = prepared_request.url
-            
-            # 手动构建URL参数，避免requests库对params进行二次编码
-            param_pairs = []
-            for k, v in request.params.items():
-                if k == 'params':
-                    # params参数已经是URL编码的，直接使用
-                    param_pairs.append(f"{k}={v}")
-                else:
-                    # 其他参数让requests库处理
-                    encoded_key = urllib.parse.quote(str(k), safe='')
-                    encoded_value = urllib.parse.quote(str(v), safe='')
-                    param_pairs.append(f"{encoded_key}={encoded_value}")
-            
-            if param_pairs:
-                actual_url = f"{base_url}?{'&'.join(param_pairs)}"
-            else:
-                actual_url = base_url
+            actual_url = self.build_url(request)
             
             self.logger.log(f"发起请求: {request.method} {actual_url} param_value={param_value}")
             
             # 发送请求时也使用手动构建的URL，避免双重编码
-            response = requests.request(
-                method=request.method,
-                url=actual_url,  # 使用手动构建的URL
-                headers=request.headers,
-                json=request.data if request.data else None,
-                timeout=request.timeout,
-                stream=True
-            )
+            response, cache_status = self._send(request, actual_url)
             response_time = int((time.time() - start_time) * 1000)
-            self.logger.log(f"收到响应: 状态码={response.status_code}, param_value={param_value}, 耗时={response_time}ms")
+            self.logger.log(f"收到响应: 状态码={response.status_code}, param_value={param_value}, 耗时={response_time}ms"
+                            + (f", 缓存={cache_status}" if cache_status else ""))
             
             content_type = response.headers.get('content-type', '')
             content_length = int(response.headers.get('content-length', 0) or 0)
             is_json = 'application/json' in content_type
             is_large = content_length > self.max_json_size
             
+            # 下载续传/分段时用于重新发起同一请求
+            download_source = (
+                lambda extra_headers: self._request(request, actual_url, {**request.headers, **extra_headers}),
+                ResponseCache.make_key(request.method, actual_url, request.data, request.headers)
+            )
+            
             # 处理文件下载
             if request.download_file or not is_json:
-                return self._handle_file_download(response, request, param_value, response_time, content_type)
-            elif is_large:
+                result = self._handle_file_download(response, request, param_value, response_time, content_type, download_source)
+            elif is_large and self.extraction is None:
                 # 大响应，尝试JSON处理
-                return self._handle_large_json_response(response, request, param_value, response_time, content_type)
+                result = self._handle_large_json_response(response, request, param_value, response_time, content_type, download_source)
             else:
-                return self._handle_json_response(response, param_value, response_time)
+                result = self._handle_json_response(response, param_value, response_time)
+            if cache_status:
+                result['cache'] = cache_status
+            return result
                 
         except requests.exceptions.Timeout:
             self.logger.log(f"请求超时: param_value={param_value}", level='warn')
@@ -113,23 +192,34 @@ class RequestProcessor:
                 'response_time': 0
             }
     
-    def _handle_file_download(self, response, request: CurlRequest, param_value: str, response_time: int, content_type: str) -> Dict[str, Any]:
-        """处理文件下载"""
+    def _handle_file_download(self, response, request: CurlRequest, param_value: str, response_time: int, content_type: str,
+                              download_source=None) -> Dict[str, Any]:
+        """处理文件下载（支持分段并行、断点续传和校验）"""
         try:
-            download_dir = "downloads"
-            if not os.path.exists(download_dir):
-                os.makedirs(download_dir)
-            
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             ext = request.file_extension or self._guess_extension(content_type)
-            filename = f"{download_dir}/export_{param_value}_{timestamp}{ext}"
+            filename = self.download_manager.unique_path("export", param_value, ext)
+            
+            # 落盘后收入内容寻址存储，重复内容只保留一份，对外文件名为硬链接
+            stored = {}
+            def on_stored(path, digest):
+                blob, stored['is_new'] = self.blob_store.adopt(path, digest, ext)
+                self.blob_store.link(blob, path)
             
-            total_size = 0
-            with open(filename, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-                        total_size += len(chunk)
+            if download_source is not None and not isinstance(response, CachedResponse):
+                reopen, key = download_source
+                info = self.download_manager.download(response, reopen, key, filename, on_stored)
+            else:
+                # 缓存命中的响应已在本地，直接复制
+                hasher = hashlib.sha256()
+                sink = self.download_manager.open_sink(filename + ".tmp", final_path=filename)
+                size = self.download_manager.copy_to_sink(response, sink, hasher)
+                digest = hasher.hexdigest()
+                sink.on_close = lambda: on_stored(filename, digest)
+                sink.close(wait=False)
+                info = {'size': size, 'sha256': digest, 'segments': 1, 'resumed': False}
+            total_size = info['size']
+            # 写入线程尚未收尾时，按存储中是否已有该内容判断是否重复
+            is_new = stored.get('is_new', not os.path.exists(self.blob_store.blob_path(info['sha256'], ext)))
             
             self.logger.log(f"文件下载成功: {filename}, param_value={param_value}, size={total_size}")
             return {
@@ -139,6 +229,11 @@ class RequestProcessor:
                 'message': '文件下载成功',
                 'filename': filename,
                 'size': total_size,
+                'sha256': info['sha256'],
+                'segments': info['segments'],
+                'resumed': info['resumed'],
+                'blob': info['sha256'],
+                'deduplicated': not is_new,
                 'content_type': content_type
             }
             
@@ -150,7 +245,8 @@ class RequestProcessor:
                 'response_time': response_time
             }
     
-    def _handle_large_json_response(self, response, request: CurlRequest, param_value: str, response_time: int, content_type: str) -> Dict[str, Any]:
+    def _handle_large_json_response(self, response, request: CurlRequest, param_value: str, response_time: int, content_type: str,
+                                    download_source=None) -> Dict[str, Any]:
         """处理大JSON响应（超过50MB）"""
         try:
             raw_content = response.content
@@ -158,24 +254,19 @@ class RequestProcessor:
             
             self.logger.log(f"处理大JSON响应: param_value={param_value}, size={content_size} bytes")
             
-            # 尝试解析JSON
+            digest = hashlib.sha256(raw_content).hexdigest()
+            
+            # 尝试解析JSON（相同内容只解析一次，结果共享）
             try:
-                json_data = response.json()
+                json_data = self.blob_store.intern(f"{digest}:json", content_size, response.json)
                 self.logger.log(f"大JSON响应解析成功: param_value={param_value}")
                 
                 # 生成预览
                 preview = raw_content[:self.max_preview_size].decode(errors='replace')
                 
-                # 同时保存到文件（作为备份）
-                download_dir = "downloads"
-                if not os.path.exists(download_dir):
-                    os.makedirs(download_dir)
-                
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"{download_dir}/large_json_{param_value}_{timestamp}.json"
-                
-                with open(filename, 'wb') as f:
-                    f.write(raw_content)
+                # 同时保存到文件（作为备份）：相同内容只写一次，交给写入线程，不等待落盘
+                filename = self.download_manager.unique_path("large_json", param_value, ".json")
+                self._archive_body(raw_content, digest, link_path=filename)
                 
                 return {
                     'param_value': param_value,
@@ -186,13 +277,14 @@ class RequestProcessor:
                     'preview': preview,    # 预览用于显示
                     'content_length': content_size,
                     'filename': filename,  # 备份文件路径
+                    'blob': digest,
                     'is_large_response': True
                 }
                 
             except json.JSONDecodeError as e:
                 self.logger.log(f"大响应JSON解析失败: param_value={param_value}, 错误: {e}", level='error')
                 # JSON解析失败，作为文件下载处理
-                return self._handle_file_download(response, request, param_value, response_time, content_type)
+                return self._handle_file_download(response, request, param_value, response_time, content_type, download_source)
                 
         except Exception as e:
             self.logger.log(f"大JSON响应处理失败: param_value={param_value}, 错误: {str(e)}", level='error')
@@ -206,54 +298,42 @@ class RequestProcessor:
         """处理JSON响应"""
         try:
             raw_content = response.content
+            digest = hashlib.sha256(raw_content).hexdigest()
             
-            # 尝试解析JSON，无论大小
-            try:
-                json_data = response.json()
+            # 尝试解析JSON，无论大小（相同内容只解析一次，结果共享；启用进程池时在进程池中解码）
+            # 解码结果取决于导出路径、提取配置和字符集，这些设置一并作为共享的键
+            decode_key = f"{digest}:{self._decode_settings(response.encoding)}"
+            decoded = self.blob_store.intern(decode_key, len(raw_content), lambda: self._decode_body(raw_content, response.encoding))
+            result = {
+                'param_value': param_value,
+                'status_code': response.status_code,
+                'response_time': response_time,
+                'content_length': len(raw_content),
+                'blob': digest,
+                'summary': decoded['summary']
+            }
+            if 'rows' in decoded:
+                # 采集时已提取，只保留行（和分页等需要的字段）；需要时把完整响应归档到内容寻址存储
+                result['rows'] = decoded['rows']
+                if 'fields' in decoded:
+                    result['fields'] = decoded['fields']
+                if self.extraction.archive:
+                    result['archive'] = self._archive_body(raw_content, digest)
+            else:
+                result['content'] = decoded['content']
+            if decoded['is_json']:
                 self.logger.log(f"JSON响应处理成功: param_value={param_value}")
-                
-                # 如果响应过大，同时保存完整数据和预览
-                if len(raw_content) > self.max_preview_size:
-                    preview = raw_content[:self.max_preview_size].decode(errors='replace')
-                    self.logger.log(f"JSON响应过大，仅显示前{self.max_preview_size}字节预览: param_value={param_value}")
-                    return {
-                        'param_value': param_value,
-                        'status_code': response.status_code,
-                        'response_time': response_time,
-                        'message': f'响应过大，仅显示前{self.max_preview_size}字节预览',
-                        'content': json_data,  # 保存完整的JSON数据用于导出
-                        'preview': preview,    # 保存预览用于显示
-                        'content_length': len(raw_content)
-                    }
-                else:
-                    return {
-                        'param_value': param_value,
-                        'status_code': response.status_code,
-                        'response_time': response_time,
-                        'content': json_data
-                    }
-            except json.JSONDecodeError:
+            else:
                 # 非JSON响应
-                text_content = raw_content.decode(errors='replace')
                 self.logger.log(f"JSON响应处理失败: param_value={param_value}, 非JSON响应")
-                
-                if len(raw_content) > self.max_preview_size:
-                    preview = text_content[:self.max_preview_size]
-                    return {
-                        'param_value': param_value,
-                        'status_code': response.status_code,
-                        'response_time': response_time,
-                        'content': text_content,  # 保存完整内容用于导出
-                        'preview': preview,       # 保存预览用于显示
-                        'content_length': len(raw_content)
-                    }
-                else:
-                    return {
-                        'param_value': param_value,
-                        'status_code': response.status_code,
-                        'response_time': response_time,
-                        'content': text_content
-                    }
+            
+            # 如果响应过大，同时保存完整数据和预览
+            if 'preview' in decoded:
+                result['preview'] = decoded['preview']
+                if decoded['is_json']:
+                    self.logger.log(f"JSON响应过大，仅显示前{self.max_preview_size}字节预览: param_value={param_value}")
+                    result['message'] = f'响应过大，仅显示前{self.max_preview_size}字节预览'
+            return result
             
         except Exception as e:
             self.logger.log(f"JSON响应处理失败: param_value={param_value}, 错误: {str(e)}", level='error')
@@ -263,6 +343,34 @@ class RequestProcessor:
                 'response_time': response_time
             }
     
+    def _decode_body(self, raw_content: bytes, encoding: Optional[str] = None) -> Dict[str, Any]:
+        """解码响应体并计算摘要"""
+        if self.post_processor is not None:
+            return self.post_processor.decode(raw_content, self.export_path, self.max_preview_size, self.extraction,
+                                              encoding, self.keep_paths)
+        return decode_body(raw_content, self.export_path, self.max_preview_size, extraction=self.extraction,
+                           encoding=encoding, keep_paths=self.keep_paths)
+    
+    def _decode_settings(self, encoding: Optional[str]) -> str:
+        """影响解码结果的设置：导出路径、保留字段、提取配置、是否裁剪（启用进程池时）和字符集"""
+        return repr((self.export_path, self.keep_paths, self.extraction, self.post_processor is not None, encoding))
+    
+    def _archive_body(self, raw_content: bytes, digest: str, link_path: Optional[str] = None) -> str:
+        """
+        把完整响应写入内容寻址存储（相同内容只写一次，交给写入线程，不等待落盘）
+        :param link_path: 落盘后在该路径创建指向归档的链接
+        :return: 归档路径
+        """
+        blob, tmp_path = self.blob_store.reserve(digest, ".json")
+        on_close = (lambda: self.blob_store.link(blob, link_path)) if link_path else None
+        if tmp_path:
+            sink = self.download_manager.open_sink(tmp_path, final_path=blob, on_close=on_close)
+            sink.write(raw_content)
+            sink.close(wait=False)
+        elif on_close:
+            on_close()
+        return blob
+    
     def _guess_extension(self, content_type: str) -> str:
         """根据Content-Type猜测文件扩展名"""
         if 'excel' in content_type or 'spreadsheet' in content_type:
@@ -284,11 +392,18 @@ class RequestModifier:
         self.logger = logger
     
     def modify_request(self, base_request: CurlRequest, param_key: str, param_value: str) -> CurlRequest:
-        import re
-        import json
-        import urllib.parse
         modified_request = copy.deepcopy(base_request)
-        
+        return self._apply(modified_request, param_key, param_value)
+    
+    def modify_request_multi(self, base_request: CurlRequest, bindings: Dict[str, str]) -> CurlRequest:
+        """一次替换多个参数，只复制一次基础请求"""
+        modified_request = copy.deepcopy(base_request)
+        for param_key, param_value in bindings.items():
+            self._apply(modified_request, param_key, param_value)
+        return modified_request
+    
+    def _apply(self, modified_request: CurlRequest, param_key: str, param_value: str) -> CurlRequest:
+        """在请求副本上就地替换单个参数"""
         # 添加调试日志
         self.logger.log(f"DEBUG: modify_request called with param_key='{param_key}', param_value='{param_value}'", level='debug')
         
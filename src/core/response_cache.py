@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP响应缓存
+磁盘存储响应体，SQLite 记录索引；支持 TTL、LRU 容量上限、ETag/Last-Modified 重新验证，
+并把同一时刻的相同请求合并为一次上游调用
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+@dataclass
+class CacheEntry:
+    key: str
+    path: str
+    status_code: int
+    headers: Dict[str, str]
+    size: int
+    created_at: float
+    etag: str = ''
+    last_modified: str = ''
+    encoding: str = ''  # 原响应的字符集（为空时按 Content-Type 推断）
+
+    def is_fresh(self, ttl: float) -> bool:
+        return time.time() - self.created_at < ttl
+
+    def to_response(self) -> 'CachedResponse':
+        return CachedResponse(self.status_code, self.headers, self.path, self.encoding)
+
+class CachedResponse:
+    """从缓存构造的响应对象，提供请求处理器用到的 requests.Response 接口"""
+
+    def __init__(self, status_code: int, headers: Dict[str, str], path: str, encoding: str = ''):
+        from requests.structures import CaseInsensitiveDict
+        from requests.utils import get_encoding_from_headers
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        # 与 requests.Response.encoding 一致：未记录时按 Content-Type 的 charset 推断
+        self.encoding = encoding or get_encoding_from_headers(self.headers)
+        self._path = path
+        self._content = None
+
+    @property
+    def content(self) -> bytes:
+        if self._content is None:
+            with open(self._path, 'rb') as f:
+                self._content = f.read()
+        return self._content
+
+    def json(self):
+        if self.encoding:
+            try:
+                return json.loads(self.content.decode(self.encoding, errors='replace'))
+            except LookupError:
+                pass
+        return json.loads(self.content)
+
+    def copy(self) -> 'CachedResponse':
+        return CachedResponse(self.status_code, dict(self.headers), self._path, self.encoding)
+
+    def iter_content(self, chunk_size: int = 8192):
+        with open(self._path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                yield chunk
+
+class ResponseCache:
+    """磁盘响应缓存，同一目录在进程内共享一个实例"""
+
+    _instances: Dict[str, 'ResponseCache'] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, cache_dir: str = "data/http_cache", ttl: float = 3600, max_size: int = 500 * 1024 * 1024,
+                 max_entry_size: int = 50 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_size = max_size
+        self.max_entry_size = max_entry_size
+        self.db_path = os.path.join(cache_dir, "index.db")
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Tuple[threading.Event, list]] = {}
+        self._inflight_lock = threading.Lock()
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        self.init_db()
+
+    @classmethod
+    def shared(cls, cache_dir: str = "data/http_cache", **kwargs) -> 'ResponseCache':
+        """获取目录对应的共享实例，并更新 TTL / 容量设置"""
+        with cls._instances_lock:
+            cache = cls._instances.get(cache_dir)
+            if cache is None:
+                cache = cls._instances[cache_dir] = cls(cache_dir, **kwargs)
+            else:
+                for name, value in kwargs.items():
+                    setattr(cache, name, value)
+            return cache
+
+    def init_db(self):
+        """初始化索引表"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                status_code INTEGER,
+                headers TEXT,
+                size INTEGER,
+                etag TEXT,
+                last_modified TEXT,
+                created_at REAL,
+                last_access REAL,
+                encoding TEXT
+            )
+        ''')
+        # 旧版本创建的索引表没有 encoding 列
+        if 'encoding' not in [row[1] for row in cursor.execute('PRAGMA table_info(entries)')]:
+            cursor.execute('ALTER TABLE entries ADD COLUMN encoding TEXT')
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def make_key(method: str, url: str, body: Any, headers: Optional[Dict[str, str]] = None) -> str:
+        """缓存键：方法 + 最终URL + 请求体摘要（同时区分身份相关请求头，避免不同账号串用数据）"""
+        digest = hashlib.sha256()
+        digest.update(method.upper().encode())
+        digest.update(b'\n')
+        digest.update(url.encode())
+        digest.update(b'\n')
+        digest.update(json.dumps(body, sort_keys=True, ensure_ascii=False, default=str).encode() if body else b'')
+        for name in ('Authorization', 'Cookie'):
+            value = next((v for k, v in (headers or {}).items() if k.lower() == name.lower()), '')
+            digest.update(b'\n' + value.encode())
+        return digest.hexdigest()
+
+    def _body_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.bin")
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """读取缓存条目（不判断新鲜度），并更新访问时间"""
+        with self._lock:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute('SELECT status_code, headers, size, etag, last_modified, created_at, encoding FROM entries WHERE key = ?', (key,))
+            row = cursor.fetchone()
+            if row:
+                cursor.execute('UPDATE entries SET last_access = ? WHERE key = ?', (time.time(), key))
+                conn.commit()
+            conn.close()
+        path = self._body_path(key)
+        if not row or not os.path.exists(path):
+            return None
+        return CacheEntry(key, path, row[0], json.loads(row[1]), row[2], row[5], row[3] or '', row[4] or '', row[6] or '')
+
+    def refresh(self, entry: CacheEntry) -> CacheEntry:
+        """304 重新验证成功后刷新创建时间"""
+        entry.created_at = time.time()
+        with self._lock:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute('UPDATE entries SET created_at = ?, last_access = ? WHERE key = ?',
+                         (entry.created_at, entry.created_at, entry.key))
+            conn.commit()
+            conn.close()
+        return entry
+
+    def is_cacheable(self, response) -> bool:
+        """只缓存大小已知或为JSON、且不超过单条上限的 2xx 响应"""
+        if not 200 <= response.status_code < 300:
+            return False
+        length = response.headers.get('content-length')
+        if length:
+            return int(length) <= self.max_entry_size
+        return 'json' in response.headers.get('content-type', '')
+
+    def put(self, key: str, response) -> Optional[CacheEntry]:
+        """读取响应体并写入缓存，超过单条上限时返回 None"""
+        body = response.content
+        if len(body) > self.max_entry_size:
+            return None
+        path = self._body_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in ('transfer-encoding', 'content-encoding')}
+        headers['content-length'] = str(len(body))
+        now = time.time()
+        entry = CacheEntry(key, path, response.status_code, headers, len(body), now,
+                           response.headers.get('etag', ''), response.headers.get('last-modified', ''),
+                           getattr(response, 'encoding', None) or '')
+        with self._lock:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute('''
+                INSERT OR REPLACE INTO entries (key, status_code, headers, size, etag, last_modified, created_at, last_access, encoding)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (key, entry.status_code, json.dumps(headers), entry.size, entry.etag, entry.last_modified, now, now,
+                  entry.encoding))
+            conn.commit()
+            self._evict(conn)
+            conn.close()
+        return entry
+
+    def _evict(self, conn):
+        """按最近访问时间淘汰，直到总大小不超过上限"""
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_size:
+            return
+        for key, size in conn.execute('SELECT key, size FROM entries ORDER BY last_access').fetchall():
+            if total <= self.max_size:
+                break
+            conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+            try:
+                os.remove(self._body_path(key))
+            except OSError:
+                pass
+            total -= size
+        conn.commit()
+
+    def coalesce(self, key: str, fetch: Callable[[], Tuple[Any, str]]) -> Tuple[Any, str]:
+        """
+        合并同一时刻的相同请求：第一个调用者执行 fetch，其余等待并复用其缓存响应
+        fetch 返回 (response, 缓存状态)
+        """
+        with self._inflight_lock:
+            waiting = self._inflight.get(key)
+            if waiting is None:
+                waiting = self._inflight[key] = (threading.Event(), [])
+                leader = True
+            else:
+                leader = False
+        event, shared = waiting
+        if not leader:
+            event.wait()
+            if shared and isinstance(shared[0], CachedResponse):
+                return shared[0].copy(), 'coalesced'
+            return fetch()
+        try:
+            response, status = fetch()
+            shared.append(response)
+            return response, status
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+            event.set()
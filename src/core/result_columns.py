@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+列式结果元数据
+每个结果的状态码、耗时、大小、错误类别、尝试次数按列存放在 NumPy 数组中（每条约 30 字节），
+参数值和错误类别只保存一份并以编号引用；状态码分布、错误归类、按状态码的延迟统计和最慢请求
+都以向量化方式计算，百万级结果也能即时得到统计。
+结果字典只保留响应内容等其余字段，元数据写入列后从字典中删除，展示和导出时用 restore 还原
+"""
+
+import threading
+from typing import Any, Dict, List, Tuple
+import numpy as np
+
+NO_STATUS = -1  # 没有收到响应（超时、连接错误等）
+# 移入列中的结果字段；大小原来的字段名记在 size_key 中（0 无，1 content_length，2 size）
+COLUMN_KEYS = ('param_value', 'status_code', 'response_time', 'content_length', 'size')
+SIZE_KEYS = (None, 'content_length', 'size')
+
+class ResultColumns:
+    """按完成顺序追加的结果元数据列，多个工作线程并发追加"""
+
+    __slots__ = ('status', 'latency', 'size', 'size_key', 'error_code', 'attempts', 'ok', 'row', 'param_id',
+                 'result_index', 'error_index', '_length', '_params', '_param_ids', '_errors', '_error_ids', '_lock')
+    _COLUMNS = ('status', 'latency', 'size', 'size_key', 'error_code', 'attempts', 'ok', 'row', 'param_id',
+                'result_index', 'error_index')
+
+    def __init__(self, capacity: int = 1024):
+        self.status = np.empty(capacity, np.int16)      # HTTP 状态码，无响应为 -1
+        self.latency = np.empty(capacity, np.int32)     # 耗时(ms)
+        self.size = np.empty(capacity, np.int64)        # 响应大小(字节)
+        self.size_key = np.empty(capacity, np.int8)     # 大小原来的字段名（见 SIZE_KEYS）
+        self.error_code = np.empty(capacity, np.int16)  # 错误类别编号，成功为 -1
+        self.attempts = np.empty(capacity, np.int8)     # 尝试次数
+        self.ok = np.empty(capacity, np.bool_)          # 是否成功（在结果列表中）
+        self.row = np.empty(capacity, np.int32)         # 在结果列表或错误列表中的位置
+        self.param_id = np.empty(capacity, np.int32)    # 参数值编号
+        self.result_index = np.empty(capacity, np.int32)  # 结果列表第 row 条对应的列下标
+        self.error_index = np.empty(capacity, np.int32)   # 错误列表第 row 条对应的列下标
+        self._length = 0
+        self._params: List[str] = []
+        self._param_ids: Dict[str, int] = {}
+        self._errors: List[str] = []
+        self._error_ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _grow(self):
+        capacity = max(1024, len(self.status) * 2)
+        for name in self._COLUMNS:
+            column = getattr(self, name)
+            grown = np.empty(capacity, column.dtype)
+            grown[:self._length] = column[:self._length]
+            setattr(self, name, grown)
+
+    @staticmethod
+    def _intern(value: str, values: List[str], ids: Dict[str, int]) -> int:
+        index = ids.get(value)
+        if index is None:
+            index = ids[value] = len(values)
+            values.append(value)
+        return index
+
+    def append(self, result: Dict[str, Any], row: int) -> Dict[str, Any]:
+        """
+        追加一条结果的元数据
+        :param row: 该结果在结果列表（成功）或错误列表（失败）中的位置；应先追加到列再加入列表
+        :return: 去掉元数据字段的结果字典（新建的字典，删除字段后的原字典不会缩小），应保存它而不是原字典
+        """
+        error = result.get('error')
+        status = result.get('status_code')
+        size_key = 2 if 'size' in result else 1 if 'content_length' in result else 0
+        size = (result.get(SIZE_KEYS[size_key]) or 0) if size_key else 0
+        with self._lock:
+            if self._length == len(self.status):
+                self._grow()
+            i = self._length
+            self.status[i] = status if isinstance(status, int) else NO_STATUS
+            self.latency[i] = result.get('response_time', 0) or 0
+            self.size[i] = size
+            self.size_key[i] = size_key
+            # 错误信息按冒号前的类别归并（如 "请求失败: ..."）
+            self.error_code[i] = (self._intern(str(error).split(':')[0].strip()[:40], self._errors, self._error_ids)
+                                  if error is not None else -1)
+            self.attempts[i] = min(127, result.get('attempts', 1))
+            self.ok[i] = error is None
+            self.row[i] = row
+            self.param_id[i] = self._intern(str(result.get('param_value', '')), self._params, self._param_ids)
+            (self.error_index if error is not None else self.result_index)[row] = i
+            self._length = i + 1
+        return {key: value for key, value in result.items() if key not in COLUMN_KEYS}
+    
+    def restore(self, result: Dict[str, Any], ok: bool, row: int) -> Dict[str, Any]:
+        """还原结果字典：返回带参数值、状态码、耗时和大小的副本（结果列表 ok=True，错误列表 ok=False）"""
+        i = int((self.result_index if ok else self.error_index)[row])
+        record: Dict[str, Any] = {'param_value': self._params[self.param_id[i]]}
+        if self.status[i] != NO_STATUS:
+            record['status_code'] = int(self.status[i])
+        record['response_time'] = int(self.latency[i])
+        size_key = SIZE_KEYS[self.size_key[i]]
+        if size_key:
+            record[size_key] = int(self.size[i])
+        record.update(result)
+        return record
+
+    def _view(self, name: str) -> np.ndarray:
+        return getattr(self, name)[:self._length]
+
+    def summary(self) -> Dict[str, Any]:
+        """总数、成功数、失败数、平均耗时（成功请求）和总字节数"""
+        ok = self._view('ok')
+        success = int(ok.sum())
+        latency = self._view('latency')[ok]
+        return {
+            'total': self._length,
+            'success': success,
+            'failed': self._length - success,
+            'avg_latency_ms': float(latency.mean()) if success else 0.0,
+            'total_bytes': int(self._view('size').sum()),
+        }
+
+    def status_distribution(self) -> List[Tuple[int, int]]:
+        """状态码分布 [(状态码, 次数)]，无响应记为 -1"""
+        codes, counts = np.unique(self._view('status'), return_counts=True)
+        return list(zip(codes.tolist(), counts.tolist()))
+
+    def error_groups(self) -> List[Tuple[str, int]]:
+        """错误按类别归并 [(类别, 次数)]，次数多的在前"""
+        codes = self._view('error_code')
+        codes = codes[codes >= 0]
+        if not len(codes):
+            return []
+        counts = np.bincount(codes, minlength=len(self._errors))
+        order = np.argsort(-counts, kind='stable')
+        return [(self._errors[i], int(counts[i])) for i in order if counts[i]]
+
+    def latency_by_status(self) -> List[Dict[str, Any]]:
+        """按状态码分组的耗时统计：次数、平均、P50、P95、最大（ms）"""
+        if not self._length:
+            return []
+        status = self._view('status')
+        latency = self._view('latency')
+        order = np.lexsort((latency, status))
+        status, latency = status[order], latency[order]
+        codes, starts, counts = np.unique(status, return_index=True, return_counts=True)
+        ends = starts + counts
+        # 各组已按耗时升序排列，百分位直接按下标取
+        p50 = latency[starts + (counts - 1) * 50 // 100]
+        p95 = latency[starts + (counts - 1) * 95 // 100]
+        sums = np.add.reduceat(latency.astype(np.int64), starts)
+        return [{'status': int(c), 'count': int(n), 'mean_ms': float(s / n), 'p50_ms': int(a),
+                 'p95_ms': int(b), 'max_ms': int(latency[e - 1])}
+                for c, n, s, a, b, e in zip(codes, counts, sums, p50, p95, ends)]
+
+    def slowest(self, n: int = 10) -> List[Dict[str, Any]]:
+        """耗时最长的 n 个请求"""
+        latency = self._view('latency')
+        if not len(latency):
+            return []
+        n = min(n, len(latency))
+        top = np.argpartition(latency, len(latency) - n)[len(latency) - n:]
+        top = top[np.argsort(-latency[top], kind='stable')]
+        return [self._record(i) for i in top.tolist()]
+
+    def _record(self, i: int) -> Dict[str, Any]:
+        error_code = int(self.error_code[i])
+        return {
+            'param_value': self._params[self.param_id[i]],
+            'status_code': int(self.status[i]) if self.status[i] != NO_STATUS else None,
+            'response_time': int(self.latency[i]),
+            'size': int(self.size[i]),
+            'error': self._errors[error_code] if error_code >= 0 else '',
+            'ok': bool(self.ok[i]),
+            'row': int(self.row[i]),
+        }
+
+    def success_columns(self) -> Dict[str, np.ndarray]:
+        """成功结果的元数据列，按结果列表中的顺序排列（与结果列表逐行对应）"""
+        ok = self._view('ok')
+        order = np.argsort(self._view('row')[ok], kind='stable')
+        params = np.array(self._params, dtype=object)
+        return {
+            'param_value': params[self._view('param_id')[ok][order]] if len(params) else np.empty(0, dtype=object),
+            'status_code': self._view('status')[ok][order],
+            'response_time': self._view('latency')[ok][order],
+            'size': self._view('size')[ok][order],
+        }
@@ -6,22 +6,33 @@
 """
 
 import os
+import json
 import streamlit as st
 from datetime import datetime
-from typing import Dict, List, Any
-from src.utils.utils import json_to_excel, get_by_path
+from typing import Dict, List, Any, Optional
+from src.utils.utils import json_to_excel, get_by_path, write_zip_streaming
 from src.models.models import JsonStructureDB
+from src.core.spreadsheet_merger import SpreadsheetMerger
+from src.core.result_columns import ResultColumns, NO_STATUS
 
 class ResultDisplay:
     """结果显示器"""
     
+    max_inline_download = 100 * 1024 * 1024  # 超过该大小的打包文件只保存到本地，不提供浏览器下载
+    
     def __init__(self):
         self.db = JsonStructureDB()
     
-    def show_results(self, results: List[Dict], errors: List[Dict], downloaded_files: List[Dict]):
-        """显示执行结果"""
+    def show_results(self, results: List[Dict], errors: List[Dict], downloaded_files: List[Dict],
+                     columns: Optional[ResultColumns] = None):
+        """
+        显示执行结果
+        :param columns: 批量任务的结果元数据列；提供时统计和摘要表直接基于列计算
+        """
         if not results and not errors:
             return
+        if columns is not None and len(columns) != len(results) + len(errors):
+            columns = None
         
         # 显示统计信息
         col1, col2, col3, col4 = st.columns(4)
@@ -33,25 +44,75 @@ class ResultDisplay:
             st.metric("失败", len(errors), delta=-len(errors))
         with col4:
             if results:
-                avg_time = sum(r['response_time'] for r in results) / len(results)
+                if columns is not None:
+                    avg_time = round(columns.summary()['avg_latency_ms'], 1)
+                else:
+                    avg_time = sum(r.get('response_time', 0) for r in results) / len(results)
                 st.metric("平均响应时间", f"{avg_time}ms")
         
+        if columns is not None:
+            self._show_result_stats(columns)
+        
         # 显示下载的文件
         if downloaded_files:
             self._show_downloaded_files(downloaded_files)
         
         # 显示详细结果
         if results:
-            self._show_detailed_results(results)
+            self._show_detailed_results(results, errors, columns)
         
         # 显示错误信息
         if errors:
-            self._show_errors(errors)
+            self._show_errors(errors, columns)
+    
+    def _show_result_stats(self, columns: ResultColumns, slowest: int = 10):
+        """结果统计：状态码分布、错误归类、按状态码的耗时、最慢请求"""
+        with st.expander("📈 结果统计", expanded=False):
+            col1, col2 = st.columns(2)
+            with col1:
+                st.write("**状态码分布**")
+                st.dataframe([{'状态码': str(code) if code != NO_STATUS else '无响应', '次数': count}
+                              for code, count in columns.status_distribution()],
+                             use_container_width=True, hide_index=True)
+            with col2:
+                st.write("**错误归类**")
+                groups = columns.error_groups()
+                if groups:
+                    st.dataframe([{'错误类型': label, '次数': count} for label, count in groups],
+                                 use_container_width=True, hide_index=True)
+                else:
+                    st.caption("没有错误")
+            
+            st.write("**按状态码的耗时 (ms)**")
+            st.dataframe([{'状态码': str(row['status']) if row['status'] != NO_STATUS else '无响应', '次数': row['count'],
+                           '平均': round(row['mean_ms'], 1), 'P50': row['p50_ms'], 'P95': row['p95_ms'],
+                           '最大': row['max_ms']} for row in columns.latency_by_status()],
+                         use_container_width=True, hide_index=True)
+            
+            st.write(f"**最慢的 {slowest} 个请求**")
+            st.dataframe([{'参数': row['param_value'], '状态': row['status_code'], '时间(ms)': row['response_time'],
+                           '大小(字节)': row['size'], '错误': row['error']} for row in columns.slowest(slowest)],
+                         use_container_width=True, hide_index=True)
+    
+    @staticmethod
+    def _set_page(state_key: str, step: int, total_pages: int):
+        """翻页回调"""
+        page = st.session_state.get(state_key, 0) + step
+        st.session_state[state_key] = min(max(0, page), total_pages - 1)
+    
+    @staticmethod
+    def _select_export_path(path_pattern: str):
+        """选择数据库结构的回调，同步更新导出路径输入框"""
+        st.session_state["curl_export_path"] = path_pattern
+        st.session_state["export_path_input"] = path_pattern
     
     def _show_downloaded_files(self, downloaded_files: List[Dict]):
         """显示下载的文件"""
         st.subheader('📁 下载的文件')
         
+        self._show_bundle_download(downloaded_files)
+        self._show_merge_panel(downloaded_files)
+        
         # 限制显示的文件数量，防止浏览器卡死
         max_display_files = st.session_state.get('max_display_files', 30)  # 使用用户配置或默认30
         total_files = len(downloaded_files)
@@ -69,17 +130,16 @@ class ResultDisplay:
             
             col1, col2, col3 = st.columns([1, 2, 1])
             with col1:
-                if st.button("◀️ 上一页", key="file_prev", disabled=st.session_state.get('file_page', 0) == 0):
-                    st.session_state['file_page'] = max(0, st.session_state.get('file_page', 0) - 1)
-                    st.rerun()
+                # 使用回调翻页，只触发所在片段的刷新
+                st.button("◀️ 上一页", key="file_prev", disabled=st.session_state.get('file_page', 0) == 0,
+                          on_click=self._set_page, args=('file_page', -1, total_pages))
             
             with col2:
                 st.write(f"第 {st.session_state.get('file_page', 0) + 1} 页，共 {total_pages} 页")
             
             with col3:
-                if st.button("下一页 ▶️", key="file_next", disabled=st.session_state.get('file_page', 0) >= total_pages - 1):
-                    st.session_state['file_page'] = min(total_pages - 1, st.session_state.get('file_page', 0) + 1)
-                    st.rerun()
+                st.button("下一页 ▶️", key="file_next", disabled=st.session_state.get('file_page', 0) >= total_pages - 1,
+                          on_click=self._set_page, args=('file_page', 1, total_pages))
             
             # 计算当前页的文件
             current_page = st.session_state.get('file_page', 0)
@@ -116,90 +176,195 @@ class ResultDisplay:
             st.info(f"📊 完整文件统计: 共 {total_files} 个文件")
             st.info("💡 提示: 所有文件都已保存到本地，可以通过文件管理器查看")
     
-    def _show_detailed_results(self, results: List[Dict]):
-        """显示详细结果"""
-        # 显示所有结果，不限制数量
-        display_results = results
-        total_results = len(results)
+    def _show_bundle_download(self, downloaded_files: List[Dict]):
+        """打包全部下载文件：逐块写入磁盘上的 ZIP，不把文件读入内存"""
+        bundle_key = (id(downloaded_files), len(downloaded_files))
+        bundle = st.session_state.get('download_bundle')
+        if bundle and bundle[0] != bundle_key:
+            bundle = None
         
-        with st.expander("📋 详细结果", expanded=False):
-            # 添加分页功能
-            page_size = st.session_state.get('page_size', 20)  # 使用用户配置或默认20
-            if total_results > page_size:
-                total_pages = (len(display_results) + page_size - 1) // page_size
-                
-                col1, col2, col3 = st.columns([1, 2, 1])
-                with col1:
-                    if st.button("◀️ 上一页", disabled=st.session_state.get('result_page', 0) == 0):
-                        st.session_state['result_page'] = max(0, st.session_state.get('result_page', 0) - 1)
-                        st.rerun()
-                
-                with col2:
-                    st.write(f"第 {st.session_state.get('result_page', 0) + 1} 页，共 {total_pages} 页")
-                
-                with col3:
-                    if st.button("下一页 ▶️", disabled=st.session_state.get('result_page', 0) >= total_pages - 1):
-                        st.session_state['result_page'] = min(total_pages - 1, st.session_state.get('result_page', 0) + 1)
-                        st.rerun()
-                
-                # 计算当前页的结果
-                current_page = st.session_state.get('result_page', 0)
-                start_idx = current_page * page_size
-                end_idx = min(start_idx + page_size, len(display_results))
-                page_results = display_results[start_idx:end_idx]
-                
-                st.write(f"显示第 {start_idx + 1}-{end_idx} 个结果（共 {len(display_results)} 个）")
+        if st.button(f"📦 打包全部 {len(downloaded_files)} 个文件", key="bundle_downloads"):
+            try:
+                download_dir = os.path.dirname(downloaded_files[0]['filename']) or "downloads"
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                bundle_path = os.path.join(download_dir, f"bundle_{timestamp}.zip")
+                with st.spinner("正在打包..."):
+                    file_count = write_zip_streaming((f['filename'] for f in downloaded_files), bundle_path)
+                bundle = (bundle_key, bundle_path, file_count)
+                st.session_state['download_bundle'] = bundle
+            except Exception as e:
+                st.error(f"❌ 打包失败: {str(e)}")
+        
+        if bundle and os.path.exists(bundle[1]):
+            _, bundle_path, file_count = bundle
+            size = os.path.getsize(bundle_path)
+            st.success(f"✅ 已打包 {file_count} 个文件: {bundle_path}（{size:,} 字节）")
+            if size <= self.max_inline_download:
+                with open(bundle_path, 'rb') as f:
+                    st.download_button(
+                        label="📥 下载压缩包",
+                        data=f,
+                        file_name=os.path.basename(bundle_path),
+                        mime="application/zip",
+                        key="bundle_download_btn"
+                    )
             else:
-                page_results = display_results
+                st.info("💡 压缩包较大，请直接从服务器目录获取")
+    
+    def _show_merge_panel(self, downloaded_files: List[Dict]):
+        """合并下载的 xlsx / csv 文件为一个数据集，每行标注参数值"""
+        merge_key = (id(downloaded_files), len(downloaded_files))
+        merged = st.session_state.get('merged_dataset')
+        if merged and merged[0] != merge_key:
+            merged = None
+        
+        col1, col2 = st.columns([1, 2])
+        with col1:
+            merge_format = st.selectbox("合并输出格式", ["CSV", "Excel", "SQLite"], key="merge_format")
+        with col2:
+            st.write("")
+            merge_clicked = st.button("🧩 合并为一个数据集", key="merge_downloads")
+        
+        if merge_clicked:
+            try:
+                download_dir = os.path.dirname(downloaded_files[0]['filename']) or "downloads"
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                ext = {"CSV": ".csv", "Excel": ".xlsx", "SQLite": ".db"}[merge_format]
+                output_path = os.path.join(download_dir, f"merged_{timestamp}{ext}")
+                progress_bar = st.progress(0.0, text="正在读取文件...")
+                summary = SpreadsheetMerger().merge(
+                    downloaded_files, output_path,
+                    progress=lambda done, total: progress_bar.progress(done / total, text=f"正在读取文件 {done}/{total}")
+                )
+                progress_bar.empty()
+                merged = (merge_key, output_path, summary)
+                st.session_state['merged_dataset'] = merged
+            except Exception as e:
+                st.error(f"❌ 合并失败: {str(e)}")
+        
+        if merged and os.path.exists(merged[1]):
+            _, output_path, summary = merged
+            size = os.path.getsize(output_path)
+            st.success(f"✅ 已合并 {summary['files']} 个文件，共 {summary['rows']} 行 {summary['columns']} 列: "
+                       f"{output_path}（{size:,} 字节）")
+            if summary['failed']:
+                st.warning(f"⚠️ {len(summary['failed'])} 个文件读取失败，已跳过")
+            if size <= self.max_inline_download:
+                with open(output_path, 'rb') as f:
+                    st.download_button(
+                        label="📥 下载合并结果",
+                        data=f,
+                        file_name=os.path.basename(output_path),
+                        key="merged_download_btn"
+                    )
+            else:
+                st.info("💡 文件较大，请直接从服务器目录获取")
+    
+    def _build_summary_frame(self, results: List[Dict], columns: Optional[ResultColumns] = None):
+        """构建结果摘要表（参数、状态、时间、大小、错误），同一批结果只构建一次"""
+        cache_key = (id(results), len(results))
+        cached = st.session_state.get('_result_summary')
+        if cached and cached[0] == cache_key:
+            return cached[1]
+        
+        import pandas as pd
+        if columns is not None:
+            # 直接使用元数据列，不再逐条读取结果字典
+            data = columns.success_columns()
+            summary = pd.DataFrame({
+                '参数': data['param_value'],
+                '状态': data['status_code'],
+                '时间(ms)': data['response_time'],
+                '大小(字节)': data['size'],
+                '错误': '',
+            })
+        else:
+            summary = pd.DataFrame({
+                '参数': [r.get('param_value', '') for r in results],
+                '状态': [r.get('status_code') for r in results],
+                '时间(ms)': [r.get('response_time') for r in results],
+                '大小(字节)': [r.get('size', r.get('content_length')) for r in results],
+                '错误': [r.get('error', '') for r in results],
+            })
+        st.session_state['_result_summary'] = (cache_key, summary)
+        st.session_state['_result_previews'] = {}
+        return summary
+    
+    @staticmethod
+    def _restore(result: Dict, ok: bool, row: int, columns: Optional[ResultColumns]) -> Dict:
+        """结果字典中的参数值、状态码、耗时和大小已移入结果列，显示和导出时还原"""
+        return columns.restore(result, ok, row) if columns is not None else result
+    
+    def _get_preview(self, result: Dict, row: int, limit: int = 500) -> str:
+        """按需生成截断预览并缓存，只有被选中的行才会计算"""
+        previews = st.session_state.setdefault('_result_previews', {})
+        if row not in previews:
+            if 'preview' in result:
+                text = result['preview']
+            else:
+                content = result['rows'] if 'rows' in result else result.get('content', '')
+                text = content if isinstance(content, str) else json.dumps(content, ensure_ascii=False, default=str)
+            previews[row] = text[:limit] + "..." if len(text) > limit else text
+        return previews[row]
+    
+    def _show_detailed_results(self, results: List[Dict], errors: List[Dict], columns: Optional[ResultColumns] = None):
+        """显示详细结果：单个虚拟滚动表格，选中行时才加载完整内容"""
+        with st.expander("📋 详细结果", expanded=False):
+            summary = self._build_summary_frame(results, columns)
+            event = st.dataframe(
+                summary,
+                use_container_width=True,
+                hide_index=True,
+                on_select="rerun",
+                selection_mode="single-row",
+                key="result_table"
+            )
             
-            # 显示结果
-            for i, result in enumerate(page_results):
-                with st.container():
-                    col1, col2 = st.columns([1, 3])
-                    with col1:
-                        st.write(f"**请求 {start_idx + i + 1 if 'start_idx' in locals() else i + 1}**")
-                        st.write(f"参数: {result.get('param_value', 'N/A')}")
-                        st.write(f"状态: {result.get('status_code', 'N/A')}")
-                        st.write(f"时间: {result.get('response_time', 'N/A')}ms")
-                    
-                    with col2:
-                        if 'message' in result:
-                            st.success(result['message'])
-                            # 如果是大响应，显示额外信息
-                            if result.get('is_large_response'):
-                                st.info(f"📁 备份文件: {result.get('filename', 'N/A')}")
-                                st.info(f"📊 响应大小: {result.get('content_length', 0):,} 字节")
-                        elif 'error' in result:
-                            st.error(result['error'])
-                        else:
-                            # 显示响应内容预览 - 限制内容长度
-                            if 'preview' in result:
-                                # 大响应，显示预览
-                                preview_content = result['preview'][:500] + "..." if len(result['preview']) > 500 else result['preview']
-                                st.text_area(f"响应内容预览:", preview_content, height=100, key=f"preview_{start_idx + i if 'start_idx' in locals() else i}")
-                                st.info(f"完整响应大小: {result.get('content_length', 0):,} 字节")
-                                if result.get('is_large_response'):
-                                    st.info(f"📁 备份文件: {result.get('filename', 'N/A')}")
-                            else:
-                                # 正常响应，显示完整内容 - 限制内容长度
-                                content = result.get('content', '')
-                                if isinstance(content, dict):
-                                    # 对于JSON，只显示前几个字段
-                                    if len(str(content)) > 1000:
-                                        st.json(dict(list(content.items())[:5]))
-                                        st.info(f"显示前5个字段，完整内容共{len(content)}个字段")
-                                    else:
-                                        st.json(content)
-                                else:
-                                    content_str = str(content)
-                                    if len(content_str) > 500:
-                                        content_str = content_str[:500] + "..."
-                                    st.text_area(f"响应内容:", content_str, height=100, key=f"content_{start_idx + i if 'start_idx' in locals() else i}")
+            selected_rows = event.selection.rows if event else []
+            if selected_rows:
+                row = selected_rows[0]
+                self._show_result_detail(self._restore(results[row], True, row, columns), row)
+            else:
+                st.caption("💡 点击表格中的行查看响应详情")
             
             # 显示完整结果统计
-            st.info(f"📊 完整统计: 成功 {len([r for r in results if 'error' not in r])} 个，失败 {len([r for r in results if 'error' in r])} 个")
+            st.info(f"📊 完整统计: 成功 {len(results)} 个，失败 {len(errors)} 个")
+    
+    def _show_result_detail(self, result: Dict, row: int):
+        """显示单条结果的详情"""
+        st.write(f"**请求 {row + 1}** ｜ 参数: {result.get('param_value', 'N/A')} ｜ "
+                 f"状态: {result.get('status_code', 'N/A')} ｜ 时间: {result.get('response_time', 'N/A')}ms")
+        
+        if 'message' in result:
+            st.success(result['message'])
+            # 如果是大响应，显示额外信息
+            if result.get('is_large_response'):
+                st.info(f"📁 备份文件: {result.get('filename', 'N/A')}")
+                st.info(f"📊 响应大小: {result.get('content_length', 0):,} 字节")
+        elif 'error' in result:
+            st.error(result['error'])
+        elif 'preview' in result:
+            # 大响应，显示预览
+            st.text_area("响应内容预览:", self._get_preview(result, row), height=100, key=f"preview_{row}")
+            st.info(f"完整响应大小: {result.get('content_length', 0):,} 字节")
+        elif 'rows' in result:
+            # 采集时已提取的行
+            rows = result['rows']
+            st.json(rows[:5])
+            st.info(f"采集时提取 {len(rows)} 行" + (f"，显示前5行" if len(rows) > 5 else "")
+                    + (f" ｜ 完整响应已归档: {result['archive']}" if result.get('archive') else ""))
+        else:
+            content = result.get('content', '')
+            if isinstance(content, dict) and len(content) <= 5:
+                st.json(content)
+            elif isinstance(content, dict):
+                # 对于JSON，只显示前几个字段
+                st.json(dict(list(content.items())[:5]))
+                st.info(f"显示前5个字段，完整内容共{len(content)}个字段")
+            else:
+                st.text_area("响应内容:", self._get_preview(result, row), height=100, key=f"content_{row}")
     
-    def _show_errors(self, errors: List[Dict]):
+    def _show_errors(self, errors: List[Dict], columns: Optional[ResultColumns] = None):
         """显示错误信息"""
         st.subheader('❌ 错误信息')
         
@@ -214,7 +379,8 @@ class ResultDisplay:
             display_errors = errors
         
         # 显示错误信息
-        for error in display_errors:
+        for i, error in enumerate(display_errors):
+            error = self._restore(error, False, i, columns)
             st.error(f"参数 {error.get('param_value', 'N/A')}: {error.get('error', 'Unknown error')}")
         
         # 显示完整错误统计
@@ -222,8 +388,12 @@ class ResultDisplay:
             st.info(f"📊 完整错误统计: 共 {total_errors} 个错误")
             st.info("💡 提示: 使用导出功能可以获取所有错误详情")
     
-    def show_export_interface(self, results: List[Dict], is_download_request: bool = False):
-        """显示导出界面"""
+    def show_export_interface(self, results: List[Dict], is_download_request: bool = False,
+                              columns: Optional[ResultColumns] = None):
+        """
+        显示导出界面
+        :param columns: 批量任务的结果元数据列，用于还原每条结果的参数值
+        """
         if is_download_request:
             return
         
@@ -247,9 +417,10 @@ class ResultDisplay:
                     default_path = detected_path
                     st.success(f"自动检测到结构: {detected_path}")
         
+        if "export_path_input" not in st.session_state:
+            st.session_state["export_path_input"] = default_path
         export_path = st.text_input(
             "导出字段路径（如 resultValue.items、data.items，可留空导出全部response）", 
-            value=default_path,
             key="export_path_input"
         )
         st.session_state["curl_export_path"] = export_path
@@ -266,10 +437,8 @@ class ResultDisplay:
             cols = st.columns(3)
             for i, structure in enumerate(active_structures):
                 with cols[i % 3]:
-                    if st.button(f"📋 {structure.name}", key=f"structure_{i}"):
-                        st.session_state["curl_export_path"] = structure.path_pattern
-                        st.success(f"已选择结构: {structure.name} ({structure.path_pattern})")
-                        st.rerun()
+                    st.button(f"📋 {structure.name}", key=f"structure_{i}",
+                              on_click=self._select_export_path, args=(structure.path_pattern,))
         
         # 导出按钮
         if st.button('📊 导出为Excel', key="export_excel_btn"):
@@ -281,18 +450,29 @@ class ResultDisplay:
                 # 移除调试信息
                 
                 for i, result in enumerate(results):
-                    if 'content' in result and isinstance(result['content'], dict):
+                    result = self._restore(result, True, i, columns)
+                    if 'rows' in result:
+                        # 采集时已按声明的路径和字段提取，直接使用
+                        for item in result['rows']:
+                            row = dict(item)
+                            row['_param_value'] = result['param_value']
+                            row['_request_index'] = i + 1
+                            excel_data.append(row)
+                    elif 'content' in result and isinstance(result['content'], dict):
                         if current_export_path and current_export_path.strip():
                             # 使用指定路径提取数据
                             extracted_data = get_by_path(result['content'], current_export_path.strip())
                             
                             if extracted_data:
+                                # 相同内容的响应共享同一对象，复制后再标注参数值
                                 if isinstance(extracted_data, list):
                                     for item in extracted_data:
+                                        item = dict(item) if isinstance(item, dict) else {'value': item}
                                         item['_param_value'] = result['param_value']
                                         item['_request_index'] = i + 1  # 添加请求序号
                                         excel_data.append(item)
                                 else:
+                                    extracted_data = dict(extracted_data) if isinstance(extracted_data, dict) else {'value': extracted_data}
                                     extracted_data['_param_value'] = result['param_value']
                                     extracted_data['_request_index'] = i + 1  # 添加请求序号
                                     excel_data.append(extracted_data)
@@ -301,9 +481,10 @@ class ResultDisplay:
                                 st.warning(f"第{i+1}个请求: 路径 '{current_export_path}' 在结果中未找到数据")
                         else:
                             # 导出全部response
-                            result['content']['_param_value'] = result['param_value']
-                            result['content']['_request_index'] = i + 1  # 添加请求序号
-                            excel_data.append(result['content'])
+                            row = dict(result['content'])
+                            row['_param_value'] = result['param_value']
+                            row['_request_index'] = i + 1  # 添加请求序号
+                            excel_data.append(row)
                 
                 if excel_data:
                     # 生成Excel文件内容（内存流）
@@ -330,8 +511,11 @@ class ResultDisplay:
             except Exception as e:
                 st.error(f"❌ 导出失败: {str(e)}")
     
-    def show_analysis_interface(self, results: List[Dict]):
-        """显示分析界面"""
+    def show_analysis_interface(self, results: List[Dict], columns: Optional[ResultColumns] = None):
+        """
+        显示分析界面
+        :param columns: 批量任务的结果元数据列，导出时用于还原参数值、状态码等字段
+        """
         st.subheader('🔍 响应结构分析')
         
         if not results:
@@ -342,7 +526,7 @@ class ResultDisplay:
         with col1:
             if st.button('📊 导出到Excel'):
                 try:
-                    excel_data = json_to_excel(results)
+                    excel_data = json_to_excel([self._restore(result, True, i, columns) for i, result in enumerate(results)])
                     st.download_button(
                         label="下载Excel文件",
                         data=excel_data,
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行历史
+每次批量、分页或压测运行结束后，把配置、吞吐、延迟百分位、错误分布、字节数和用时
+写入 data/run_history.db，并提供同一接口不同运行之间的对比和退化标记
+"""
+
+import os
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+from src.core.curl_parser import CurlRequest
+from src.models.models import RunHistoryDB, RunRecord
+from src.utils.utils import Logger
+
+def endpoint_key(request: CurlRequest) -> str:
+    """接口标识：请求方法 + 不含查询参数的 URL"""
+    parts = urlsplit(request.url)
+    return f"{request.method.upper()} {urlunsplit((parts.scheme, parts.netloc, parts.path, '', ''))}"
+
+def _history_db(db_path: Optional[str]) -> RunHistoryDB:
+    path = db_path or "data/run_history.db"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return RunHistoryDB(path)
+
+def record_batch_run(processor, request: CurlRequest, kind: str = 'batch', db_path: Optional[str] = None) -> Optional[int]:
+    """保存一次批量（或分页）运行的汇总；失败只记日志，不影响任务本身"""
+    try:
+        summary = processor.monitor.summary()
+        if not summary['completed']:
+            return None
+        latency = summary['latency_ms']
+        record = RunRecord(
+            id=None, kind=kind, endpoint=endpoint_key(request), status=processor.progress['status'],
+            config={
+                'max_threads': processor.max_threads,
+                'batch_size': processor.batch_size,
+                'request_delay': processor.request_delay,
+                'timeout': request.timeout,
+            },
+            requests=summary['completed'], failed=summary['failed'], duration=summary['duration'],
+            rps=summary['requests_per_second'], p50_ms=latency[50.0], p95_ms=latency[95.0], p99_ms=latency[99.0],
+            max_ms=latency[100.0], mean_ms=summary['mean_ms'], total_bytes=summary['total_bytes'],
+            status_counts=summary['status_counts'], error_counts=summary['error_counts'],
+        )
+        return _history_db(db_path).add_run(record)
+    except Exception as e:
+        Logger().log(f"保存运行历史失败: {e}", level='error')
+        return None
+
+def record_load_run(generator, request: CurlRequest, db_path: Optional[str] = None) -> Optional[int]:
+    """保存一次压测的汇总；延迟取自计划发送时间口径"""
+    try:
+        stats = generator.snapshot()
+        if not stats['completed']:
+            return None
+        profile = generator.profile
+        latency = stats['latency_ms']
+        record = RunRecord(
+            id=None, kind='load', endpoint=endpoint_key(request), status=stats['status'],
+            config={
+                'start_rps': profile.start_rps,
+                'end_rps': profile.end_rps,
+                'duration': profile.duration,
+                'max_in_flight': profile.max_in_flight,
+                'dropped': stats['dropped'],
+            },
+            requests=stats['completed'], failed=stats['failed'], duration=stats['elapsed'],
+            rps=stats['achieved_rps'], p50_ms=latency[50.0], p95_ms=latency[95.0], p99_ms=latency[99.0],
+            max_ms=latency[100.0], mean_ms=stats['mean_ms'], total_bytes=stats['total_bytes'],
+            error_counts=stats['errors'],
+        )
+        return _history_db(db_path).add_run(record)
+    except Exception as e:
+        Logger().log(f"保存运行历史失败: {e}", level='error')
+        return None
+
+# 对比指标：(字段, 名称, 越大越好)
+COMPARED_METRICS = [
+    ('rps', '吞吐 (req/s)', True),
+    ('p50_ms', 'P50 延迟 (ms)', False),
+    ('p95_ms', 'P95 延迟 (ms)', False),
+    ('p99_ms', 'P99 延迟 (ms)', False),
+    ('error_rate', '错误率', False),
+]
+
+def compare_runs(baseline: RunRecord, current: RunRecord, tolerance: float = 0.2,
+                 error_rate_tolerance: float = 0.02) -> List[Dict[str, Any]]:
+    """
+    逐项对比两次运行（应为同一类型的运行，界面只提供同类型的基准）
+    :param tolerance: 吞吐和延迟相对变差超过该比例时标记为退化
+    :param error_rate_tolerance: 错误率上升超过该值（绝对值）时标记为退化
+    :return: [{'metric', 'baseline', 'current', 'change', 'regression'}]
+    """
+    rows = []
+    for field_name, label, higher_is_better in COMPARED_METRICS:
+        before = getattr(baseline, field_name)
+        after = getattr(current, field_name)
+        if field_name == 'error_rate':
+            change = after - before
+            regression = change > error_rate_tolerance
+        else:
+            change = (after - before) / before if before else 0.0
+            regression = (-change if higher_is_better else change) > tolerance
+        rows.append({'metric': label, 'baseline': before, 'current': after, 'change': change, 'regression': regression})
+    return rows
+
+def config_changes(baseline: RunRecord, current: RunRecord) -> Dict[str, Any]:
+    """两次运行配置不同的项 {配置名: (基准值, 当前值)}，对比结果需要结合配置解读"""
+    keys = set(baseline.config) | set(current.config)
+    return {key: (baseline.config.get(key), current.config.get(key))
+            for key in sorted(keys) if baseline.config.get(key) != current.config.get(key)}
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+下载文件合并
+把批量下载得到的 xlsx / csv 文件合并为一个数据集：
+进程池并行读取（openpyxl 只读流式模式），各文件的行先写入临时文件，
+主进程按列名对齐后流式写出 CSV / xlsx / SQLite，每行标注来源参数值
+"""
+
+import os
+import csv
+import uuid
+import pickle
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from src.utils.utils import Logger, write_table
+
+PARAM_COLUMN = '参数值'
+
+def spool_sheet(path: str, spool_dir: str) -> Dict[str, Any]:
+    """
+    进程池任务：读取单个文件（xlsx 取第一个工作表，首个非空行为表头），
+    数据行逐行 pickle 到临时文件，只把表头和行数返回给主进程
+    """
+    spool_path = os.path.join(spool_dir, f"{uuid.uuid4().hex}.rows")
+    header: List[str] = []
+    row_count = 0
+    try:
+        if path.lower().endswith('.csv'):
+            f = open(path, 'r', newline='', encoding='utf-8-sig')
+            rows = csv.reader(f)
+            close = f.close
+        else:
+            from openpyxl import load_workbook
+            wb = load_workbook(path, read_only=True, data_only=True)
+            rows = wb.worksheets[0].iter_rows(values_only=True)
+            close = wb.close
+        try:
+            with open(spool_path, 'wb') as spool:
+                for values in rows:
+                    if not header:
+                        if any(v not in (None, '') for v in values):
+                            header = [str(v) if v not in (None, '') else f"列{i + 1}" for i, v in enumerate(values)]
+                        continue
+                    if not any(v not in (None, '') for v in values):
+                        continue
+                    pickle.dump(list(values), spool, pickle.HIGHEST_PROTOCOL)
+                    row_count += 1
+        finally:
+            close()
+        return {'path': path, 'spool': spool_path, 'header': header, 'rows': row_count, 'error': None}
+    except Exception as e:
+        return {'path': path, 'spool': spool_path, 'header': [], 'rows': 0, 'error': str(e)}
+
+def _iter_spool(spool_path: str):
+    with open(spool_path, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+class SpreadsheetMerger:
+    """下载文件合并器"""
+
+    def __init__(self, max_workers: Optional[int] = None, logger: Optional[Logger] = None):
+        self.max_workers = max_workers or os.cpu_count() or 2
+        self.logger = logger or Logger()
+
+    def merge(self, downloaded_files: List[Dict], output_path: str,
+              progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+        """
+        合并下载文件
+        :param downloaded_files: 批量任务的下载文件列表（filename、param_value，可选 blob 摘要）
+        :param output_path: 输出路径，扩展名决定格式（.csv / .xlsx / .db）
+        :param progress: 回调 (已读取文件数, 文件总数)
+        :return: {'files', 'rows', 'columns', 'failed'}
+        """
+        files = [f for f in downloaded_files
+                 if os.path.splitext(f['filename'])[1].lower() in ('.xlsx', '.xlsm', '.csv') and os.path.exists(f['filename'])]
+        if not files:
+            raise ValueError("没有可合并的 xlsx / csv 文件")
+        # 内容相同的文件（相同 blob 摘要）只读取一次
+        sources: Dict[str, str] = {}
+        for f in files:
+            sources.setdefault(f.get('blob') or f['filename'], f['filename'])
+
+        spool_dir = tempfile.mkdtemp(prefix="merge_")
+        try:
+            parsed: Dict[str, Dict[str, Any]] = {}
+            paths = list(sources.values())
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, max(1, len(paths)))) as pool:
+                for done, info in enumerate(pool.map(spool_sheet, paths, [spool_dir] * len(paths),
+                                                     chunksize=max(1, len(paths) // (self.max_workers * 4))), 1):
+                    parsed[info['path']] = info
+                    if info['error']:
+                        self.logger.log(f"读取文件失败: {info['path']}, 错误: {info['error']}", level='error')
+                    if progress:
+                        progress(done, len(paths))
+
+            # 按列名对齐：参数值列在前，其余列按首次出现顺序合并
+            header = [PARAM_COLUMN]
+            column_index = {PARAM_COLUMN: 0}
+            for info in parsed.values():
+                for column in info['header']:
+                    if column not in column_index:
+                        column_index[column] = len(header)
+                        header.append(column)
+            width = len(header)
+
+            entries = [(f['param_value'], parsed[sources[f.get('blob') or f['filename']]]) for f in files]
+            row_count = sum(info['rows'] for _, info in entries if not info['error'])
+
+            def aligned_rows():
+                for param_value, info in entries:
+                    if info['error']:
+                        continue
+                    positions = [column_index[column] for column in info['header']]
+                    for values in _iter_spool(info['spool']):
+                        row = [None] * width
+                        row[0] = param_value
+                        for position, value in zip(positions, values):
+                            row[position] = value
+                        yield row
+
+            tmp_path = output_path + ".tmp" + os.path.splitext(output_path)[1]
+            write_table(header, aligned_rows(), tmp_path, row_count)
+            os.replace(tmp_path, output_path)
+        finally:
+            shutil.rmtree(spool_dir, ignore_errors=True)
+
+        failed = [info['path'] for info in parsed.values() if info['error']]
+        self.logger.log(f"合并下载文件完成: {output_path}, 文件 {len(files)} 个, 行 {row_count}, 列 {width}, 失败 {len(failed)}")
+        return {'files': len(files), 'rows': row_count, 'columns': width, 'failed': failed}
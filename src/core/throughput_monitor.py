@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+吞吐量监控
+工作线程发布完成事件，界面按固定频率读取滚动统计
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+from src.core.latency_histogram import LatencyHistogram, PERCENTILES
+
+class ThroughputMonitor:
+    """
+    批量请求的实时吞吐量统计
+    - 开始、完成、失败计数和整次运行的累计统计在锁内更新，多个工作线程同时完成时不会互相覆盖
+    - 完成事件写入有界 deque，只有读取端（界面）汇总事件，计算滚动 req/s、P95、错误率、bytes/s 和 ETA；
+      读取端跟不上、缓冲写满时最早的事件被丢弃（计入 dropped_events），滚动统计会偏低，累计计数不受影响
+    - 另外累计整次运行的延迟直方图、状态码和错误分布，运行结束时由 summary() 汇总写入运行历史
+    """
+
+    def __init__(self, total: int = 0, window: float = 10.0, capacity: int = 65536):
+        self.total = total
+        self.window = window
+        self.started_at = time.time()
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        # 写入端事件缓冲 (完成时间, 耗时ms, 是否失败, 字节数)；写满时丢弃最早的事件
+        self._events = deque(maxlen=capacity)
+        self.dropped_events = 0
+        # 读取端滚动窗口
+        self._window_events = deque()
+        # 整次运行的累计统计
+        self.latency = LatencyHistogram()
+        self.status_counts: Dict[str, int] = {}
+        self.error_counts: Dict[str, int] = {}
+        self.recorded_bytes = 0
+        self._totals_lock = threading.Lock()
+
+    def record_start(self):
+        """请求开始"""
+        with self._totals_lock:
+            self.started += 1
+
+    def record_done(self, result: Dict[str, Any]):
+        """请求完成，发布完成事件"""
+        is_error = 'error' in result
+        size = result.get('size', result.get('content_length', 0)) or 0
+        # 超时、连接错误等没有收到响应的请求耗时记为 0，不计入延迟分布，以免失败增多时 P50/P95 反而下降
+        if not is_error or result.get('response_time'):
+            self.latency.record(result['response_time'] * 1000)
+        status = str(result.get('status_code', '-'))
+        with self._totals_lock:
+            if len(self._events) == self._events.maxlen:
+                self.dropped_events += 1
+            self._events.append((time.time(), result.get('response_time', 0) or 0, is_error, size))
+            self.recorded_bytes += size
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+            if is_error:
+                # 错误信息按冒号前的类别归并（如 "请求失败: ..."）
+                label = str(result['error']).split(':')[0].strip()[:40]
+                self.error_counts[label] = self.error_counts.get(label, 0) + 1
+                self.failed += 1
+            self.completed += 1
+
+    def _drain(self, now: float):
+        """把新事件移入滚动窗口，并丢弃窗口外的旧事件"""
+        events = self._events
+        window_events = self._window_events
+        while events:
+            window_events.append(events.popleft())
+        cutoff = now - self.window
+        while window_events and window_events[0][0] < cutoff:
+            window_events.popleft()
+
+    @staticmethod
+    def _percentile(values, percent: float) -> Optional[float]:
+        if not values:
+            return None
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """读取当前统计（只应由单个读取端调用）"""
+        now = time.time()
+        self._drain(now)
+        window_events = self._window_events
+        span = min(self.window, max(now - self.started_at, 1.0))
+        count = len(window_events)
+        rate = count / span
+        with self._totals_lock:
+            started, completed, failed = self.started, self.completed, self.failed
+            total_bytes, dropped = self.recorded_bytes, self.dropped_events
+        remaining = max(0, self.total - completed)
+        return {
+            'completed': completed,
+            'failed': failed,
+            'in_flight': max(0, started - completed),
+            'requests_per_second': rate,
+            'p95_ms': self._percentile([e[1] for e in window_events], 95),
+            'error_rate': (sum(1 for e in window_events if e[2]) / count) if count else 0.0,
+            'bytes_per_second': sum(e[3] for e in window_events) / span,
+            'total_bytes': total_bytes,
+            'dropped_events': dropped,
+            'elapsed': now - self.started_at,
+            'eta_seconds': (remaining / rate) if rate > 0 else None,
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        """整次运行的汇总（不经过读取端窗口，任何线程都可以调用）"""
+        elapsed = max(time.time() - self.started_at, 1e-6)
+        with self._totals_lock:
+            completed, failed = self.completed, self.failed
+            status_counts = dict(self.status_counts)
+            error_counts = dict(self.error_counts)
+            total_bytes = self.recorded_bytes
+        percentiles = self.latency.values_at_percentiles(PERCENTILES)
+        return {
+            'completed': completed,
+            'failed': failed,
+            'duration': elapsed,
+            'requests_per_second': completed / elapsed,
+            'latency_ms': {p: v / 1000 for p, v in percentiles.items()},
+            'mean_ms': self.latency.mean / 1000,
+            'total_bytes': total_bytes,
+            'status_counts': status_counts,
+            'error_counts': error_counts,
+        }
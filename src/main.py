@@ -1,12 +1,29 @@
+import os
 import streamlit as st
-from src.utils.utils import json_to_excel_demo
-from src.core.json_structure_manager import JsonStructureManager
-from src.core.help_page import HelpPage
+
+# 各功能页面模块在选中时才导入，主页首屏不加载 pandas、openpyxl、requests 等重依赖
 
 # 初始化会话状态
 if 'current_page' not in st.session_state:
     st.session_state.current_page = "主页"
 
+def _get_page(name, factory):
+    """页面对象每个会话只创建一次，重跑时直接复用"""
+    pages = st.session_state.setdefault('_page_instances', {})
+    if name not in pages:
+        pages[name] = factory()
+    return pages[name]
+
+def _resume_job_queue():
+    """应用重启后若队列中还有未完成的任务，启动调度线程继续执行（每个会话只检查一次）"""
+    if st.session_state.get('_job_queue_checked'):
+        return
+    st.session_state['_job_queue_checked'] = True
+    from src.models.models import JobQueueDB
+    if os.path.exists("data/job_queue.db") and JobQueueDB().has_pending():
+        from src.core.job_queue import JobQueue
+        JobQueue.shared()
+
 def main():
     """主函数"""
     st.set_page_config(
@@ -27,6 +44,8 @@ def main():
             ["主页", "JSON转Excel工具", "API批量请求工具", "JSON结构管理", "帮助中心"]
         )
 
+    _resume_job_queue()
+
     # 根据选择显示不同功能
     if app_mode == "主页":
         st.header("🏠 欢迎使用 xzx 数据采集平台")
@@ -45,17 +64,19 @@ def main():
         
     elif app_mode == "JSON转Excel工具":
         from src.core.json_converter import JsonConverter
-        converter = JsonConverter()
+        converter = _get_page("json_converter", JsonConverter)
         converter.show_interface()
     elif app_mode == "API批量请求工具":
         from src.core.curl_runner import CurlRunner
-        curl_runner = CurlRunner()
+        curl_runner = _get_page("curl_runner", CurlRunner)
         curl_runner.show_interface()
     elif app_mode == "JSON结构管理":
-        manager = JsonStructureManager()
+        from src.core.json_structure_manager import JsonStructureManager
+        manager = _get_page("json_structure_manager", JsonStructureManager)
         manager.show_interface()
     elif app_mode == "帮助中心":
-        help_page = HelpPage()
+        from src.core.help_page import HelpPage
+        help_page = _get_page("help_page", HelpPage)
         help_page.show_interface()
 
 if __name__ == "__main__":
@@ -1,7 +1,9 @@
 import sqlite3
 import json
-from typing import List, Dict, Optional
-from dataclasses import dataclass
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple, Any
+from dataclasses import dataclass, field
 
 @dataclass
 class JsonStructure:
@@ -12,10 +14,126 @@ class JsonStructure:
     example_response: str
     is_active: bool = True
 
+def parse_path_steps(path: str) -> Optional[List[Tuple[str, Any]]]:
+    """将路径模式拆分为访问步骤，语义与 utils.get_by_path 保持一致
+
+    返回 [('key', 'data'), ('index', 0), ...]，无法解析的路径返回 None
+    """
+    steps = []
+    if not path:
+        return steps
+    for key in path.split('.'):
+        if '[' in key and ']' in key:
+            steps.append(('key', key.split('[')[0]))
+            try:
+                steps.append(('index', int(key.split('[')[1].split(']')[0])))
+            except (ValueError, TypeError):
+                return None
+        else:
+            steps.append(('key', key))
+    return steps
+
+@dataclass
+class _TrieNode:
+    children: Dict[Tuple[str, Any], '_TrieNode'] = field(default_factory=dict)
+    rank: Optional[int] = None  # 终止于此节点的结构在 get_all_active 顺序中的最小序号
+
+class StructureIndex:
+    """路径前缀树索引
+
+    将所有激活结构的 path_pattern 合并为一棵前缀树，检测时只需沿响应的键结构走一遍，
+    并按响应的键形状指纹缓存检测结果
+    """
+
+    def __init__(self, structures: List[JsonStructure], cache_size: int = 256):
+        self.root = _TrieNode()
+        self.patterns: List[str] = []
+        self.depth = 0
+        self.max_list_index = -1  # 路径中出现的最大数组下标，用于限定指纹范围
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[Any, Optional[str]]' = OrderedDict()
+        self._lock = threading.Lock()
+        for structure in structures:
+            self._insert(structure.path_pattern)
+
+    def _insert(self, path_pattern: str):
+        steps = parse_path_steps(path_pattern)
+        if steps is None:
+            return
+        rank = len(self.patterns)
+        self.patterns.append(path_pattern)
+        node = self.root
+        for step in steps:
+            if step[0] == 'index':
+                self.max_list_index = max(self.max_list_index, step[1])
+            node = node.children.setdefault(step, _TrieNode())
+        if node.rank is None:
+            node.rank = rank
+        self.depth = max(self.depth, len(steps))
+
+    def _fingerprint(self, value, depth: int):
+        """计算限定深度的键形状指纹"""
+        if value is None:
+            return 'n'
+        if depth == 0:
+            return 'v'
+        if isinstance(value, dict):
+            return ('d',) + tuple((k, self._fingerprint(v, depth - 1)) for k, v in value.items())
+        if isinstance(value, list):
+            cap = min(len(value), self.max_list_index + 1)
+            return ('l', cap) + tuple(self._fingerprint(v, depth - 1) for v in value[:cap])
+        return 'v'
+
+    def _walk(self, node: _TrieNode, value) -> Optional[int]:
+        """沿前缀树与响应结构同步遍历，返回匹配结构的最小序号"""
+        if value is None:
+            return None
+        best = node.rank
+        for (kind, step), child in node.children.items():
+            if kind == 'key':
+                if not isinstance(value, dict) or step not in value:
+                    continue
+                next_value = value[step]
+            else:
+                if not isinstance(value, list) or not 0 <= step < len(value):
+                    continue
+                next_value = value[step]
+            rank = self._walk(child, next_value)
+            if rank is not None and (best is None or rank < best):
+                best = rank
+        return best
+
+    def detect(self, response_data) -> Optional[str]:
+        """检测响应匹配的结构路径，未匹配返回 None"""
+        if not self.patterns:
+            return None
+        key = self._fingerprint(response_data, self.depth)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        rank = self._walk(self.root, response_data)
+        detected = self.patterns[rank] if rank is not None else None
+        with self._lock:
+            self._cache[key] = detected
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return detected
+
 class JsonStructureDB:
+    # 按数据库路径共享的结构索引，写操作后失效
+    _index_cache: Dict[str, StructureIndex] = {}
+    _index_lock = threading.Lock()
+    # 已建表的数据库路径，进程内每个路径只执行一次建表语句
+    _initialized_paths: set = set()
+    _init_lock = threading.Lock()
+
     def __init__(self, db_path: str = "data/json_structures.db"):
         self.db_path = db_path
-        self.init_db()
+        with self._init_lock:
+            if db_path not in self._initialized_paths:
+                self.init_db()
+                self._initialized_paths.add(db_path)
     
     def init_db(self):
         """初始化数据库表"""
@@ -49,6 +167,7 @@ class JsonStructureDB:
         structure_id = cursor.lastrowid
         conn.commit()
         conn.close()
+        self._invalidate_index()
         return structure_id
     
     def update_structure(self, structure_id: int, name: str, description: str, path_pattern: str, example_response: str = "", is_active: bool = True):
@@ -62,6 +181,7 @@ class JsonStructureDB:
         ''', (name, description, path_pattern, example_response, is_active, structure_id))
         conn.commit()
         conn.close()
+        self._invalidate_index()
     
     def delete_structure(self, structure_id: int):
         """删除JSON结构"""
@@ -70,6 +190,7 @@ class JsonStructureDB:
         cursor.execute('DELETE FROM json_structures WHERE id = ?', (structure_id,))
         conn.commit()
         conn.close()
+        self._invalidate_index()
     
     def get_by_id(self, structure_id: int) -> Optional[JsonStructure]:
         """根据ID获取结构"""
@@ -149,17 +270,308 @@ class JsonStructureDB:
             for row in rows
         ]
     
+    def _invalidate_index(self):
+        """结构变更后丢弃索引，下次检测时重建"""
+        with self._index_lock:
+            self._index_cache.pop(self.db_path, None)
+
+    def get_index(self) -> StructureIndex:
+        """获取（必要时构建）激活结构的路径前缀树索引"""
+        with self._index_lock:
+            index = self._index_cache.get(self.db_path)
+        if index is None:
+            index = StructureIndex(self.get_all_active())
+            with self._index_lock:
+                self._index_cache[self.db_path] = index
+        return index
+
     def auto_detect_structure(self, response_data: dict) -> Optional[str]:
         """自动检测响应结构"""
-        active_structures = self.get_all_active()
-        
-        for structure in active_structures:
-            try:
-                from utils import get_by_path
-                result = get_by_path(response_data, structure.path_pattern)
-                if result is not None:
-                    return structure.path_pattern
-            except:
-                continue
-        
-        return None 
\ No newline at end of file
+        try:
+            return self.get_index().detect(response_data)
+        except Exception:
+            return None
+
+@dataclass
+class QueuedJob:
+    id: Optional[int]
+    name: str
+    curl: str
+    param_key: str
+    source: Dict[str, Any]
+    options: Dict[str, Any]
+    status: str = 'queued'  # queued / running / done / failed / cancelled
+    worker_pid: Optional[int] = None
+    results: int = 0
+    errors: int = 0
+    output_path: str = ""
+    error: Optional[str] = None
+    created_at: Optional[str] = None
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+
+class JobQueueDB:
+    """持久化任务队列：任务定义和状态保存在 SQLite 中，应用重启后继续执行"""
+
+    _initialized_paths: set = set()
+    _init_lock = threading.Lock()
+    _columns = ('id, name, curl, param_key, source, options, status, worker_pid, results, errors, '
+                'output_path, error, created_at, started_at, finished_at')
+
+    def __init__(self, db_path: str = "data/job_queue.db"):
+        self.db_path = db_path
+        with self._init_lock:
+            if db_path not in self._initialized_paths:
+                self.init_db()
+                self._initialized_paths.add(db_path)
+
+    def init_db(self):
+        """初始化数据库表"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS job_queue (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT,
+                curl TEXT NOT NULL,
+                param_key TEXT,
+                source TEXT NOT NULL,
+                options TEXT,
+                status TEXT NOT NULL DEFAULT 'queued',
+                worker_pid INTEGER,
+                results INTEGER DEFAULT 0,
+                errors INTEGER DEFAULT 0,
+                output_path TEXT,
+                error TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                started_at TIMESTAMP,
+                finished_at TIMESTAMP
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_job_queue_status ON job_queue (status, id)')
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def _to_job(row) -> QueuedJob:
+        return QueuedJob(
+            id=row[0], name=row[1] or "", curl=row[2], param_key=row[3] or "",
+            source=json.loads(row[4]), options=json.loads(row[5] or '{}'), status=row[6],
+            worker_pid=row[7], results=row[8] or 0, errors=row[9] or 0, output_path=row[10] or "",
+            error=row[11], created_at=row[12], started_at=row[13], finished_at=row[14]
+        )
+
+    def add_job(self, name: str, curl: str, param_key: str, source: Dict[str, Any], options: Dict[str, Any]) -> int:
+        """加入队列尾部"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO job_queue (name, curl, param_key, source, options)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (name, curl, param_key, json.dumps(source, ensure_ascii=False), json.dumps(options, ensure_ascii=False)))
+        job_id = cursor.lastrowid
+        conn.commit()
+        conn.close()
+        return job_id
+
+    def claim_next(self, worker_pid: int) -> Optional[QueuedJob]:
+        """按提交顺序取出下一个排队任务并标记为执行中；多个进程共用队列时同一任务只会被取出一次"""
+        conn = sqlite3.connect(self.db_path, isolation_level=None, timeout=30)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(f"SELECT {self._columns} FROM job_queue WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+            conn.execute('''
+                UPDATE job_queue SET status = 'running', worker_pid = ?, started_at = CURRENT_TIMESTAMP,
+                       results = 0, errors = 0, error = NULL, finished_at = NULL
+                WHERE id = ?
+            ''', (worker_pid, row[0]))
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+        job = self._to_job(row)
+        job.status, job.worker_pid = 'running', worker_pid
+        return job
+
+    def update_progress(self, job_id: int, results: int, errors: int, output_path: str = ""):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute('UPDATE job_queue SET results = ?, errors = ?, output_path = ? WHERE id = ?',
+                     (results, errors, output_path, job_id))
+        conn.commit()
+        conn.close()
+
+    def finish_job(self, job_id: int, status: str, results: int = 0, errors: int = 0,
+                   output_path: str = "", error: Optional[str] = None):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute('''
+            UPDATE job_queue SET status = ?, results = ?, errors = ?, output_path = ?, error = ?,
+                   finished_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (status, results, errors, output_path, error, job_id))
+        conn.commit()
+        conn.close()
+
+    def cancel_job(self, job_id: int) -> bool:
+        """取消排队中的任务；已开始执行的任务不受影响"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+        cursor.execute("UPDATE job_queue SET status = 'cancelled', finished_at = CURRENT_TIMESTAMP "
+                       "WHERE id = ? AND status = 'queued'", (job_id,))
+        cancelled = cursor.rowcount > 0
+        conn.commit()
+        conn.close()
+        return cancelled
+
+    def requeue_orphans(self, is_alive) -> int:
+        """执行进程已退出（应用重启）的任务重新排队，从头执行"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, worker_pid FROM job_queue WHERE status = 'running'")
+        orphans = [job_id for job_id, pid in cursor.fetchall() if pid is None or not is_alive(pid)]
+        cursor.executemany("UPDATE job_queue SET status = 'queued', worker_pid = NULL WHERE id = ?",
+                           [(job_id,) for job_id in orphans])
+        conn.commit()
+        conn.close()
+        return len(orphans)
+
+    def has_pending(self) -> bool:
+        """是否有排队或执行中的任务"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        row = conn.execute("SELECT 1 FROM job_queue WHERE status IN ('queued', 'running') LIMIT 1").fetchone()
+        conn.close()
+        return row is not None
+
+    def get_job(self, job_id: int) -> Optional[QueuedJob]:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        row = conn.execute(f'SELECT {self._columns} FROM job_queue WHERE id = ?', (job_id,)).fetchone()
+        conn.close()
+        return self._to_job(row) if row else None
+
+    def list_jobs(self, limit: int = 100) -> List[QueuedJob]:
+        """最近的任务，按提交顺序排列"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        rows = conn.execute(f'SELECT {self._columns} FROM job_queue ORDER BY id DESC LIMIT ?', (limit,)).fetchall()
+        conn.close()
+        return [self._to_job(row) for row in reversed(rows)]
+
+@dataclass
+class RunRecord:
+    id: Optional[int]
+    kind: str                 # batch / pagination / load
+    endpoint: str             # 请求方法 + 不含查询参数的 URL
+    status: str
+    config: Dict[str, Any]
+    requests: int
+    failed: int
+    duration: float
+    rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    mean_ms: float
+    total_bytes: int
+    status_counts: Dict[str, int] = field(default_factory=dict)
+    error_counts: Dict[str, int] = field(default_factory=dict)
+    created_at: Optional[str] = None
+
+    @property
+    def error_rate(self) -> float:
+        return self.failed / self.requests if self.requests else 0.0
+
+class RunHistoryDB:
+    """运行历史：每次批量运行结束后保存一条汇总，用于跨运行对比性能"""
+
+    _initialized_paths: set = set()
+    _init_lock = threading.Lock()
+    _columns = ('id, kind, endpoint, status, config, requests, failed, duration, rps, p50_ms, p95_ms, p99_ms, '
+                'max_ms, mean_ms, total_bytes, status_counts, error_counts, created_at')
+
+    def __init__(self, db_path: str = "data/run_history.db"):
+        self.db_path = db_path
+        with self._init_lock:
+            if db_path not in self._initialized_paths:
+                self.init_db()
+                self._initialized_paths.add(db_path)
+
+    def init_db(self):
+        """初始化数据库表"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS run_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                endpoint TEXT NOT NULL,
+                status TEXT,
+                config TEXT,
+                requests INTEGER,
+                failed INTEGER,
+                duration REAL,
+                rps REAL,
+                p50_ms REAL,
+                p95_ms REAL,
+                p99_ms REAL,
+                max_ms REAL,
+                mean_ms REAL,
+                total_bytes INTEGER,
+                status_counts TEXT,
+                error_counts TEXT,
+                created_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_run_history_endpoint ON run_history (endpoint, id)')
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def _to_record(row) -> RunRecord:
+        return RunRecord(
+            id=row[0], kind=row[1], endpoint=row[2], status=row[3] or "", config=json.loads(row[4] or '{}'),
+            requests=row[5] or 0, failed=row[6] or 0, duration=row[7] or 0.0, rps=row[8] or 0.0,
+            p50_ms=row[9] or 0.0, p95_ms=row[10] or 0.0, p99_ms=row[11] or 0.0, max_ms=row[12] or 0.0,
+            mean_ms=row[13] or 0.0, total_bytes=row[14] or 0, status_counts=json.loads(row[15] or '{}'),
+            error_counts=json.loads(row[16] or '{}'), created_at=row[17]
+        )
+
+    def add_run(self, record: RunRecord) -> int:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO run_history (kind, endpoint, status, config, requests, failed, duration, rps,
+                                     p50_ms, p95_ms, p99_ms, max_ms, mean_ms, total_bytes, status_counts, error_counts)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (record.kind, record.endpoint, record.status, json.dumps(record.config, ensure_ascii=False),
+              record.requests, record.failed, record.duration, record.rps, record.p50_ms, record.p95_ms,
+              record.p99_ms, record.max_ms, record.mean_ms, record.total_bytes,
+              json.dumps(record.status_counts, ensure_ascii=False), json.dumps(record.error_counts, ensure_ascii=False)))
+        run_id = cursor.lastrowid
+        conn.commit()
+        conn.close()
+        return run_id
+
+    def get_endpoints(self) -> List[Tuple[str, int]]:
+        """有运行记录的接口及运行次数，最近运行的在前"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        rows = conn.execute('SELECT endpoint, COUNT(*) FROM run_history GROUP BY endpoint ORDER BY MAX(id) DESC').fetchall()
+        conn.close()
+        return rows
+
+    def get_runs(self, endpoint: Optional[str] = None, limit: int = 50) -> List[RunRecord]:
+        """最近的运行记录，新的在前"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        if endpoint is None:
+            rows = conn.execute(f'SELECT {self._columns} FROM run_history ORDER BY id DESC LIMIT ?', (limit,)).fetchall()
+        else:
+            rows = conn.execute(f'SELECT {self._columns} FROM run_history WHERE endpoint = ? ORDER BY id DESC LIMIT ?',
+                                (endpoint, limit)).fetchall()
+        conn.close()
+        return [self._to_record(row) for row in rows]
+
+    def delete_run(self, run_id: int):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute('DELETE FROM run_history WHERE id = ?', (run_id,))
+        conn.commit()
+        conn.close()
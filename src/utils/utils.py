@@ -1,10 +1,17 @@
-import pandas as pd
 import io
+import re
 import json
+from collections.abc import Iterator
 import streamlit as st
 from src.models.models import JsonStructureDB
 import os
+import csv
+import mmap
 import logging
+import shutil
+import tempfile
+import zipfile
+from array import array
 from datetime import datetime
 
 def get_by_path(data, path):
@@ -50,53 +57,56 @@ def get_by_path(data, path):
     
     return current
 
-def parse_multi_json(text):
+# 文档之间允许的空白和 --- 分隔符
+_JSON_SEPARATOR = re.compile(r'(?:\s|---)*')
+_JSON_DECODER = json.JSONDecoder()
+
+def iter_multi_json(text):
     """
-    支持多种格式：
+    单次流式解析，逐个产出JSON文档，支持：
     1. 单个JSON对象或数组
     2. 多行，每行一个JSON对象
     3. 用 --- 分割的多个JSON对象
+    三种格式用同一个 raw_decode 循环解析，无需预先判断格式（逐行 json.loads 反而更慢）
     """
-    text = text.strip()
-    # 1. 尝试标准JSON
-    try:
-        return json.loads(text)
-    except Exception:
-        pass
-    # 2. 尝试每行一个JSON对象
-    lines = [line for line in text.splitlines() if line.strip()]
-    objs = []
-    for line in lines:
+    pos = _JSON_SEPARATOR.match(text).end()
+    end = len(text)
+    while pos < end:
         try:
-            obj = json.loads(line)
-            objs.append(obj)
-        except Exception:
-            break
-    if len(objs) == len(lines) and objs:
-        return objs
-    # 3. 尝试用 --- 分割
-    blocks = [b for b in text.split('---') if b.strip()]
-    objs = []
-    for block in blocks:
-        try:
-            obj = json.loads(block)
-            objs.append(obj)
-        except Exception:
-            break
-    if len(objs) == len(blocks) and objs:
-        return objs
-    raise ValueError('无法识别的JSON格式，请检查输入！')
+            obj, pos = _JSON_DECODER.raw_decode(text, pos)
+        except json.JSONDecodeError as e:
+            raise ValueError(f'无法识别的JSON格式，请检查输入！({e})')
+        yield obj
+        pos = _JSON_SEPARATOR.match(text, pos).end()
+
+_NO_DOCUMENT = object()  # 哨兵：JSON 文档本身可能是 null，不能用 None 表示"没有文档"
+
+def parse_multi_json(text):
+    """
+    支持多种格式（见 iter_multi_json）
+    单个文档直接返回该文档，多个文档返回列表
+    """
+    docs = iter_multi_json(text)
+    first = next(docs, _NO_DOCUMENT)
+    second = next(docs, _NO_DOCUMENT)
+    if first is _NO_DOCUMENT:
+        raise ValueError('无法识别的JSON格式，请检查输入！')
+    if second is _NO_DOCUMENT:
+        return first
+    objs = [first, second]
+    objs.extend(docs)
+    return objs
 
 def json_to_excel(json_data, file_name='data.xlsx', list_path=None):
     """
+    :param json_data: dict / list，或 iter_multi_json 产出的文档迭代器（逐个消费，不整体驻留）
     :param list_path: str, 如 'data' 或 'data.items'，指定导出为表格的字段路径
     :return: bytes, Excel文件内容
     """
     import pandas as pd
-    import io
     if list_path:
         # 如果 json_data 是 list，则对每个元素提取路径并合并
-        if isinstance(json_data, list):
+        if isinstance(json_data, (list, Iterator)):
             all_rows = []
             for item in json_data:
                 target = get_by_path(item, list_path)
@@ -122,8 +132,8 @@ def json_to_excel(json_data, file_name='data.xlsx', list_path=None):
                     break
             else:
                 df = pd.DataFrame([json_data])
-        elif isinstance(json_data, list):
-            df = pd.DataFrame(json_data)
+        elif isinstance(json_data, (list, Iterator)):
+            df = pd.DataFrame(list(json_data))
         else:
             raise ValueError('无法识别的 json 数据结构')
     output = io.BytesIO()
@@ -132,6 +142,337 @@ def json_to_excel(json_data, file_name='data.xlsx', list_path=None):
     output.seek(0)
     return output.getvalue()
 
+# JSON 记录扫描：字符串整体跳过，只关心括号和逗号
+_JSON_TOKEN = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{},]')
+_NON_WHITESPACE = re.compile(rb'\S')
+_QUOTE, _COMMA = ord('"'), ord(',')
+_OPENERS, _CLOSERS = (ord('{'), ord('[')), (ord('}'), ord(']'))
+EXCEL_MAX_ROWS = 1048576
+
+class JsonFileIndex:
+    """
+    大JSON文件的顶层记录偏移索引
+    通过 mmap 扫描一次文件，只记录每条记录的起止偏移，按需解码单条记录：
+    - 顶层为数组: 数组中的每个元素是一条记录
+    - 顶层为对象: 每个对象是一条记录（兼容每行一个JSON 和 --- 分隔）
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.size = os.path.getsize(path)
+        self.format = 'empty'
+        self.starts = array('q')
+        self.ends = array('q')
+        if self.size:
+            self._build()
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _open(self):
+        f = open(self.path, 'rb')
+        try:
+            return f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            f.close()
+            raise
+
+    def _add(self, mm, start, end):
+        first = _NON_WHITESPACE.search(mm, start, end)
+        if first:
+            self.starts.append(first.start())
+            self.ends.append(end)
+    
+    @staticmethod
+    def _iter_array_items(mm, pos):
+        """从数组左括号之后的位置开始，逐个产出元素的 (起, 止) 偏移"""
+        depth = 0
+        item_start = pos
+        for m in _JSON_TOKEN.finditer(mm, pos):
+            c = mm[m.start()]
+            if c == _QUOTE:
+                continue
+            if c in _OPENERS:
+                depth += 1
+            elif c in _CLOSERS:
+                if depth == 0:
+                    first = _NON_WHITESPACE.search(mm, item_start, m.start())
+                    if first:
+                        yield first.start(), m.start()
+                    return
+                depth -= 1
+            elif depth == 0:
+                first = _NON_WHITESPACE.search(mm, item_start, m.start())
+                if first:
+                    yield first.start(), m.start()
+                item_start = m.end()
+        raise ValueError('JSON数组未闭合，文件可能不完整')
+    
+    def _build(self):
+        f, mm = self._open()
+        try:
+            offset = 3 if mm[:3] == b'\xef\xbb\xbf' else 0
+            first = _NON_WHITESPACE.search(mm, offset)
+            if not first:
+                return
+            depth = 0
+            if mm[first.start()] == ord('['):
+                self.format = 'array'
+                for start, end in self._iter_array_items(mm, first.end()):
+                    self.starts.append(start)
+                    self.ends.append(end)
+            else:
+                self.format = 'stream'
+                record_start = first.start()
+                for m in _JSON_TOKEN.finditer(mm, first.start()):
+                    c = mm[m.start()]
+                    if c in _OPENERS:
+                        if depth == 0:
+                            record_start = m.start()
+                        depth += 1
+                    elif c in _CLOSERS:
+                        depth -= 1
+                        if depth == 0:
+                            self._add(mm, record_start, m.end())
+                        elif depth < 0:
+                            raise ValueError(f'JSON括号不匹配，位置: {m.start()}')
+                if depth != 0:
+                    raise ValueError('JSON对象未闭合，文件可能不完整')
+        finally:
+            mm.close()
+            f.close()
+    
+    def iter_records(self, start=0, stop=None):
+        """按索引区间逐条解码记录"""
+        stop = len(self) if stop is None else min(stop, len(self))
+        if start >= stop:
+            return
+        f, mm = self._open()
+        try:
+            for i in range(start, stop):
+                yield json.loads(mm[self.starts[i]:self.ends[i]])
+        finally:
+            mm.close()
+            f.close()
+    
+    @staticmethod
+    def _skeleton(mm, start, end, max_items):
+        """解码 [start, end) 处的记录，每个数组只保留前 max_items 个元素，其余字节不解码"""
+        kept = bytearray()
+        copy_from = start
+        stack = []       # 每层容器：[是否数组, 已见元素分隔数]
+        skip_depth = None  # 正在跳过的数组内部嵌套深度
+        for m in _JSON_TOKEN.finditer(mm, start, end):
+            c = mm[m.start()]
+            if c == _QUOTE:
+                continue
+            if skip_depth is not None:
+                if c in _OPENERS:
+                    skip_depth += 1
+                elif c in _CLOSERS:
+                    if skip_depth == 0:
+                        # 被截断的数组到此结束，从右括号继续复制
+                        stack.pop()
+                        copy_from = m.start()
+                        skip_depth = None
+                    else:
+                        skip_depth -= 1
+                continue
+            if c in _OPENERS:
+                stack.append([c == ord('['), 0])
+            elif c in _CLOSERS:
+                stack.pop()
+            elif stack and stack[-1][0]:
+                stack[-1][1] += 1
+                if stack[-1][1] >= max_items:
+                    kept += mm[copy_from:m.start()]
+                    skip_depth = 0
+        kept += mm[copy_from:end]
+        return json.loads(bytes(kept))
+    
+    def preview(self, count=5, max_items=5):
+        """只解码前几条记录用于预览；记录中的数组只保留前 max_items 个元素，单个大对象也不会整体解码"""
+        f, mm = self._open()
+        try:
+            return [self._skeleton(mm, self.starts[i], self.ends[i], max_items) for i in range(min(count, len(self)))]
+        finally:
+            mm.close()
+            f.close()
+    
+    @staticmethod
+    def _locate(mm, pos, end, keys):
+        """在 pos 处的对象中按键路径查找值的起始偏移，找不到返回 None"""
+        for key in keys:
+            if mm[pos] != ord('{'):
+                return None
+            depth = 0
+            for m in _JSON_TOKEN.finditer(mm, pos + 1, end):
+                c = mm[m.start()]
+                if c in _OPENERS:
+                    depth += 1
+                elif c in _CLOSERS:
+                    if depth == 0:
+                        return None
+                    depth -= 1
+                elif c == _QUOTE and depth == 0:
+                    colon = _NON_WHITESPACE.search(mm, m.end(), end)
+                    if colon and mm[colon.start()] == ord(':') and json.loads(mm[m.start():m.end()]) == key:
+                        value = _NON_WHITESPACE.search(mm, colon.end(), end)
+                        if value is None:
+                            return None
+                        pos = value.start()
+                        break
+            else:
+                return None
+        return pos
+    
+    def iter_rows(self, list_path=None):
+        """
+        逐行产出导出数据，规则与 extract_rows 一致
+        路径指向数组时直接在文件中定位该数组并逐个解码元素，顶层是单个大对象时也不整体解码
+        """
+        keys = list_path.split('.') if list_path and '[' not in list_path else None
+        f, mm = self._open()
+        try:
+            for i in range(len(self)):
+                start, end = self.starts[i], self.ends[i]
+                if keys:
+                    pos = self._locate(mm, start, end, keys)
+                    if pos is None:
+                        continue
+                    if mm[pos] == ord('['):
+                        for item_start, item_end in self._iter_array_items(mm, pos + 1):
+                            yield json.loads(mm[item_start:item_end])
+                        continue
+                yield from extract_rows(json.loads(mm[start:end]), list_path)
+        finally:
+            mm.close()
+            f.close()
+
+def extract_rows(record, list_path=None):
+    """从单条记录中提取表格行，规则与 json_to_excel 一致"""
+    target = get_by_path(record, list_path) if list_path else record
+    if isinstance(target, list):
+        return target
+    if target is None:
+        return []
+    return [target]
+
+def _to_cell(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+def write_rows_streaming(rows, output_path, columns=None):
+    """
+    将行数据流式写入 .csv / .xlsx 文件，内存占用与行数无关
+    列在写入过程中按出现顺序合并，先写入临时文件，结束后补上表头
+    :param rows: 可迭代的行（dict 或标量）
+    :param columns: 预先指定的列顺序，新出现的列追加在后面
+    :return: 写入的行数
+    """
+    column_index = {}
+    for column in columns or []:
+        column_index.setdefault(column, len(column_index))
+    row_count = 0
+    with tempfile.TemporaryFile('w+', encoding='utf-8') as spool:
+        for row in rows:
+            if not isinstance(row, dict):
+                row = {'value': row}
+            values = [None] * len(column_index)
+            for key, value in row.items():
+                idx = column_index.get(key)
+                if idx is None:
+                    idx = column_index.setdefault(key, len(column_index))
+                    values.append(None)
+                values[idx] = _to_cell(value)
+            spool.write(json.dumps(values, ensure_ascii=False))
+            spool.write('\n')
+            row_count += 1
+        spool.seek(0)
+        header = list(column_index)
+        width = len(header)
+
+        def spooled_rows():
+            for line in spool:
+                values = json.loads(line)
+                values.extend([None] * (width - len(values)))
+                yield values
+
+        write_table(header, spooled_rows(), output_path, row_count)
+    return row_count
+
+def write_table(header, rows, output_path, row_count=None):
+    """
+    按表头写出已对齐的行（每行为与表头等长的列表），格式由扩展名决定：
+    .csv、.db / .sqlite（SQLite 表 data）或 .xlsx
+    :param row_count: 已知行数时用于提前检查Excel行数上限
+    """
+    lower_path = output_path.lower()
+    if lower_path.endswith('.csv'):
+        with open(output_path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows)
+    elif lower_path.endswith(('.db', '.sqlite')):
+        import sqlite3
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        conn = sqlite3.connect(output_path)
+        try:
+            quoted = ', '.join('"' + str(column).replace('"', '""') + '"' for column in header)
+            conn.execute(f'CREATE TABLE data ({quoted})')
+            placeholders = ', '.join('?' * len(header))
+            conn.executemany(f'INSERT INTO data VALUES ({placeholders})',
+                             ([v if v is None or isinstance(v, (int, float, str, bytes)) else str(v) for v in values]
+                              for values in rows))
+            conn.commit()
+        finally:
+            conn.close()
+    else:
+        if row_count is not None and row_count >= EXCEL_MAX_ROWS:
+            raise ValueError(f'数据共 {row_count} 行，超过Excel单表上限，请导出为CSV')
+        from openpyxl import Workbook
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("数据")
+        ws.append(header)
+        for values in rows:
+            ws.append(values)
+        wb.save(output_path)
+
+# 本身已压缩的格式，打包时只存储不再压缩
+COMPRESSED_EXTENSIONS = {'.xlsx', '.xls', '.docx', '.pptx', '.zip', '.gz', '.bz2', '.xz', '.7z', '.rar',
+                         '.png', '.jpg', '.jpeg', '.gif', '.webp', '.pdf', '.mp3', '.mp4'}
+
+def write_zip_streaming(paths, output_path, chunk_size=1024 * 1024):
+    """
+    将文件逐块流式写入 ZIP，内存中最多只保留一个数据块
+    已压缩格式（xlsx 等）使用存储模式，其余使用 deflate；同名文件自动加序号
+    先写入临时文件，完成后原子重命名
+    :param paths: 可迭代的文件路径，不存在的文件跳过
+    :return: 打包的文件数
+    """
+    used_names = set()
+    file_count = 0
+    tmp_path = output_path + '.tmp'
+    with zipfile.ZipFile(tmp_path, 'w', allowZip64=True) as zf:
+        for path in paths:
+            if not os.path.isfile(path):
+                continue
+            base, ext = os.path.splitext(os.path.basename(path))
+            arcname, n = base + ext, 1
+            while arcname in used_names:
+                arcname = f"{base}_{n}{ext}"
+                n += 1
+            used_names.add(arcname)
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            info.compress_type = zipfile.ZIP_STORED if ext.lower() in COMPRESSED_EXTENSIONS else zipfile.ZIP_DEFLATED
+            with open(path, 'rb') as src, zf.open(info, 'w', force_zip64=True) as dst:
+                shutil.copyfileobj(src, dst, chunk_size)
+            file_count += 1
+    os.replace(tmp_path, output_path)
+    return file_count
+
 def json_to_excel_demo():
     st.title("JSON转Excel工具演示")
     st.write("粘贴你的JSON数据，点击按钮即可下载Excel文件")
@@ -23,6 +23,66 @@ def check_dependencies():
         print("请运行: pip install -r config/requirements_core.txt")
         return False
 
+# 首屏及各功能页面对应的模块，用于导入耗时报告
+IMPORT_TIME_MODULES = [
+    ("首屏 (src.main)", "src.main"),
+    ("JSON转Excel工具", "src.core.json_converter"),
+    ("API批量请求工具", "src.core.curl_runner"),
+    ("JSON结构管理", "src.core.json_structure_manager"),
+    ("帮助中心", "src.core.help_page"),
+]
+
+def measure_import_time(module, top=10):
+    """
+    在全新的解释器中以 -X importtime 导入模块
+    :return: (总耗时微秒, 按自身耗时汇总的前 top 个依赖包 [(包名, 微秒)])
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "导入失败")
+    total = 0
+    subtree = []
+    # 输出按后序排列：子模块在前，顶层模块（缩进一格）收尾
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            self_time, cumulative = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # 表头行
+        name = parts[2].rstrip()
+        subtree.append((name.strip(), self_time))
+        if not name.startswith("  "):
+            if name.strip() == module:
+                total = cumulative
+                break
+            subtree = []  # 解释器启动时的导入，不计入
+    packages = {}
+    for name, self_time in subtree:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_time
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return total, ranked
+
+def import_time_report():
+    """打印首屏和各页面的导入耗时报告（相当于 python -X importtime 的汇总）"""
+    print("⏱️  导入耗时报告（每项在全新进程中测量）")
+    print("-" * 50)
+    for label, module in IMPORT_TIME_MODULES:
+        try:
+            total, ranked = measure_import_time(module)
+        except Exception as e:
+            print(f"{label}: ❌ {e}")
+            continue
+        print(f"{label}: {total / 1000:.1f} ms")
+        for package, cumulative in ranked[:5]:
+            print(f"    {package:<24}{cumulative / 1000:>8.1f} ms")
+    return True
+
 def start_app():
     """启动应用"""
     if not check_dependencies():
@@ -61,6 +121,10 @@ def main():
         print("❌ 请在项目根目录运行此脚本")
         return False
     
+    # 只输出导入耗时报告
+    if "--importtime" in sys.argv[1:]:
+        return import_time_report()
+    
     # 启动应用
     return start_app()
 
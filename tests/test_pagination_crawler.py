@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分页抓取测试：本地 HTTP 服务返回 95 条数据（每页 20 条，共 5 页），
+检查总数和下一页标志在普通解码、进程池裁剪和采集时提取下都能读到，抓取不会探测到 max_pages
+"""
+
+import json
+import threading
+import unittest
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.core.curl_parser import CurlRequest
+from src.core.pagination_crawler import PaginationCrawler, PaginationConfig
+from src.core.post_processor import ExtractionConfig, PostProcessPool
+
+TOTAL_ITEMS = 95
+PAGE_SIZE = 20
+LAST_PAGE = 5
+
+class PagedHandler(BaseHTTPRequestHandler):
+    """按 page 参数返回 {'data': {'items': [...], 'total': 95}, 'more': bool}"""
+
+    requested_pages = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+        page = int(query['page'][0])
+        self.requested_pages.append(page)
+        start = (page - 1) * PAGE_SIZE
+        items = [{'id': i, 'name': f'item{i}'} for i in range(start, min(TOTAL_ITEMS, start + PAGE_SIZE))]
+        body = json.dumps({'data': {'items': items, 'total': TOTAL_ITEMS}, 'more': page < LAST_PAGE}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class PaginationCrawlerTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), PagedHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f'http://127.0.0.1:{cls.server.server_address[1]}/list'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        PagedHandler.requested_pages = []
+
+    def _crawl(self, extraction=None, post_processor=None, **config) -> PaginationCrawler:
+        crawler = PaginationCrawler(PaginationConfig(page_key='page', items_path='data.items',
+                                                     page_size=PAGE_SIZE, max_pages=50, **config))
+        crawler.set_config(max_threads=4, batch_size=10, request_delay=0)
+        crawler.request_processor.export_path = 'data.items'
+        crawler.request_processor.extraction = extraction
+        crawler.request_processor.post_processor = post_processor
+        crawler.run_paginated_requests(CurlRequest(url=self.url, params={'page': '1'}))
+        crawler._job_thread.join(timeout=30)
+        self.assertEqual(crawler.progress['status'], 'done', crawler.progress['error'])
+        return crawler
+
+    def _assert_stopped_at_last_page(self, crawler: PaginationCrawler):
+        self.assertEqual(crawler._last_page, LAST_PAGE)
+        self.assertEqual(sorted(PagedHandler.requested_pages), list(range(1, LAST_PAGE + 1)))
+        self.assertEqual(sum(result['page_items'] for result in crawler.results), TOTAL_ITEMS)
+
+    def test_total_path(self):
+        self._assert_stopped_at_last_page(self._crawl(total_path='data.total'))
+
+    def test_total_path_with_extraction(self):
+        extraction = ExtractionConfig(export_path='data.items', columns=['id'])
+        crawler = self._crawl(extraction=extraction, total_path='data.total')
+        self._assert_stopped_at_last_page(crawler)
+        rows = [row for result in crawler.results for row in result['rows']]
+        self.assertEqual(sorted(row['id'] for row in rows), list(range(TOTAL_ITEMS)))
+        self.assertEqual(set(rows[0]), {'id'})
+
+    def test_has_next_path_with_extraction(self):
+        extraction = ExtractionConfig(export_path='data.items')
+        self._assert_stopped_at_last_page(self._crawl(extraction=extraction, has_next_path='more'))
+
+    def test_total_path_with_post_process_pool(self):
+        pool = PostProcessPool(max_workers=1, threshold=0)
+        try:
+            self._assert_stopped_at_last_page(self._crawl(post_processor=pool, total_path='data.total'))
+        finally:
+            pool.shutdown()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+响应缓存测试：启用缓存后经 execute_request 请求本地 JSON 服务，
+未命中和命中都应正常解码（包括 charset=gbk 的响应），命中时不再请求上游
+"""
+
+import json
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.core.curl_parser import CurlRequest
+from src.core.request_processor import RequestProcessor
+from src.core.response_cache import ResponseCache
+
+class JsonHandler(BaseHTTPRequestHandler):
+    """/utf8 返回 UTF-8 JSON，/gbk 返回声明 charset=gbk 的 JSON"""
+
+    hits = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        JsonHandler.hits += 1
+        charset = 'gbk' if self.path.startswith('/gbk') else 'utf-8'
+        body = json.dumps({'data': {'items': [{'name': '中文'}]}}, ensure_ascii=False).encode(charset)
+        self.send_response(200)
+        self.send_header('Content-Type', f'application/json; charset={charset}')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class ResponseCacheTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), JsonHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        JsonHandler.hits = 0
+        self.cache_dir = tempfile.mkdtemp(prefix='http_cache_')
+        self.processor = RequestProcessor()
+        self.processor.cache = ResponseCache(self.cache_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def _execute(self, path: str):
+        return self.processor.execute_request(CurlRequest(url=self.base_url + path), 'v')
+
+    def _assert_decoded(self, result):
+        self.assertNotIn('error', result)
+        self.assertEqual(result['content'], {'data': {'items': [{'name': '中文'}]}})
+
+    def test_miss_then_hit(self):
+        miss = self._execute('/utf8')
+        hit = self._execute('/utf8')
+        self._assert_decoded(miss)
+        self._assert_decoded(hit)
+        self.assertEqual((miss['cache'], hit['cache']), ('miss', 'hit'))
+        self.assertEqual(JsonHandler.hits, 1)
+
+    def test_hit_keeps_response_charset(self):
+        self._assert_decoded(self._execute('/gbk'))
+        # 新的处理器和缓存实例，只能从磁盘上的缓存条目读取字符集
+        self.processor = RequestProcessor()
+        self.processor.cache = ResponseCache(self.cache_dir)
+        hit = self._execute('/gbk')
+        self._assert_decoded(hit)
+        self.assertEqual(hit['cache'], 'hit')
+        self.assertEqual(JsonHandler.hits, 1)
+
+    def test_index_without_encoding_column(self):
+        """旧版本的索引表没有 encoding 列，打开时补上，字符集按 Content-Type 推断"""
+        shutil.rmtree(self.cache_dir)
+        conn = sqlite3.connect(ResponseCache(self.cache_dir).db_path)
+        conn.execute('DROP TABLE entries')
+        conn.execute('CREATE TABLE entries (key TEXT PRIMARY KEY, status_code INTEGER, headers TEXT, size INTEGER, '
+                     'etag TEXT, last_modified TEXT, created_at REAL, last_access REAL)')
+        conn.commit()
+        conn.close()
+        self.processor.cache = ResponseCache(self.cache_dir)
+        self._assert_decoded(self._execute('/gbk'))
+        self._assert_decoded(self._execute('/gbk'))
+        self.assertEqual(JsonHandler.hits, 1)
+
+if __name__ == '__main__':
+    unittest.main()